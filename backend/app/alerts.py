@@ -0,0 +1,274 @@
+# backend/app/alerts.py
+"""Non-blocking alert dispatch: per-channel queues and workers with retries, digests and throttling."""
+
+import os
+import time
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+from app import email_utils, telegram_utils
+
+load_dotenv()
+
+ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", "100"))  # per channel
+ALERT_MAX_RETRIES = int(os.getenv("ALERT_MAX_RETRIES", "3"))
+ALERT_RETRY_DELAY = float(os.getenv("ALERT_RETRY_DELAY", "2"))
+ALERT_EMAIL_CONCURRENCY = int(os.getenv("ALERT_EMAIL_CONCURRENCY", "1"))
+ALERT_TELEGRAM_CONCURRENCY = int(os.getenv("ALERT_TELEGRAM_CONCURRENCY", "2"))
+ALERT_COOLDOWN = float(os.getenv("ALERT_COOLDOWN", "600"))  # seconds per identity
+ALERT_COOLDOWNS = {
+    t: float(os.getenv(f"ALERT_COOLDOWN_{t.upper()}", str(ALERT_COOLDOWN))) for t in ("bad", "known", "unknown")
+}
+ALERT_BURST_WINDOW = float(os.getenv("ALERT_BURST_WINDOW", "60"))
+ALERT_BURST_MAX = int(os.getenv("ALERT_BURST_MAX", "5"))  # per alert kind and window
+ALERT_GLOBAL_WINDOW = float(os.getenv("ALERT_GLOBAL_WINDOW", "60"))
+ALERT_GLOBAL_MAX = int(os.getenv("ALERT_GLOBAL_MAX", "20"))
+
+
+# ===================================================
+# Throttling
+# ===================================================
+class AlertThrottle:
+    """
+    Rule-based gate for alert events. `kind` names the alert ("bad",
+    "restricted:unknown", ...; the part after the last ':' picks the cooldown)
+    and `identity` the person it is about.
+    """
+
+    def __init__(self):
+        self.last_sent = {}  # (kind, identity) -> monotonic time
+        self.kind_sent = {}  # kind -> deque of send times
+        self.global_sent = deque()
+        self.stats = {"allowed": 0, "suppressed": 0, "cooldown": 0, "burst": 0, "global": 0, "kinds": {}}
+
+    @staticmethod
+    def _trim(times: deque, window: float, now: float):
+        while times and now - times[0] >= window:
+            times.popleft()
+
+    def _prune(self, now: float):
+        longest = max(ALERT_COOLDOWNS.values())
+        self.last_sent = {k: t for k, t in self.last_sent.items() if now - t < longest}
+
+    def allow(self, kind: str, identity=None) -> bool:
+        now = time.monotonic()
+        cooldown = ALERT_COOLDOWNS.get(kind.rsplit(":", 1)[-1], ALERT_COOLDOWN)
+        key = (kind, identity)
+        recent = self.kind_sent.setdefault(kind, deque())
+        self._trim(recent, ALERT_BURST_WINDOW, now)
+        self._trim(self.global_sent, ALERT_GLOBAL_WINDOW, now)
+
+        if identity is not None and now - self.last_sent.get(key, -cooldown) < cooldown:
+            reason = "cooldown"
+        elif len(recent) >= ALERT_BURST_MAX:
+            reason = "burst"
+        elif len(self.global_sent) >= ALERT_GLOBAL_MAX:
+            reason = "global"
+        else:
+            reason = None
+
+        counts = self.stats["kinds"].setdefault(kind, {"allowed": 0, "suppressed": 0})
+        if reason is not None:
+            self.stats["suppressed"] += 1
+            self.stats[reason] += 1
+            counts["suppressed"] += 1
+            return False
+
+        if identity is not None:
+            if len(self.last_sent) > 1000:
+                self._prune(now)
+            self.last_sent[key] = now
+        recent.append(now)
+        self.global_sent.append(now)
+        self.stats["allowed"] += 1
+        counts["allowed"] += 1
+        return True
+
+
+throttle = AlertThrottle()
+
+
+# ===================================================
+# Dispatch
+# ===================================================
+
+
+class Alert:
+    def __init__(self, args: tuple, kwargs: dict, items: list = None):
+        self.args = args
+        self.kwargs = kwargs
+        self.items = items  # batched alerts (kwargs dicts) for a digest send
+        self.attempts = 0
+        self.queued_at = time.monotonic()
+
+
+class Channel:
+    def __init__(self, name: str, send, concurrency: int, queue_size: int, send_batch=None, window: float = 0.0, batch_max: int = 1):
+        self.name = name
+        self.send = send
+        self.send_batch = send_batch
+        self.window = window if send_batch is not None else 0.0
+        self.batch_max = max(1, batch_max)
+        self.concurrency = max(1, concurrency)
+        self.queue_size = queue_size
+        self.queue = None  # created on the running loop
+        self.in_flight = 0
+        self.stats = {"queued": 0, "sent": 0, "failed": 0, "retries": 0, "dropped": 0, "batches": 0, "latency_ms": 0.0, "send_ms": 0.0}
+
+    async def collect(self, first: Alert) -> Alert:
+        """Gather alerts arriving within `window` of `first` into one batched Alert."""
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.batch_max:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                alert = await asyncio.wait_for(self.queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if alert.items is not None:  # a retried batch: send it as it is, after this one
+                self.queue.put_nowait(alert)
+                break
+            batch.append(alert)
+        combined = Alert((), {}, [a.kwargs for a in batch])
+        combined.queued_at = min(a.queued_at for a in batch)
+        return combined
+
+    def put(self, alert: Alert) -> bool:
+        try:
+            self.queue.put_nowait(alert)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            print(f"[alerts] {self.name} queue full, alert dropped")
+            return False
+        if alert.attempts == 0:
+            self.stats["queued"] += 1
+        return True
+
+    def record(self, key: str, ms: float):
+        prev = self.stats[key]
+        self.stats[key] = round(ms if prev == 0 else 0.9 * prev + 0.1 * ms, 1)
+
+    def describe(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            **self.stats,
+        }
+
+
+class AlertDispatcher:
+    def __init__(self, queue_size: int = ALERT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.channels = {}
+        self._tasks = []
+        self._pending_retries = set()
+        self._threads = None
+
+    def register(self, name: str, send, concurrency: int = 1, send_batch=None, window: float = 0.0, batch_max: int = 1):
+        self.channels[name] = Channel(name, send, concurrency, self.queue_size, send_batch, window, batch_max)
+
+    def start(self):
+        """Start every channel's workers on the running loop (idempotent)."""
+        if self._tasks or not self.channels:
+            return
+        workers = sum(ch.concurrency for ch in self.channels.values())
+        self._threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="alert")
+        for ch in self.channels.values():
+            ch.queue = asyncio.Queue(maxsize=ch.queue_size)
+            self._tasks += [asyncio.create_task(self._worker(ch)) for _ in range(ch.concurrency)]
+        print(f"[alerts] {workers} worker(s), channels: {', '.join(self.channels)}")
+
+    async def stop(self):
+        for task in self._tasks + list(self._pending_retries):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._pending_retries, return_exceptions=True)
+        self._tasks = []
+        if self._threads is not None:
+            self._threads.shutdown(wait=False)
+        email_utils.pool.close()
+
+    def dispatch(self, channel: str, *args, **kwargs) -> bool:
+        """Queue a send on `channel`; never blocks. Returns False if it was not queued."""
+        ch = self.channels.get(channel)
+        if ch is None:
+            return False
+        if not self._tasks:
+            self.start()
+        return ch.put(Alert(args, kwargs))
+
+    async def _retry_later(self, ch: Channel, alert: Alert, delay: float):
+        await asyncio.sleep(delay)
+        ch.put(alert)
+
+    async def _worker(self, ch: Channel):
+        loop = asyncio.get_running_loop()
+        while True:
+            alert = await ch.queue.get()
+            if ch.window > 0 and alert.items is None:
+                alert = await ch.collect(alert)
+            if alert.items is not None:
+                send = lambda: ch.send_batch(alert.items)
+            else:
+                send = lambda: ch.send(*alert.args, **alert.kwargs)
+            ch.in_flight += 1
+            started = time.monotonic()
+            try:
+                ok = await loop.run_in_executor(self._threads, send)
+            except Exception as e:
+                print(f"[alerts] {ch.name} send raised: {e}")
+                ok = False
+            finally:
+                ch.in_flight -= 1
+            ch.record("send_ms", (time.monotonic() - started) * 1000)
+
+            alert.attempts += 1
+            if ok is not False:
+                ch.stats["sent"] += len(alert.items) if alert.items is not None else 1
+                ch.stats["batches"] += alert.items is not None
+                ch.record("latency_ms", (time.monotonic() - alert.queued_at) * 1000)
+            elif alert.attempts <= ALERT_MAX_RETRIES:
+                ch.stats["retries"] += 1
+                delay = ALERT_RETRY_DELAY * 2 ** (alert.attempts - 1)
+                task = asyncio.create_task(self._retry_later(ch, alert, delay))
+                self._pending_retries.add(task)
+                task.add_done_callback(self._pending_retries.discard)
+            else:
+                ch.stats["failed"] += 1
+                print(f"[alerts] {ch.name} alert failed after {alert.attempts} attempt(s)")
+
+    def describe(self) -> dict:
+        return {
+            "running": bool(self._tasks),
+            "pending_retries": len(self._pending_retries),
+            "channels": {name: ch.describe() for name, ch in self.channels.items()},
+            "throttle": throttle.stats,
+            "smtp": email_utils.pool.stats,
+        }
+
+
+dispatcher = AlertDispatcher()
+
+if email_utils.EMAIL_HOST:
+    dispatcher.register(
+        "email",
+        email_utils.send_alert_email,
+        ALERT_EMAIL_CONCURRENCY,
+        send_batch=email_utils.send_alert_digest,
+        window=email_utils.EMAIL_DIGEST_WINDOW,
+        batch_max=email_utils.EMAIL_DIGEST_MAX,
+    )
+else:
+    print("[alerts] EMAIL_HOST not set, email alerts disabled")
+if telegram_utils.BOT_TOKEN and telegram_utils.CHAT_ID:
+    dispatcher.register("telegram", telegram_utils.send_telegram_photo, ALERT_TELEGRAM_CONCURRENCY)
+else:
+    print("[alerts] TELEGRAM_BOT_TOKEN/TELEGRAM_CHAT_ID not set, telegram alerts disabled")
+
+
+def dispatch(channel: str, *args, **kwargs) -> bool:
+    return dispatcher.dispatch(channel, *args, **kwargs)
@@ -0,0 +1,407 @@
+# backend/app/cameras.py
+"""Camera registry: one capture thread per source, decoding into a shared-memory frame ring."""
+
+import os
+import json
+import time
+import asyncio
+import threading
+
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+from app.db import db
+from app.tracker import FaceTracker
+from app.motion import MotionGate
+from app.frame_ring import FrameRing
+from app.detection_policy import DetectionPolicy
+
+load_dotenv()
+
+CAMERA_SOURCES = os.getenv("CAMERA_SOURCES", "")
+CAMERA_FILE_FPS = float(os.getenv("CAMERA_FILE_FPS", "15"))
+CAMERA_REOPEN_DELAY = float(os.getenv("CAMERA_REOPEN_DELAY", "5"))
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+# ===================================================
+# Frame Sources
+# ===================================================
+class VideoCaptureSource:
+    """Device, network stream or video file via cv2.VideoCapture."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.is_file = isinstance(spec, str) and os.path.isfile(spec)
+        self.cap = cv2.VideoCapture(spec)
+        if not self.is_file:
+            # ask the backend to keep as few frames queued as possible
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if self.is_file else 0
+        self.interval = 1.0 / fps if fps and fps > 0 else 1.0 / CAMERA_FILE_FPS
+        self._next = time.monotonic()
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    def read(self, out=None):
+        """(ret, frame); decodes straight into `out` when its shape matches the stream."""
+        ret, frame = self.cap.read(out)
+        if self.is_file:
+            if not ret:
+                # loop video files so they can stand in for a live camera
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, frame = self.cap.read(out)
+            self._throttle()
+        return ret, frame
+
+    def _throttle(self):
+        self._next += self.interval
+        delay = self._next - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            self._next = time.monotonic()
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageSource(VideoCaptureSource):
+    """A still image repeated at CAMERA_FILE_FPS."""
+
+    def __init__(self, path: str):
+        self.spec = path
+        self.image = cv2.imread(path)
+        self.interval = 1.0 / CAMERA_FILE_FPS
+        self._next = time.monotonic()
+
+    def is_opened(self):
+        return self.image is not None
+
+    def read(self, out=None):
+        self._throttle()
+        if self.image is None:
+            return False, None
+        if out is not None and out.shape == self.image.shape:
+            np.copyto(out, self.image)
+            return True, out
+        return True, self.image.copy()
+
+    def release(self):
+        pass
+
+
+class SyntheticSource(ImageSource):
+    """Generated frames (moving bar over noise) for testing without hardware."""
+
+    def __init__(self, width: int = 640, height: int = 480):
+        self.spec = f"synthetic:{width}x{height}"
+        self.width, self.height = width, height
+        self.interval = 1.0 / CAMERA_FILE_FPS
+        self._next = time.monotonic()
+        self._rng = np.random.default_rng(0)
+        self._n = 0
+
+    def is_opened(self):
+        return True
+
+    def read(self, out=None):
+        self._throttle()
+        frame = self._rng.integers(0, 40, (self.height, self.width, 3), dtype=np.uint8)
+        x = (self._n * 8) % self.width
+        frame[:, x : x + 40] = 200
+        self._n += 1
+        return True, frame
+
+
+def open_source(spec):
+    """Create a frame source from a config value."""
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.strip().isdigit()):
+        return VideoCaptureSource(int(spec))
+    spec = str(spec).strip()
+    if spec.startswith("synthetic"):
+        width, height = 640, 480
+        if ":" in spec:
+            width, height = (int(v) for v in spec.split(":", 1)[1].lower().split("x"))
+        return SyntheticSource(width, height)
+    if os.path.splitext(spec)[1].lower() in IMAGE_EXTS:
+        return ImageSource(spec)
+    return VideoCaptureSource(spec)
+
+
+# ===================================================
+# Camera
+# ===================================================
+class Camera:
+    def __init__(self, camera_id: str, source, name: str = None, detection: dict = None):
+        self.camera_id = camera_id
+        self.source = source
+        self.name = name or camera_id
+        self.policy = DetectionPolicy.from_config(detection)
+        self.ring = None                 # FrameRing of captured frames (written by the capture thread)
+        self.display_ring = None         # FrameRing of annotated display frames (written by the loop)
+        self._retired = []               # replaced rings; kept alive while readers may hold views
+        self._taken_seq = 0
+        self._pinned = None              # (ring, slot) held by the recognition loop
+        self._display_slot = None
+        self.frame_ref = None            # (ring name, slot, seq) of the frame last returned by take_frame
+        self.published = asyncio.Event()  # set on the event loop whenever a display frame is committed
+        self.captured = 0
+        self.dropped = 0                 # frames overwritten before anyone took them
+        self.active_presence: dict = {}  # key -> presence info, per camera
+        self.tracker = FaceTracker()
+        self.motion = MotionGate()
+        self.opened = False
+        self.stats = {"processed": 0, "read_errors": 0, "latency_ms": 0.0}
+        self._stop = threading.Event()
+        self._thread = None
+        self._notify = None
+
+    # ---------------- frame rings ----------------
+    def _replace_ring(self, attr: str, shape: tuple):
+        old = getattr(self, attr)
+        if old is not None:
+            old.close()
+            self._retired = (self._retired + [old])[-4:]
+        ring = FrameRing(shape)
+        setattr(self, attr, ring)
+        return ring
+
+    def take_frame(self):
+        """
+        (frame, monotonic capture time) of the newest captured frame, or (None, None).
+        The frame is a view into its ring slot, pinned so the capture thread
+        does not overwrite it until release_frame() (or the next take_frame).
+        """
+        ring = self.ring
+        latest = ring.latest() if ring is not None else None
+        if latest is None or latest[0] <= self._taken_seq:
+            return None, None
+        seq, slot, frame, stamp = latest
+        if not ring.pin(slot, seq):
+            return None, None
+        self.release_frame()
+        self._pinned = (ring, slot)
+        if self._taken_seq:
+            self.dropped += max(0, seq - self._taken_seq - 1)
+        self._taken_seq = seq
+        self.frame_ref = (ring.name, slot, seq)
+        return frame, stamp
+
+    def release_frame(self):
+        """Let the capture thread reuse the slot of the frame last returned by take_frame."""
+        if self._pinned is not None:
+            ring, slot = self._pinned
+            self._pinned = None
+            ring.unpin(slot)
+
+    def render_display(self, frame, width: int):
+        """Resize `frame` straight into the next display slot; returns that slot's view."""
+        h, w = frame.shape[:2]
+        shape = (max(1, int(h * width / w)), width, 3)
+        ring = self.display_ring
+        if ring is None or ring.shape != shape:
+            ring = self._replace_ring("display_ring", shape)
+        self._display_slot, view = ring.claim()
+        cv2.resize(frame, (shape[1], shape[0]), dst=view)
+        return view
+
+    def display_ref(self):
+        """(ring name, slot, None) of the display frame being prepared."""
+        return (self.display_ring.name, self._display_slot, None)
+
+    def publish(self, frame):
+        """Commit the annotated display frame; copies only if drawing produced a new array."""
+        view = self.display_ring.frames[self._display_slot]
+        if frame.ctypes.data != view.ctypes.data:
+            np.copyto(view, frame)
+        self.display_ring.commit(self._display_slot, time.monotonic())
+        self.published.set()
+
+    def take_display(self):
+        """(ring, slot, view) of the latest display frame, pinned until ring.unpin(slot); or None."""
+        ring = self.display_ring
+        latest = ring.latest() if ring is not None else None
+        if latest is None or not ring.pin(latest[1], latest[0]):
+            return None
+        return ring, latest[1], latest[2]
+
+    @property
+    def last_frame(self):
+        """Latest annotated frame for streaming (a ring view), or None."""
+        latest = self.display_ring.latest() if self.display_ring is not None else None
+        return latest[2] if latest is not None else None
+
+    def mark_processed(self, captured_at: float):
+        """Record glass-to-decision latency (moving average) for a processed frame."""
+        latency = (time.monotonic() - captured_at) * 1000
+        prev = self.stats["latency_ms"]
+        self.stats["latency_ms"] = latency if not prev else 0.9 * prev + 0.1 * latency
+        self.stats["processed"] += 1
+
+    def _capture_loop(self):
+        while not self._stop.is_set():
+            source = open_source(self.source)
+            self.opened = source.is_opened()
+            if not self.opened:
+                print(f"[cameras] WARNING: camera {self.camera_id} ({self.source}) could not be opened")
+                source.release()
+                self._stop.wait(CAMERA_REOPEN_DELAY)
+                continue
+            print(f"[cameras] camera {self.camera_id} opened ({self.source})")
+            try:
+                failures = 0
+                while failures < 20 and not self._stop.is_set():
+                    # decode in place into the next ring slot when the shape is known
+                    slot, out = self.ring.claim() if self.ring is not None else (None, None)
+                    ret, frame = source.read(out)
+                    if not ret:
+                        failures += 1
+                        self.stats["read_errors"] += 1
+                        self._stop.wait(0.5)
+                        continue
+                    failures = 0
+                    if out is None or frame.ctypes.data != out.ctypes.data:
+                        # first frame, resolution change or a source that cannot decode in place
+                        if self.ring is None or self.ring.shape != frame.shape:
+                            self._replace_ring("ring", frame.shape)
+                        slot, out = self.ring.claim()
+                        np.copyto(out, frame)
+                    self.ring.commit(slot, time.monotonic())
+                    self.captured += 1
+                    if self._notify is not None:
+                        self._notify()
+                if failures:
+                    print(f"[cameras] camera {self.camera_id} stopped delivering frames, reopening")
+            finally:
+                self.opened = False
+                source.release()
+
+    def start(self, notify=None):
+        """Start the capture thread; `notify` is called (from that thread) after every frame."""
+        if self._thread is None:
+            self._notify = notify
+            self._thread = threading.Thread(
+                target=self._capture_loop, name=f"capture-{self.camera_id}", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def describe(self) -> dict:
+        return {
+            "camera_id": self.camera_id,
+            "name": self.name,
+            "source": str(self.source),
+            "opened": self.opened,
+            "present": len(self.active_presence),
+            "tracks": len(self.tracker.tracks),
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "frame_ring": self.ring.describe() if self.ring is not None else None,
+            "display_ring": self.display_ring.describe() if self.display_ring is not None else None,
+            **self.stats,
+            **self.tracker.stats,
+            "detection": self.policy.describe(),
+            "motion": self.motion.stats,
+        }
+
+
+# ===================================================
+# Registry
+# ===================================================
+cameras: dict = {}  # camera_id -> Camera
+frame_ready: asyncio.Event = None  # set whenever any camera captured a frame
+
+
+def parse_camera_sources(value: str) -> list:
+    value = value.strip()
+    if not value:
+        return []
+    if value.startswith("["):
+        return [
+            {
+                "camera_id": str(c.get("camera_id") or f"cam{i}"),
+                "source": c["source"],
+                "name": c.get("name"),
+                "detection": c.get("detection"),
+            }
+            for i, c in enumerate(json.loads(value))
+        ]
+    return [
+        {"camera_id": f"cam{i}", "source": src.strip(), "name": None}
+        for i, src in enumerate(value.split(","))
+        if src.strip()
+    ]
+
+
+async def load_camera_configs() -> list:
+    configs = parse_camera_sources(CAMERA_SOURCES)
+    if configs:
+        return configs
+    try:
+        cursor = db.cameras.find({"enabled": {"$ne": False}})
+        async for c in cursor:
+            configs.append({
+                "camera_id": str(c.get("camera_id") or c["_id"]),
+                "source": c["source"],
+                "name": c.get("name"),
+                "detection": c.get("detection"),
+            })
+    except Exception as e:
+        print("[cameras] could not read cameras collection:", e)
+    return configs or [{"camera_id": "cam0", "source": 0, "name": "Default camera"}]
+
+
+async def start_cameras() -> list:
+    """Register every configured camera and start its capture thread."""
+    global frame_ready
+    loop = asyncio.get_running_loop()
+    if frame_ready is None:
+        frame_ready = asyncio.Event()
+
+    def notify():
+        # the loop clears the event before taking frames, so skipping while set loses nothing
+        if not frame_ready.is_set():
+            loop.call_soon_threadsafe(frame_ready.set)
+
+    configs = await load_camera_configs()
+    for cfg in configs:
+        if cfg["camera_id"] in cameras:
+            continue
+        cam = Camera(cfg["camera_id"], cfg["source"], cfg.get("name"), cfg.get("detection"))
+        cameras[cam.camera_id] = cam
+        cam.start(notify)
+    print(f"[cameras] {len(cameras)} camera(s) registered")
+    return list(cameras.values())
+
+
+async def wait_for_frames(timeout: float):
+    """Wait (without blocking the event loop) until some camera has a new frame."""
+    if frame_ready is None:
+        await asyncio.sleep(timeout)
+        return
+    try:
+        await asyncio.wait_for(frame_ready.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    frame_ready.clear()
+
+
+def stop_cameras():
+    for cam in cameras.values():
+        cam.stop()
+        for ring in (cam.ring, cam.display_ring, *cam._retired):
+            if ring is not None:
+                ring.close()
+
+
+def get_camera(camera_id: str = None):
+    """Camera by id, or the first registered camera when no id is given."""
+    if camera_id is None:
+        return next(iter(cameras.values()), None)
+    return cameras.get(camera_id)
@@ -0,0 +1,192 @@
+# backend/app/db_indexes.py
+"""Declared Mongo indexes, created at startup, and explain diagnostics for the hot queries."""
+
+import datetime
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.db import db
+
+INDEXES = {
+    "unknowns": [
+        {"keys": [("first_seen", DESCENDING)], "name": "first_seen_desc"},
+    ],
+    "presence_events": [
+        {"keys": [("entry_time", DESCENDING)], "name": "entry_time_desc"},
+        {"keys": [("user_id", ASCENDING), ("entry_time", ASCENDING)], "name": "user_entry_time"},
+    ],
+    "attendance_logs": [
+        # unique: incremental rollups and ?recompute both upsert on (date, user_id)
+        {"keys": [("date", ASCENDING), ("user_id", ASCENDING)], "name": "date_user", "unique": True},
+    ],
+    "restricted_hours": [
+        {"keys": [("type", ASCENDING)], "name": "type"},
+    ],
+    "bad_people": [
+        {"keys": [("created_at", DESCENDING)], "name": "created_at_desc"},
+        {"keys": [("gallery_version", ASCENDING)], "name": "gallery_version"},
+    ],
+    "users": [
+        {"keys": [("gallery_version", ASCENDING)], "name": "gallery_version"},
+    ],
+    "gallery_tombstones": [
+        {"keys": [("gallery_version", ASCENDING)], "name": "gallery_version"},
+    ],
+}
+
+index_state = {"ensured": [], "failed": {}}
+
+# IndexOptionsConflict / IndexKeySpecsConflict: an older definition under the same name or keys
+INDEX_CONFLICT_CODES = (85, 86)
+
+
+async def dedupe_attendance_logs() -> int:
+    """
+    Merge duplicate (date, user_id) attendance rows left by racing upserts so the
+    unique index can be built. Returns the number of rows removed.
+    """
+    removed = 0
+    pipeline = [
+        {"$group": {"_id": {"date": "$date", "user_id": "$user_id"}, "ids": {"$push": "$_id"}, "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}},
+    ]
+    async for group in db.attendance_logs.aggregate(pipeline, allowDiskUse=True):
+        docs = await db.attendance_logs.find({"_id": {"$in": group["ids"]}}).to_list(length=None)
+        keep, rest = docs[0], docs[1:]
+        events = {}
+        for doc in docs:
+            events.update(doc.get("events") or {})
+        merged = {
+            "events": events,
+            "total_duration_seconds": sum(events.values()) if events
+            else max(d.get("total_duration_seconds", 0) for d in docs),
+            "first_seen": min((d["first_seen"] for d in docs if d.get("first_seen")), default=None),
+            "last_seen": max((d["last_seen"] for d in docs if d.get("last_seen")), default=None),
+        }
+        await db.attendance_logs.update_one({"_id": keep["_id"]}, {"$set": merged})
+        res = await db.attendance_logs.delete_many({"_id": {"$in": [d["_id"] for d in rest]}})
+        removed += res.deleted_count
+    if removed:
+        print(f"[db_indexes] merged {removed} duplicate attendance_logs row(s)")
+    return removed
+
+
+# run before creating the index: makes existing data satisfy its constraints
+PREPARE = {"attendance_logs.date_user": dedupe_attendance_logs}
+
+
+async def _exists(collection: str, spec: dict) -> bool:
+    """Whether `spec` is already built exactly as declared."""
+    info = (await db[collection].index_information()).get(spec["name"])
+    return bool(info) and list(info["key"]) == list(spec["keys"]) and info.get("unique", False) == spec.get("unique", False)
+
+
+async def _create(collection: str, spec: dict):
+    options = {k: v for k, v in spec.items() if k != "keys"}
+    try:
+        await db[collection].create_index(spec["keys"], **options)
+    except OperationFailure as e:
+        if e.code not in INDEX_CONFLICT_CODES:
+            raise
+        # same name or keys with other options (e.g. the former non-unique date_user): rebuild it
+        print(f"[db_indexes] replacing {collection}.{spec['name']}: {e}")
+        indexes = await db[collection].index_information()
+        for name, info in indexes.items():
+            if name == spec["name"] or list(info["key"]) == list(spec["keys"]):
+                await db[collection].drop_index(name)
+        await db[collection].create_index(spec["keys"], **options)
+
+
+async def ensure_indexes():
+    """Create every declared index (idempotent). Returns index_state."""
+    ensured, failed = [], {}
+    for collection, specs in INDEXES.items():
+        for spec in specs:
+            name = f"{collection}.{spec['name']}"
+            try:
+                if name in PREPARE and not await _exists(collection, spec):
+                    await PREPARE[name]()
+                await _create(collection, spec)
+                ensured.append(name)
+            except PyMongoError as e:
+                failed[name] = str(e)
+                print(f"[db_indexes] could not create {name}:", e)
+    index_state.update(ensured=ensured, failed=failed)
+    print(f"[db_indexes] {len(ensured)} index(es) ensured, {len(failed)} failed")
+    return index_state
+
+
+# ===================================================
+# Diagnostics
+# ===================================================
+def hot_queries() -> dict:
+    """name -> explainable command for the queries INDEXES is meant to serve."""
+    start = datetime.datetime.combine(datetime.date.today(), datetime.time.min)
+    end = start + datetime.timedelta(days=1)
+    return {
+        "unknowns_recent": {"find": "unknowns", "filter": {}, "sort": {"first_seen": -1}, "limit": 50},
+        "presence_recent": {"find": "presence_events", "filter": {}, "sort": {"entry_time": -1}, "limit": 50},
+        "attendance_day_events": {
+            "aggregate": "presence_events",
+            "pipeline": [
+                {"$match": {"entry_time": {"$gte": start, "$lt": end}, "duration_seconds": {"$exists": True}}},
+                {"$group": {"_id": "$user_id", "total": {"$sum": "$duration_seconds"}}},
+            ],
+            "cursor": {},
+        },
+        "attendance_logs_day": {"find": "attendance_logs", "filter": {"date": start.date().isoformat()}},
+        "restricted_hours_settings": {"find": "restricted_hours", "filter": {"type": "restricted_hours"}, "limit": 1},
+        "bad_people_recent": {"find": "bad_people", "filter": {}, "sort": {"created_at": -1}, "limit": 50},
+    }
+
+
+def _find_key(node, key):
+    """First value stored under `key` anywhere in a nested explain document."""
+    if isinstance(node, dict):
+        if key in node:
+            return node[key]
+        node = list(node.values())
+    if isinstance(node, list):
+        for child in node:
+            found = _find_key(child, key)
+            if found is not None:
+                return found
+    return None
+
+
+def _stages(plan) -> list:
+    stages = []
+    while isinstance(plan, dict):
+        stage = plan.get("stage")
+        if stage:
+            stages.append(stage + (f"({plan['indexName']})" if plan.get("indexName") else ""))
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0] or plan.get("queryPlan")
+    return stages
+
+
+def summarize_explain(explain: dict) -> dict:
+    planner = _find_key(explain, "queryPlanner") or {}
+    stats = _find_key(explain, "executionStats") or {}
+    stages = _stages(planner.get("winningPlan"))
+    return {
+        "plan": " <- ".join(stages),
+        "uses_index": any(s.startswith(("IXSCAN", "COUNT_SCAN", "IDHACK", "EXPRESS_IXSCAN")) for s in stages),
+        "collection_scan": any(s.startswith("COLLSCAN") for s in stages),
+        "returned": stats.get("nReturned"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "millis": stats.get("executionTimeMillis"),
+    }
+
+
+async def explain_hot_queries() -> dict:
+    report = {}
+    for name, command in hot_queries().items():
+        try:
+            explain = await db.command("explain", command, verbosity="executionStats")
+            report[name] = summarize_explain(explain)
+        except PyMongoError as e:
+            report[name] = {"error": str(e)}
+            continue
+        print(f"[db_indexes] {name}: {report[name]['plan']} (docs examined {report[name]['docs_examined']})")
+    return report
@@ -0,0 +1,160 @@
+# backend/app/detection_policy.py
+"""Per-camera detection policy: full-frame vs. ROI detection and full-res recognition."""
+
+import os
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+from app.tracker import iou_matrix
+
+load_dotenv()
+
+DET_MODE = os.getenv("DET_MODE", "full")  # full | adaptive
+DET_WIDTH = int(os.getenv("DET_WIDTH", os.getenv("RESIZE_WIDTH", "480")))
+DET_FULL_INTERVAL = int(os.getenv("DET_FULL_INTERVAL", "5"))
+DET_ROI_MARGIN = float(os.getenv("DET_ROI_MARGIN", "0.6"))
+DET_ROI_SIZE = int(os.getenv("DET_ROI_SIZE", "256"))
+DET_FULL_RES_RECOGNITION = os.getenv("DET_FULL_RES_RECOGNITION", "true").lower() == "true"
+
+
+def _round32(v: float) -> int:
+    return max(32, int(np.ceil(v / 32.0)) * 32)
+
+
+def has_dynamic_input(det_model) -> bool:
+    """True when the detector ONNX graph accepts any input size (det_10g, det_500m do)."""
+    shape = det_model.session.get_inputs()[0].shape
+    return not isinstance(shape[2], int)
+
+
+# ===================================================
+# Policy
+# ===================================================
+class DetectionPolicy:
+    FIELDS = ("mode", "det_width", "full_interval", "roi_margin", "roi_size", "full_res_recognition")
+
+    def __init__(
+        self,
+        mode: str = DET_MODE,
+        det_width: int = DET_WIDTH,
+        full_interval: int = DET_FULL_INTERVAL,
+        roi_margin: float = DET_ROI_MARGIN,
+        roi_size: int = DET_ROI_SIZE,
+        full_res_recognition: bool = DET_FULL_RES_RECOGNITION,
+    ):
+        self.mode = mode if mode in ("full", "adaptive") else "full"
+        self.det_width = int(det_width)
+        self.full_interval = max(1, int(full_interval))
+        self.roi_margin = float(roi_margin)
+        self.roi_size = _round32(roi_size)
+        self.full_res_recognition = bool(full_res_recognition)
+
+    @classmethod
+    def from_config(cls, cfg: dict = None):
+        cfg = cfg or {}
+        return cls(**{k: cfg[k] for k in cls.FIELDS if k in cfg})
+
+    def wants_full(self, frame_no: int, track_boxes: list) -> bool:
+        return self.mode == "full" or not len(track_boxes) or frame_no % self.full_interval == 0
+
+    def regions(self, boxes, width: int, height: int) -> list:
+        """Square, margin-expanded, merged crop windows (source pixels) around `boxes`."""
+        windows = []
+        for x1, y1, x2, y2 in boxes:
+            cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+            half = max(x2 - x1, y2 - y1) * (1 + self.roi_margin) / 2
+            windows.append([
+                max(0, int(cx - half)), max(0, int(cy - half)),
+                min(width, int(cx + half)), min(height, int(cy + half)),
+            ])
+        # merge overlapping windows so one face is not detected twice
+        merged = True
+        while merged and len(windows) > 1:
+            merged = False
+            for i in range(len(windows)):
+                for j in range(i + 1, len(windows)):
+                    a, b = windows[i], windows[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        windows[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                        windows.pop(j)
+                        merged = True
+                        break
+                if merged:
+                    break
+        return [w for w in windows if w[2] - w[0] >= 16 and w[3] - w[1] >= 16]
+
+    def describe(self) -> dict:
+        return {k: getattr(self, k) for k in self.FIELDS}
+
+
+# ===================================================
+# Detection
+# ===================================================
+def _detect(det_model, img, input_size):
+    bboxes, kpss = det_model.detect(img, input_size=input_size, max_num=0, metric="default")
+    if kpss is None:
+        kpss = np.zeros((0, 5, 2), dtype=np.float32)
+    return bboxes, kpss
+
+
+def _dedupe(bboxes, kpss, iou: float = 0.5):
+    """Greedy NMS across crop windows."""
+    if len(bboxes) < 2:
+        return bboxes, kpss
+    order = np.argsort(-bboxes[:, 4])
+    ious = iou_matrix(bboxes[:, :4], bboxes[:, :4])
+    keep, dropped = [], set()
+    for i in order:
+        if i in dropped:
+            continue
+        keep.append(i)
+        dropped.update(np.where(ious[i] > iou)[0].tolist())
+    return bboxes[keep], kpss[keep]
+
+
+def detect_job(model, job: dict) -> list:
+    """
+    Run the detector for one camera frame according to its policy.
+
+    job: {"frame": source frame, "display": display frame, "policy": DetectionPolicy,
+          "full": bool, "boxes": display-pixel boxes to look around when not full}
+    Returns Face objects with bbox/kps in display pixels.
+    """
+    from insightface.app.common import Face
+
+    frame, display, policy = job["frame"], job["display"], job["policy"]
+    h, w = frame.shape[:2]
+    to_display = display.shape[1] / w
+    dynamic = has_dynamic_input(model.det_model)
+
+    if job["full"]:
+        if policy.det_width == display.shape[1]:
+            img, scale = display, to_display
+        else:
+            scale = policy.det_width / w
+            img = cv2.resize(frame, (policy.det_width, int(h * scale)))
+        size = (_round32(img.shape[1]), _round32(img.shape[0])) if dynamic else None
+        bboxes, kpss = _detect(model.det_model, img, size)
+        bboxes[:, :4] /= scale
+        kpss = kpss / scale
+    else:
+        boxes = np.asarray(job["boxes"], dtype=np.float32).reshape(-1, 4) / to_display
+        all_b, all_k = [np.zeros((0, 5), dtype=np.float32)], [np.zeros((0, 5, 2), dtype=np.float32)]
+        size = (policy.roi_size, policy.roi_size) if dynamic else None
+        for x1, y1, x2, y2 in policy.regions(boxes, w, h):
+            b, k = _detect(model.det_model, frame[y1:y2, x1:x2], size)
+            b[:, [0, 2]] += x1
+            b[:, [1, 3]] += y1
+            all_b.append(b)
+            all_k.append(k + np.array([x1, y1], dtype=np.float32))
+        bboxes, kpss = _dedupe(np.concatenate(all_b), np.concatenate(all_k))
+
+    return [
+        Face(bbox=bboxes[i, 0:4] * to_display, kps=kpss[i] * to_display, det_score=bboxes[i, 4])
+        for i in range(bboxes.shape[0])
+    ]
+
+
+def detect_jobs(model, jobs: list) -> list:
+    return [detect_job(model, job) for job in jobs]
@@ -1,6 +1,14 @@
 # backend/app/email_utils.py
+"""
+Alert emails over pooled SMTP connections.
+Local testing: python -m aiosmtpd -n -l localhost:1025 with EMAIL_HOST=localhost EMAIL_PORT=1025 EMAIL_STARTTLS=false.
+"""
+
 import os
+import time
+import socket
 import smtplib
+import threading
 from email.message import EmailMessage
 from dotenv import load_dotenv
 
@@ -11,19 +19,105 @@ EMAIL_PORT = int(os.getenv("EMAIL_PORT", "587"))
 EMAIL_USER = os.getenv("EMAIL_USER")
 EMAIL_PASS = os.getenv("EMAIL_PASS")
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL")
+EMAIL_FROM = os.getenv("EMAIL_FROM", EMAIL_USER or "")
+EMAIL_STARTTLS = os.getenv("EMAIL_STARTTLS", "true").lower() == "true"
+EMAIL_TIMEOUT = float(os.getenv("EMAIL_TIMEOUT", "30"))
+EMAIL_POOL_SIZE = int(os.getenv("EMAIL_POOL_SIZE", "2"))
+EMAIL_IDLE_TIMEOUT = float(os.getenv("EMAIL_IDLE_TIMEOUT", "120"))
+EMAIL_DIGEST_WINDOW = float(os.getenv("EMAIL_DIGEST_WINDOW", "0"))  # seconds; 0 = one email per alert
+EMAIL_DIGEST_MAX = int(os.getenv("EMAIL_DIGEST_MAX", "20"))
+
+
+# ===================================================
+# Connection Pool
+# ===================================================
+class SmtpPool:
+    def __init__(self, size: int = EMAIL_POOL_SIZE):
+        self.size = max(1, size)
+        self._idle = []  # [(smtp, last_used)]
+        self._lock = threading.Lock()
+        self.stats = {"connects": 0, "reused": 0, "reconnects": 0, "sent": 0}
+
+    def _connect(self):
+        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT, timeout=EMAIL_TIMEOUT)
+        try:
+            if EMAIL_STARTTLS:
+                server.starttls()
+            if EMAIL_USER and EMAIL_PASS:
+                server.login(EMAIL_USER, EMAIL_PASS)
+        except Exception:
+            self._quit(server)
+            raise
+        self.stats["connects"] += 1
+        return server
+
+    @staticmethod
+    def _quit(server):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _acquire(self):
+        with self._lock:
+            while self._idle:
+                server, last_used = self._idle.pop()
+                if time.monotonic() - last_used < EMAIL_IDLE_TIMEOUT:
+                    self.stats["reused"] += 1
+                    return server
+                self._quit(server)
+        return self._connect()
+
+    def _release(self, server):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((server, time.monotonic()))
+                return
+        self._quit(server)
+
+    def send(self, msg: EmailMessage):
+        """Send on a pooled connection, reconnecting once if the server dropped it."""
+        server = self._acquire()
+        try:
+            server.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError, socket.timeout):
+            # only a dead connection is retried; SMTP replies (refused recipient, 552, ...) are final
+            server.close()
+            self.stats["reconnects"] += 1
+            server = self._connect()
+            try:
+                server.send_message(msg)
+            except Exception:
+                self._quit(server)
+                raise
+        except Exception:
+            self._quit(server)
+            raise
+        self.stats["sent"] += 1
+        self._release(server)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self._quit(server)
 
-def send_alert_email(subject: str, body: str, image_path: str = None): 
-    """
-    Send an alert email with optional attached image.
-    """
-    try:
-        msg = EmailMessage()
-        msg["From"] = EMAIL_USER
-        msg["To"] = ADMIN_EMAIL
-        msg["Subject"] = subject
-        msg.set_content(body)
 
-        # Attach image if provided
+pool = SmtpPool()
+
+
+# ===================================================
+# Messages
+# ===================================================
+def build_message(subject: str, body: str, image_paths: list = ()) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = EMAIL_FROM
+    msg["To"] = ADMIN_EMAIL
+    msg["Subject"] = subject
+    msg.set_content(body)
+
+    # Attach images if provided
+    for image_path in image_paths:
         if image_path and os.path.exists(image_path):
             with open(image_path, "rb") as f:
                 img_data = f.read()
@@ -33,12 +127,37 @@ def send_alert_email(subject: str, body: str, image_path: str = None):
                 subtype="jpeg",
                 filename=os.path.basename(image_path),
             )
+    return msg
 
-        with smtplib.SMTP(EMAIL_HOST, EMAIL_PORT) as server:
-            server.starttls()
-            server.login(EMAIL_USER, EMAIL_PASS)
-            server.send_message(msg)
 
+def send_alert_email(subject: str, body: str, image_path: str = None):
+    """
+    Send an alert email with optional attached image.
+    Returns True on success, False on failure.
+    """
+    try:
+        pool.send(build_message(subject, body, [image_path]))
         print(f"[EMAIL] Sent alert email to {ADMIN_EMAIL}")
+        return True
     except Exception as e:
         print(f"[EMAIL ERROR] Failed to send email: {e}")
+        return False
+
+
+def send_alert_digest(alerts: list):
+    """
+    Send several alerts ({"subject", "body", "image_path"} dicts) as one email
+    with every snapshot attached. Returns True on success, False on failure.
+    """
+    if len(alerts) == 1:
+        return send_alert_email(**alerts[0])
+    subject = f"🚨 ALERT DIGEST: {len(alerts)} detections"
+    sections = [f"[{i}] {a['subject']}\n{a['body']}" for i, a in enumerate(alerts, 1)]
+    body = f"{len(alerts)} alerts were raised:\n\n" + "\n\n".join(sections)
+    try:
+        pool.send(build_message(subject, body, [a.get("image_path") for a in alerts]))
+        print(f"[EMAIL] Sent digest of {len(alerts)} alerts to {ADMIN_EMAIL}")
+        return True
+    except Exception as e:
+        print(f"[EMAIL ERROR] Failed to send digest: {e}")
+        return False
@@ -0,0 +1,62 @@
+# backend/app/embedding_codec.py
+"""Compact BSON Binary encoding for face embeddings (EMBEDDING_STORAGE=float32|float16|int8)."""
+
+import os
+import struct
+import numpy as np
+from bson.binary import Binary, USER_DEFINED_SUBTYPE
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "float32").lower()
+
+# Binary layout: byte 0 format code, bytes 1-4 float32 scale (int8 only), then the little-endian vector
+FORMAT_CODES = {"float32": 1, "float16": 2, "int8": 3}
+_DTYPES = {1: np.dtype("<f4"), 2: np.dtype("<f2"), 3: np.dtype("i1")}
+
+
+def encode_embedding(vec, storage: str = None):
+    """Pack an embedding into a Binary for Mongo; None passes through."""
+    if vec is None:
+        return None
+    storage = (storage or EMBEDDING_STORAGE).lower()
+    code = FORMAT_CODES.get(storage)
+    if code is None:
+        raise ValueError(f"unknown EMBEDDING_STORAGE '{storage}'")
+    vec = np.asarray(vec, dtype=np.float32).reshape(-1)
+
+    if code == 3:
+        peak = float(np.max(np.abs(vec))) if vec.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        q = np.clip(np.rint(vec / scale), -127, 127).astype(_DTYPES[3])
+        payload = struct.pack("<Bf", code, scale) + q.tobytes()
+    else:
+        payload = struct.pack("<B", code) + vec.astype(_DTYPES[code]).tobytes()
+    return Binary(payload, USER_DEFINED_SUBTYPE)
+
+
+def decode_embedding(value):
+    """Return a float32 vector from a binary or legacy list embedding, or None."""
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        if len(value) < 2:
+            return None
+        code = value[0]
+        dtype = _DTYPES.get(code)
+        if dtype is None:
+            return None
+        if code == 3:
+            (scale,) = struct.unpack_from("<f", value, 1)
+            return np.frombuffer(value, dtype=dtype, offset=5).astype(np.float32) * np.float32(scale)
+        return np.frombuffer(value, dtype=dtype, offset=1).astype(np.float32)
+    try:
+        return np.asarray(value, dtype=np.float32).reshape(-1)
+    except Exception:
+        return None
+
+
+def is_legacy(value) -> bool:
+    """True for embeddings still stored as a plain list."""
+    return isinstance(value, list)
@@ -0,0 +1,163 @@
+# backend/app/frame_ring.py
+"""Fixed-size ring of preallocated frame slots in shared memory (one writer, pinning readers)."""
+
+import os
+import sys
+import threading
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FRAME_RING_SLOTS = max(2, int(os.getenv("FRAME_RING_SLOTS", "8")))
+
+# block layout: meta 8 x int64 [slots, h, w, c, head_seq, head_slot, 0, 0], seqs slots x int64
+# (-1 while a slot is written), stamps slots x float64, frames slots x H x W x C uint8
+_META = 8 * 8
+_attach_lock = threading.Lock()
+
+
+def attach_shared_memory(name: str):
+    """
+    Open an existing block without registering it with the resource tracker:
+    the creating process owns (and unlinks) it, an attaching process must not.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class FrameRing:
+    def __init__(self, shape: tuple = None, slots: int = FRAME_RING_SLOTS, name: str = None):
+        if name is None:
+            h, w, c = shape
+            frame_bytes = h * w * c
+            data_offset = self._data_offset(slots)
+            self.shm = shared_memory.SharedMemory(create=True, size=data_offset + slots * frame_bytes)
+            meta = np.ndarray((8,), dtype=np.int64, buffer=self.shm.buf)
+            meta[:] = [slots, h, w, c, 0, 0, 0, 0]
+            self.owner = True
+        else:
+            self.shm = attach_shared_memory(name)
+            meta = np.ndarray((8,), dtype=np.int64, buffer=self.shm.buf)
+            slots, h, w, c = (int(v) for v in meta[:4])
+            self.owner = False
+
+        self._lock = threading.Lock()  # writer thread vs. pinning readers in this process
+        self._pins = {}                 # slot -> pin count
+        self._cursor = 0                # next slot the writer tries to claim
+
+        self.meta = meta
+        self.slots = slots
+        self.shape = (h, w, c)
+        self.seqs = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf, offset=_META)
+        self.stamps = np.ndarray((slots,), dtype=np.float64, buffer=self.shm.buf, offset=_META + slots * 8)
+        self.frames = np.ndarray(
+            (slots, h, w, c), dtype=np.uint8, buffer=self.shm.buf, offset=self._data_offset(slots)
+        )
+
+    @staticmethod
+    def _data_offset(slots: int) -> int:
+        return (_META + slots * 16 + 63) // 64 * 64
+
+    @classmethod
+    def attach(cls, name: str):
+        return cls(name=name)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def head(self) -> int:
+        """Sequence number of the newest committed frame (0 = none yet)."""
+        return int(self.meta[4])
+
+    # ---------------- writer ----------------
+    def claim(self):
+        """
+        (slot, view) of the next slot to fill in place, skipping pinned slots
+        and, if possible, the newest frame. Only the single writer calls this.
+        If every slot is pinned the oldest one is reused anyway.
+        """
+        with self._lock:
+            newest = int(self.meta[5]) if self.head else -1
+            order = [(self._cursor + i) % self.slots for i in range(self.slots)]
+            free = [s for s in order if not self._pins.get(s)]
+            slot = next((s for s in free if s != newest), free[0] if free else order[0])
+            self.seqs[slot] = -1
+            return slot, self.frames[slot]
+
+    def commit(self, slot: int, stamp: float):
+        with self._lock:
+            seq = self.head + 1
+            self.stamps[slot] = stamp
+            self.seqs[slot] = seq
+            self.meta[5] = slot
+            self.meta[4] = seq
+            self._cursor = slot + 1
+            return seq
+
+    # ---------------- readers ----------------
+    def latest(self):
+        """(seq, slot, view, stamp) of the newest frame, or None."""
+        with self._lock:
+            seq, slot = self.head, int(self.meta[5])
+            if seq == 0 or self.seqs[slot] != seq:
+                return None
+            return seq, slot, self.frames[slot], float(self.stamps[slot])
+
+    def read(self, slot: int, seq: int = None):
+        """View of `slot`, or None if it no longer holds `seq`."""
+        if seq is not None and self.seqs[slot] != seq:
+            return None
+        return self.frames[slot]
+
+    def is_current(self, slot: int, seq: int) -> bool:
+        return self.seqs[slot] == seq
+
+    def pin(self, slot: int, seq: int) -> bool:
+        """Keep the writer off `slot` until unpin(); False if it no longer holds `seq`."""
+        with self._lock:
+            if self.seqs[slot] != seq:
+                return False
+            self._pins[slot] = self._pins.get(slot, 0) + 1
+            return True
+
+    def unpin(self, slot: int):
+        with self._lock:
+            count = self._pins.get(slot, 0) - 1
+            if count > 0:
+                self._pins[slot] = count
+            else:
+                self._pins.pop(slot, None)
+
+    def close(self):
+        """Drop the name (owner only). The mapping itself lives until the last view is gone."""
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def detach(self):
+        """Unmap an attached ring (non-owner). Views handed out earlier must be gone."""
+        self.meta = self.seqs = self.stamps = self.frames = None
+        self.shm.close()
+
+    def describe(self) -> dict:
+        return {
+            "name": self.name,
+            "slots": self.slots,
+            "shape": list(self.shape),
+            "head": self.head,
+            "pinned": sorted(self._pins),
+        }
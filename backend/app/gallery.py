@@ -0,0 +1,162 @@
+# backend/app/gallery.py
+"""In-memory gallery stores for the recognition loop."""
+
+import time
+import numpy as np
+
+from app.gallery_index import EMBEDDING_DIM, create_index
+from app.embedding_codec import decode_embedding
+
+# only what the gallery needs; keeps full reloads and sync queries small
+GALLERY_PROJECTION = {"_id": 1, "embedding": 1, "name": 1, "note": 1, "reason": 1, "gallery_version": 1}
+
+
+def to_embedding(value):
+    """Convert a stored (binary or legacy list) embedding to a float32 vector, or None."""
+    if isinstance(value, np.ndarray):
+        vec = value.astype(np.float32, copy=False).reshape(-1)
+    else:
+        vec = decode_embedding(value)
+    if vec is None or vec.shape != (EMBEDDING_DIM,):
+        return None
+    return vec
+
+
+class GalleryState:
+    """Index + metadata pair that is only ever replaced as a whole."""
+
+    def __init__(self, index, meta: dict):
+        self.index = index
+        self.meta = meta  # id -> {field: value}
+
+
+class GalleryStore:
+    def __init__(self, label: str, fields: tuple, default_prefix: str):
+        self.label = label                    # for logging, e.g. "known"
+        self.fields = fields                  # metadata kept in memory, e.g. ("name", "note")
+        self.default_prefix = default_prefix  # fallback name prefix, e.g. "User"
+        self._state = GalleryState(create_index(), {})
+        self._journal = None                  # list of pending ops while reloading
+
+    def __len__(self):
+        return len(self._state.index)
+
+    def __contains__(self, item_id):
+        return item_id in self._state.index
+
+    @property
+    def index(self):
+        return self._state.index
+
+    # ---------- reads ----------
+    def search(self, embs, k: int):
+        return self._state.index.search(embs, k)
+
+    def get(self, item_id: str) -> dict:
+        """Metadata for `item_id` with defaults filled in."""
+        meta = self._state.meta.get(item_id, {})
+        info = {f: meta.get(f, "") for f in self.fields}
+        if not info.get("name"):
+            info["name"] = f"{self.default_prefix} {item_id[:4]}"
+        return info
+
+    # ---------- incremental updates ----------
+    def _metadata(self, values: dict) -> dict:
+        return {f: values.get(f) or "" for f in self.fields}
+
+    def _apply(self, state: GalleryState, op: str, item_id: str, vec, meta: dict):
+        if op == "add":
+            # metadata first so a search hit always resolves to a name
+            state.meta[item_id] = meta
+            state.index.add([item_id], vec[None, :])
+        elif op == "update":
+            if item_id not in state.meta:
+                return
+            state.meta[item_id] = {**state.meta[item_id], **meta}
+            if vec is not None:
+                state.index.add([item_id], vec[None, :])
+        elif op == "remove":
+            state.index.remove([item_id])
+            state.meta.pop(item_id, None)
+
+    def _record(self, op: str, item_id: str, vec=None, meta: dict = None):
+        self._apply(self._state, op, item_id, vec, meta)
+        if self._journal is not None:
+            self._journal.append((op, item_id, vec, meta))
+
+    def add(self, item_id: str, embedding, **meta) -> bool:
+        """Insert or replace one person. Returns False if the embedding is unusable."""
+        vec = to_embedding(embedding)
+        if vec is None:
+            return False
+        self._record("add", item_id, vec, self._metadata(meta))
+        return True
+
+    def update(self, item_id: str, embedding=None, **meta) -> bool:
+        """Update metadata (and optionally the embedding) of an indexed person."""
+        vec = None
+        if embedding is not None:
+            vec = to_embedding(embedding)
+            if vec is None:
+                return False
+        meta = {f: v for f, v in meta.items() if f in self.fields}
+        if item_id not in self._state.meta and self._journal is None:
+            # during a reload the id may only exist in the state being built
+            return False
+        self._record("update", item_id, vec, meta)
+        return True
+
+    def remove(self, item_id: str):
+        self._record("remove", item_id)
+
+    def add_document(self, doc: dict) -> bool:
+        """Index a raw Mongo document; drops it from the gallery if it has no usable embedding."""
+        item_id = str(doc["_id"])
+        meta = {f: doc.get(f) for f in self.fields}
+        if self.add(item_id, doc.get("embedding"), **meta):
+            return True
+        if item_id in self._state.meta:
+            self.remove(item_id)
+        return False
+
+    # ---------- snapshots ----------
+    def export(self):
+        """(ids, normalised matrix, metadata) copy of the current state."""
+        state = self._state
+        ids, matrix = state.index.export()
+        return ids, matrix, {item_id: dict(state.meta.get(item_id, {})) for item_id in ids}
+
+    def adopt(self, ids: list, matrix: np.ndarray, meta: dict):
+        """Swap in a gallery built from a snapshot matrix (adopted without copying)."""
+        index = create_index()
+        index.adopt(ids, matrix)
+        self._state = GalleryState(index, meta)
+
+    # ---------- full reload (recovery) ----------
+    async def reload(self, cursor):
+        """Rebuild the gallery from a Mongo cursor and swap it in atomically."""
+        started = time.perf_counter()
+        self._journal = []
+        try:
+            ids, vectors, meta = [], [], {}
+            async for doc in cursor:
+                vec = to_embedding(doc.get("embedding"))
+                if vec is None:
+                    continue
+                item_id = str(doc["_id"])
+                ids.append(item_id)
+                vectors.append(vec)
+                meta[item_id] = self._metadata(doc)
+
+            index = create_index(capacity=max(len(ids), 1024))
+            if ids:
+                index.add(ids, np.stack(vectors))
+            state = GalleryState(index, meta)
+            for op, item_id, vec, op_meta in self._journal:
+                self._apply(state, op, item_id, vec, op_meta)
+            self._state = state
+        finally:
+            self._journal = None
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"[gallery] loaded {len(self)} {self.label} embeddings in {elapsed:.0f} ms")
+        return len(self)
@@ -0,0 +1,383 @@
+# backend/app/gallery_index.py
+"""Nearest-neighbour indexes over face embeddings (exact and IVF)."""
+
+import os
+import threading
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBEDDING_DIM = 512
+GALLERY_INDEX = os.getenv("GALLERY_INDEX", "flat").lower()
+IVF_NLIST = int(os.getenv("IVF_NLIST", "256"))              # number of buckets
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))              # buckets scanned per query (recall vs latency)
+IVF_TRAIN_MIN = int(os.getenv("IVF_TRAIN_MIN", "10000"))    # exact scan below this gallery size
+IVF_TRAIN_SAMPLE = int(os.getenv("IVF_TRAIN_SAMPLE", "50000"))
+IVF_TRAIN_ITERS = int(os.getenv("IVF_TRAIN_ITERS", "10"))
+IVF_RETRAIN_FACTOR = float(os.getenv("IVF_RETRAIN_FACTOR", "4"))
+
+
+# ===================================================
+# Helpers
+# ===================================================
+def normalize_rows(vectors) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def similarity_to_distance(sims):
+    """||a - b|| for unit vectors a, b given their cosine similarity."""
+    return np.sqrt(np.clip(2.0 - 2.0 * sims, 0.0, None))
+
+
+def top_k(sims: np.ndarray, k: int):
+    """Column indices and values of the k largest entries per row, sorted descending."""
+    n = sims.shape[1]
+    k = min(k, n)
+    if k < n:
+        idx = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(n), sims.shape)
+    vals = np.take_along_axis(sims, idx, axis=1)
+    order = np.argsort(-vals, axis=1)
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(vals, order, axis=1)
+
+
+# ===================================================
+# Exact Index
+# ===================================================
+class FlatIndex:
+    """Exact index: brute-force cosine scan over a growable contiguous matrix."""
+
+    kind = "flat"
+
+    def __init__(self, dim: int = EMBEDDING_DIM, capacity: int = 1024):
+        self.dim = dim
+        self._vectors = np.empty((max(capacity, 1), dim), dtype=np.float32)
+        self._ids = np.empty((max(capacity, 1),), dtype=object)
+        self._rows: dict = {}  # id -> row
+        self._size = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, item_id):
+        return item_id in self._rows
+
+    def ids(self) -> list:
+        with self._lock:
+            return list(self._ids[: self._size])
+
+    def vector(self, item_id):
+        with self._lock:
+            row = self._rows.get(item_id)
+            return None if row is None else self._vectors[row].copy()
+
+    # ---------- mutation ----------
+    def _reserve(self, size: int):
+        capacity = self._vectors.shape[0]
+        if size <= capacity:
+            return
+        capacity = max(capacity, 1)
+        while capacity < size:
+            capacity *= 2
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        vectors[: self._size] = self._vectors[: self._size]
+        ids = np.empty((capacity,), dtype=object)
+        ids[: self._size] = self._ids[: self._size]
+        self._vectors, self._ids = vectors, ids
+
+    def add(self, ids: list, vectors):
+        """Insert or overwrite embeddings by id."""
+        if len(ids) == 0:
+            return
+        vectors = normalize_rows(vectors)
+        if vectors.shape != (len(ids), self.dim):
+            raise ValueError(f"expected {len(ids)} x {self.dim} vectors, got {vectors.shape}")
+
+        with self._lock:
+            # last write wins for duplicate ids within one call
+            latest = {item_id: i for i, item_id in enumerate(ids)}
+            new_ids = [item_id for item_id in latest if item_id not in self._rows]
+            old_ids = [item_id for item_id in latest if item_id in self._rows]
+
+            if old_ids:
+                rows = np.array([self._rows[item_id] for item_id in old_ids], dtype=np.int64)
+                self._vectors[rows] = vectors[[latest[item_id] for item_id in old_ids]]
+                self._rows_updated(rows)
+
+            if new_ids:
+                start = self._size
+                self._reserve(start + len(new_ids))
+                end = start + len(new_ids)
+                self._vectors[start:end] = vectors[[latest[item_id] for item_id in new_ids]]
+                for offset, item_id in enumerate(new_ids):
+                    self._ids[start + offset] = item_id
+                    self._rows[item_id] = start + offset
+                self._size = end
+                self._rows_added(np.arange(start, end))
+
+    def remove(self, ids: list) -> int:
+        """Remove embeddings by id (swap-with-last, O(1) per id). Returns count removed."""
+        removed = 0
+        with self._lock:
+            for item_id in ids:
+                row = self._rows.pop(item_id, None)
+                if row is None:
+                    continue
+                last = self._size - 1
+                self._row_removed(row)
+                if row != last:
+                    moved_id = self._ids[last]
+                    self._vectors[row] = self._vectors[last]
+                    self._ids[row] = moved_id
+                    self._rows[moved_id] = row
+                    self._row_moved(last, row)
+                self._ids[last] = None
+                self._size = last
+                removed += 1
+        return removed
+
+    def adopt(self, ids: list, matrix: np.ndarray):
+        """
+        Take over an already-normalised N x dim matrix without copying it, e.g. a
+        copy-on-write memory map of a gallery snapshot. Rows are only copied into
+        RAM when the gallery later grows past N.
+        """
+        if matrix.shape != (len(ids), self.dim):
+            raise ValueError(f"expected {len(ids)} x {self.dim} matrix, got {matrix.shape}")
+        with self._lock:
+            n = len(ids)
+            self._vectors = matrix
+            self._ids = np.empty((max(n, 1),), dtype=object)
+            self._ids[:n] = ids
+            self._rows = {item_id: row for row, item_id in enumerate(ids)}
+            self._size = n
+            self._rows_added(np.arange(n))
+
+    def export(self):
+        """Copy of (ids, N x dim normalised matrix), e.g. for writing a snapshot."""
+        with self._lock:
+            return list(self._ids[: self._size]), np.array(self._vectors[: self._size])
+
+    # hooks for subclasses that keep per-row bookkeeping
+    def _rows_added(self, rows: np.ndarray):
+        pass
+
+    def _rows_updated(self, rows: np.ndarray):
+        pass
+
+    def _row_removed(self, row: int):
+        pass
+
+    def _row_moved(self, src: int, dst: int):
+        pass
+
+    # ---------- search ----------
+    def _format(self, rows: np.ndarray, sims: np.ndarray) -> list:
+        dists = similarity_to_distance(sims)
+        return [(self._ids[r], float(d)) for r, d in zip(rows, dists)]
+
+    def search(self, embs, k: int):
+        """
+        Match every row of `embs` (F x dim, normed) against the gallery.
+        Returns, per query, up to k (id, distance) pairs by ascending distance.
+        """
+        embs = normalize_rows(embs)
+        with self._lock:
+            if self._size == 0 or embs.shape[0] == 0 or k <= 0:
+                return [[] for _ in range(embs.shape[0])]
+            sims = embs @ self._vectors[: self._size].T
+            rows, vals = top_k(sims, k)
+            return [self._format(r, v) for r, v in zip(rows, vals)]
+
+    def describe(self) -> dict:
+        return {"kind": self.kind, "size": self._size, "capacity": self._vectors.shape[0]}
+
+
+# ===================================================
+# Approximate Index (IVF)
+# ===================================================
+def train_centroids(data: np.ndarray, nlist: int, iters: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on unit vectors; returns nlist x dim unit centroids."""
+    rng = np.random.default_rng(seed)
+    nlist = min(nlist, data.shape[0])
+    centroids = data[rng.choice(data.shape[0], nlist, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(data @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = counts == 0
+        if empty.any():
+            # re-seed dead buckets on random points
+            sums[empty] = data[rng.choice(data.shape[0], int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex(FlatIndex):
+    """
+    Inverted-file index. Tuning knobs:
+      nlist        - number of buckets; more buckets = fewer vectors scanned per probe
+      nprobe       - buckets scanned per query; raise for recall, lower for latency
+      train_min    - galleries smaller than this are searched exactly
+      train_sample - vectors used for k-means training
+    New vectors are assigned to the nearest existing bucket; the quantizer is
+    retrained once the gallery has grown by `retrain_factor` since the last training.
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        dim: int = EMBEDDING_DIM,
+        capacity: int = 1024,
+        nlist: int = IVF_NLIST,
+        nprobe: int = IVF_NPROBE,
+        train_min: int = IVF_TRAIN_MIN,
+        train_sample: int = IVF_TRAIN_SAMPLE,
+        train_iters: int = IVF_TRAIN_ITERS,
+        retrain_factor: float = IVF_RETRAIN_FACTOR,
+    ):
+        super().__init__(dim, capacity)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_min = max(train_min, nlist)
+        self.train_sample = train_sample
+        self.train_iters = train_iters
+        self.retrain_factor = retrain_factor
+        self._centroids = None
+        self._trained_size = 0
+        self._assign = np.empty((self._vectors.shape[0],), dtype=np.int32)
+        self._lists: list = []
+        self._list_rows: dict = {}  # bucket -> cached np.ndarray of rows
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def _reserve(self, size: int):
+        super()._reserve(size)
+        if self._assign.shape[0] < self._vectors.shape[0]:
+            assign = np.empty((self._vectors.shape[0],), dtype=np.int32)
+            assign[: self._size] = self._assign[: self._size]
+            self._assign = assign
+
+    def train(self):
+        """(Re)train the coarse quantizer on the current gallery and re-bucket every row."""
+        with self._lock:
+            if self._size < self.nlist:
+                return
+            data = self._vectors[: self._size]
+            if self._size > self.train_sample:
+                rng = np.random.default_rng(self._size)
+                data = data[rng.choice(self._size, self.train_sample, replace=False)]
+            self._centroids = train_centroids(data, self.nlist, self.train_iters)
+            self._trained_size = self._size
+            self._lists = [set() for _ in range(self._centroids.shape[0])]
+            self._list_rows = {}
+            self._assign_rows(np.arange(self._size))
+
+    def adopt(self, ids: list, matrix: np.ndarray):
+        with self._lock:
+            self._centroids = None
+            self._trained_size = 0
+            self._lists, self._list_rows = [], {}
+            self._assign = np.empty((max(len(ids), 1),), dtype=np.int32)
+            super().adopt(ids, matrix)
+
+    def _assign_rows(self, rows: np.ndarray):
+        buckets = np.argmax(self._vectors[rows] @ self._centroids.T, axis=1).astype(np.int32)
+        for row, bucket in zip(rows.tolist(), buckets.tolist()):
+            self._lists[bucket].add(row)
+            self._list_rows.pop(bucket, None)
+        self._assign[rows] = buckets
+
+    def _maybe_train(self) -> bool:
+        if not self.trained:
+            if self._size >= self.train_min:
+                self.train()
+                return True
+        elif self._size >= self.retrain_factor * self._trained_size:
+            self.train()
+            return True
+        return False
+
+    def _rows_added(self, rows):
+        if self._maybe_train() or not self.trained:
+            return
+        self._assign_rows(rows)
+
+    def _rows_updated(self, rows):
+        if not self.trained:
+            return
+        for row, bucket in zip(rows.tolist(), self._assign[rows].tolist()):
+            self._lists[bucket].discard(row)
+            self._list_rows.pop(bucket, None)
+        self._assign_rows(rows)
+
+    def _row_removed(self, row):
+        if self.trained:
+            bucket = int(self._assign[row])
+            self._lists[bucket].discard(row)
+            self._list_rows.pop(bucket, None)
+
+    def _row_moved(self, src, dst):
+        if self.trained:
+            bucket = int(self._assign[src])
+            self._lists[bucket].discard(src)
+            self._lists[bucket].add(dst)
+            self._list_rows.pop(bucket, None)
+            self._assign[dst] = bucket
+
+    def _bucket_rows(self, bucket: int) -> np.ndarray:
+        rows = self._list_rows.get(bucket)
+        if rows is None:
+            rows = np.fromiter(self._lists[bucket], dtype=np.int64, count=len(self._lists[bucket]))
+            self._list_rows[bucket] = rows
+        return rows
+
+    def search(self, embs, k: int):
+        embs = normalize_rows(embs)
+        with self._lock:
+            if not self.trained or self._size < self.train_min:
+                return super().search(embs, k)
+            if embs.shape[0] == 0 or k <= 0:
+                return [[] for _ in range(embs.shape[0])]
+
+            nprobe = min(self.nprobe, self._centroids.shape[0])
+            probes, _ = top_k(embs @ self._centroids.T, nprobe)
+            results = []
+            for q, buckets in zip(embs, probes):
+                rows = np.concatenate([self._bucket_rows(int(b)) for b in buckets])
+                if rows.size == 0:
+                    results.append([])
+                    continue
+                sims = (self._vectors[rows] @ q)[None, :]
+                cols, vals = top_k(sims, k)
+                results.append(self._format(rows[cols[0]], vals[0]))
+            return results
+
+    def describe(self) -> dict:
+        info = super().describe()
+        info.update({
+            "trained": self.trained,
+            "nlist": 0 if self._centroids is None else self._centroids.shape[0],
+            "nprobe": self.nprobe,
+            "trained_size": self._trained_size,
+        })
+        return info
+
+
+def create_index(kind: str = None, capacity: int = 1024):
+    """Build an empty index of the configured backend."""
+    kind = (kind or GALLERY_INDEX).lower()
+    if kind == "flat":
+        return FlatIndex(capacity=capacity)
+    if kind == "ivf":
+        return IVFIndex(capacity=capacity)
+    raise ValueError(f"unknown GALLERY_INDEX '{kind}' (expected 'flat' or 'ivf')")
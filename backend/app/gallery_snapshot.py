@@ -0,0 +1,168 @@
+# backend/app/gallery_snapshot.py
+"""Versioned on-disk gallery snapshots for fast cold starts."""
+
+import os
+import json
+import time
+import asyncio
+import datetime
+import numpy as np
+from dotenv import load_dotenv
+
+from app import gallery_sync
+
+load_dotenv()
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+GALLERY_SNAPSHOT_DIR = os.getenv("GALLERY_SNAPSHOT_DIR", os.path.join(BASE_DIR, "gallery_snapshots"))
+GALLERY_SNAPSHOT_INTERVAL = float(os.getenv("GALLERY_SNAPSHOT_INTERVAL", "300"))
+GALLERY_SNAPSHOT_KEEP = int(os.getenv("GALLERY_SNAPSHOT_KEEP", "2"))
+MANIFEST = "manifest.json"
+
+
+def _galleries():
+    from app import recognition
+    return {"known": recognition.known_gallery, "bad": recognition.bad_gallery}
+
+
+# ===================================================
+# Writing
+# ===================================================
+def _write_json(path: str, payload: dict):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+def write_snapshot(version: int, exports: dict) -> str:
+    """Write {label: (ids, matrix, meta)} to disk and flip the manifest. Blocking."""
+    os.makedirs(GALLERY_SNAPSHOT_DIR, exist_ok=True)
+    manifest = {
+        "version": version,
+        "created_at": datetime.datetime.utcnow().isoformat(),
+        "galleries": {},
+    }
+    for label, (ids, matrix, meta) in exports.items():
+        stem = f"{label}-v{version}-{os.getpid()}"
+        npy_path = os.path.join(GALLERY_SNAPSHOT_DIR, f"{stem}.npy")
+        with open(f"{npy_path}.tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+        os.replace(f"{npy_path}.tmp", npy_path)
+        _write_json(os.path.join(GALLERY_SNAPSHOT_DIR, f"{stem}.json"), {"ids": ids, "meta": meta})
+        manifest["galleries"][label] = stem
+
+    _write_json(os.path.join(GALLERY_SNAPSHOT_DIR, MANIFEST), manifest)
+    _prune(manifest)
+    return GALLERY_SNAPSHOT_DIR
+
+
+def _prune(manifest: dict):
+    """Drop all but the newest GALLERY_SNAPSHOT_KEEP snapshot files per gallery."""
+    for label in manifest["galleries"]:
+        files = [
+            f for f in os.listdir(GALLERY_SNAPSHOT_DIR)
+            if f.startswith(f"{label}-v") and f.endswith(".npy")
+        ]
+        files.sort(key=lambda f: os.path.getmtime(os.path.join(GALLERY_SNAPSHOT_DIR, f)), reverse=True)
+        for old in files[GALLERY_SNAPSHOT_KEEP:]:
+            stem = old[: -len(".npy")]
+            if stem == manifest["galleries"][label]:
+                continue
+            for ext in (".npy", ".json"):
+                try:
+                    os.remove(os.path.join(GALLERY_SNAPSHOT_DIR, stem + ext))
+                except OSError:
+                    pass
+
+
+async def save_snapshot(version: int = None):
+    """
+    Export the in-memory galleries and write them in a worker thread.
+    `version` must have been read before the galleries were loaded; by default
+    the current version is read now, which is only safe for galleries that
+    are already being kept in sync.
+    """
+    started = time.perf_counter()
+    if version is None:
+        version = await gallery_sync.current_version()
+    exports = {label: g.export() for label, g in _galleries().items()}
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, write_snapshot, version, exports)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"[gallery_snapshot] wrote snapshot v{version} in {elapsed:.0f} ms")
+    return version
+
+
+# ===================================================
+# Reading
+# ===================================================
+def read_snapshot():
+    """Open the current snapshot as memory maps. Returns (version, created_at, {label: (ids, matrix, meta)}) or None."""
+    manifest_path = os.path.join(GALLERY_SNAPSHOT_DIR, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    galleries = {}
+    for label, stem in manifest["galleries"].items():
+        with open(os.path.join(GALLERY_SNAPSHOT_DIR, f"{stem}.json"), encoding="utf-8") as f:
+            payload = json.load(f)
+        # "c" = copy-on-write: zero-copy reads, private pages only for rows we later modify
+        matrix = np.load(os.path.join(GALLERY_SNAPSHOT_DIR, f"{stem}.npy"), mmap_mode="c")
+        galleries[label] = (payload["ids"], matrix, payload["meta"])
+    created_at = datetime.datetime.fromisoformat(manifest["created_at"])
+    return manifest["version"], created_at, galleries
+
+
+async def load_snapshot():
+    """
+    Adopt the on-disk snapshot into the galleries and apply the Mongo deltas since
+    its version. Returns the version the deltas were read up to, or None if a
+    full reload is needed.
+    """
+    started = time.perf_counter()
+    try:
+        snapshot = read_snapshot()
+    except Exception as e:
+        print("[gallery_snapshot] could not read snapshot:", e)
+        return None
+    if snapshot is None:
+        return None
+
+    version, created_at, exports = snapshot
+    age = (datetime.datetime.utcnow() - created_at).total_seconds()
+    if age > gallery_sync.TOMBSTONE_TTL_SECONDS:
+        # deletes older than the tombstone TTL can no longer be replayed
+        print(f"[gallery_snapshot] snapshot v{version} is too old ({age:.0f}s), ignoring")
+        return None
+
+    galleries = _galleries()
+    if set(exports) != set(galleries):
+        return None
+    for label, (ids, matrix, meta) in exports.items():
+        galleries[label].adopt(ids, matrix, meta)
+
+    head = await gallery_sync.poll_once(version)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(
+        f"[gallery_snapshot] loaded snapshot v{version} "
+        f"({len(galleries['known'])} known, {len(galleries['bad'])} bad), "
+        f"caught up to v{head} in {elapsed:.0f} ms"
+    )
+    return head
+
+
+async def run_snapshot_writer():
+    """Periodically persist the galleries when the gallery version has moved."""
+    if GALLERY_SNAPSHOT_INTERVAL <= 0:
+        return
+    written = None
+    while True:
+        await asyncio.sleep(GALLERY_SNAPSHOT_INTERVAL)
+        try:
+            if await gallery_sync.current_version() != written:
+                written = await save_snapshot()
+        except Exception as e:
+            print("[gallery_snapshot] write failed:", e)
@@ -0,0 +1,186 @@
+# backend/app/gallery_sync.py
+"""Keeps the in-memory galleries in sync with Mongo (change streams or version polling)."""
+
+import os
+import asyncio
+import datetime
+from dotenv import load_dotenv
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.db import db
+from app.gallery import GALLERY_PROJECTION
+from app import gallery_version
+
+load_dotenv()
+
+GALLERY_SYNC = os.getenv("GALLERY_SYNC", "auto").lower()
+GALLERY_SYNC_INTERVAL = float(os.getenv("GALLERY_SYNC_INTERVAL", "2"))
+GALLERY_SYNC_OVERLAP = int(os.getenv("GALLERY_SYNC_OVERLAP", "100"))
+TOMBSTONE_TTL_SECONDS = int(os.getenv("GALLERY_TOMBSTONE_TTL", str(7 * 24 * 3600)))
+
+sync_state = {
+    "mode": None,
+    "applied_version": 0,
+    "events_applied": 0,
+    "last_event_at": None,
+}
+
+
+# ===================================================
+# Version Counter (writers)
+# ===================================================
+async def next_version() -> int:
+    """Allocate the next gallery version; stamp it on every users/bad_people write."""
+    return await gallery_version.next_version(db)
+
+
+async def current_version() -> int:
+    return await gallery_version.current_version(db)
+
+
+async def record_delete(collection: str, item_id: str):
+    """Leave a tombstone so polling nodes can drop `item_id` from their gallery."""
+    await db.gallery_tombstones.insert_one({
+        "collection": collection,
+        "item_id": item_id,
+        "gallery_version": await next_version(),
+        "deleted_at": datetime.datetime.utcnow(),
+    })
+
+
+# ===================================================
+# Applying Deltas
+# ===================================================
+def _galleries():
+    from app import recognition
+    return {"users": recognition.known_gallery, "bad_people": recognition.bad_gallery}
+
+
+def _mark_applied(version=None):
+    sync_state["events_applied"] += 1
+    sync_state["last_event_at"] = datetime.datetime.utcnow().isoformat()
+    if version:
+        sync_state["applied_version"] = max(sync_state["applied_version"], version)
+
+
+def apply_change(collection: str, change: dict):
+    """Apply one change-stream event to the matching gallery."""
+    gallery = _galleries()[collection]
+    op = change.get("operationType")
+    if op in ("insert", "replace", "update"):
+        doc = change.get("fullDocument")
+        if doc is None:  # deleted before the lookup ran; the delete event follows
+            return
+        gallery.add_document(doc)
+        _mark_applied(doc.get("gallery_version"))
+    elif op == "delete":
+        gallery.remove(str(change["documentKey"]["_id"]))
+        _mark_applied()
+
+
+# ===================================================
+# Change Stream Mode
+# ===================================================
+async def _watch(collection: str):
+    resume_token = None
+    while True:
+        try:
+            async with db[collection].watch(
+                full_document="updateLookup",
+                resume_after=resume_token,
+            ) as stream:
+                async for change in stream:
+                    apply_change(collection, change)
+                    resume_token = stream.resume_token
+        except OperationFailure:
+            raise
+        except PyMongoError as e:
+            print(f"[gallery_sync] {collection} change stream interrupted: {e}")
+            await asyncio.sleep(1)
+
+
+async def _supports_change_streams() -> bool:
+    try:
+        async with db.users.watch(max_await_time_ms=1) as stream:
+            await stream.try_next()  # forces the aggregate; fails on standalone servers
+            return True
+    except OperationFailure as e:
+        print(f"[gallery_sync] change streams unavailable ({e.code}), falling back to polling")
+        return False
+
+
+# ===================================================
+# Polling Mode
+# ===================================================
+async def poll_once(since: int) -> int:
+    """
+    Apply every gallery change with version > since; returns the new high-water mark.
+    The overlap window is re-read even when the counter has not moved: a version
+    can be allocated before its document is written.
+    """
+    head = max(since, await current_version())
+    floor = max(0, since - GALLERY_SYNC_OVERLAP)
+    galleries = _galleries()
+
+    for collection, gallery in galleries.items():
+        cursor = db[collection].find({"gallery_version": {"$gt": floor}}, GALLERY_PROJECTION)
+        async for doc in cursor:
+            gallery.add_document(doc)
+            _mark_applied(doc.get("gallery_version"))
+
+    cursor = db.gallery_tombstones.find({"gallery_version": {"$gt": floor}})
+    async for tomb in cursor:
+        gallery = galleries.get(tomb["collection"])
+        if gallery is not None:
+            gallery.remove(tomb["item_id"])
+            _mark_applied(tomb["gallery_version"])
+
+    sync_state["applied_version"] = head
+    return head
+
+
+async def _poll_forever(since: int):
+    while True:
+        await asyncio.sleep(GALLERY_SYNC_INTERVAL)
+        try:
+            since = await poll_once(since)
+        except PyMongoError as e:
+            print("[gallery_sync] poll failed:", e)
+
+
+# ===================================================
+# Entry Point
+# ===================================================
+async def run_gallery_sync():
+    """Long-running task: keep this process's galleries in sync with Mongo."""
+    if GALLERY_SYNC == "off":
+        return
+    try:
+        await db.gallery_tombstones.create_index("deleted_at", expireAfterSeconds=TOMBSTONE_TTL_SECONDS)
+    except PyMongoError as e:
+        print("[gallery_sync] could not create tombstone TTL index:", e)
+
+    # start from the version the boot-time snapshot/full load is complete up to
+    from app import recognition
+    await recognition.galleries_ready.wait()
+    since = recognition.galleries_version
+
+    use_stream = GALLERY_SYNC == "change_stream" or (
+        GALLERY_SYNC == "auto" and await _supports_change_streams()
+    )
+    if use_stream:
+        sync_state["mode"] = "change_stream"
+        print("[gallery_sync] following users/bad_people change streams")
+        watchers = asyncio.gather(_watch("users"), _watch("bad_people"))
+        # close the gap between the boot load and the streams opening
+        await asyncio.sleep(1)
+        await poll_once(since)
+        try:
+            await watchers
+            return
+        except OperationFailure as e:
+            print("[gallery_sync] change stream failed, falling back to polling:", e)
+
+    sync_state["mode"] = "poll"
+    print(f"[gallery_sync] polling gallery version every {GALLERY_SYNC_INTERVAL}s")
+    await _poll_forever(since)
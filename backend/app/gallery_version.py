@@ -0,0 +1,31 @@
+# backend/app/gallery_version.py
+"""Gallery version counter shared by the backend (motor) and the seed scripts (pymongo)."""
+
+from pymongo import ReturnDocument
+
+COUNTERS = "counters"
+COUNTER_ID = "gallery_version"
+
+
+def _increment(database):
+    return database[COUNTERS].find_one_and_update(
+        {"_id": COUNTER_ID},
+        {"$inc": {"seq": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def next_version_sync(database) -> int:
+    """Allocate the next version on a pymongo database."""
+    return _increment(database)["seq"]
+
+
+async def next_version(database) -> int:
+    """Allocate the next version on a motor database."""
+    return (await _increment(database))["seq"]
+
+
+async def current_version(database) -> int:
+    doc = await database[COUNTERS].find_one({"_id": COUNTER_ID})
+    return doc["seq"] if doc else 0
@@ -0,0 +1,160 @@
+# backend/app/inference.py
+"""Batched face detection and embedding."""
+
+import os
+import time
+import asyncio
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REC_BATCH_SIZE = int(os.getenv("REC_BATCH_SIZE", "32"))
+INFER_MAX_BATCH = int(os.getenv("INFER_MAX_BATCH", "8"))
+INFER_DEADLINE_MS = float(os.getenv("INFER_DEADLINE_MS", "10"))
+
+
+# ===================================================
+# Batched Detection + Recognition
+# ===================================================
+def detect_faces(model, img):
+    """Run only the detector. Returns (bboxes N x 5, kpss N x 5 x 2 or None)."""
+    return model.det_model.detect(img, max_num=0, metric="default")
+
+
+def embed_crops(rec_model, crops: list) -> np.ndarray:
+    """Embed aligned face crops in batches of REC_BATCH_SIZE; returns M x 512."""
+    if not crops:
+        return np.empty((0, 512), dtype=np.float32)
+    feats = [
+        rec_model.get_feat(crops[i : i + REC_BATCH_SIZE])
+        for i in range(0, len(crops), REC_BATCH_SIZE)
+    ]
+    return np.concatenate(feats, axis=0).astype(np.float32)
+
+
+def detect_frames(model, frames: list) -> list:
+    """Detector only: per-frame lists of Face(bbox, kps, det_score) without embeddings."""
+    from insightface.app.common import Face
+
+    results = []
+    for img in frames:
+        bboxes, kpss = detect_faces(model, img)
+        if kpss is None:
+            # faces without landmarks cannot be aligned/embedded; drop them like FaceAnalysis would
+            results.append([])
+            continue
+        results.append([
+            Face(bbox=bboxes[i, 0:4], kps=kpss[i], det_score=bboxes[i, 4])
+            for i in range(bboxes.shape[0])
+        ])
+    return results
+
+
+def align_faces(items: list, scales: list = None, crop_size: int = 112) -> list:
+    """
+    Aligned recognition crops for (frame, face) pairs. `scales` (one per item) maps
+    face.kps into the frame's pixels when the face was detected on a resized copy.
+    """
+    from insightface.utils import face_align
+
+    scales = scales or [1.0] * len(items)
+    return [
+        face_align.norm_crop(img, landmark=face.kps * scale, image_size=crop_size)
+        for (img, face), scale in zip(items, scales)
+    ]
+
+
+def embed_faces(model, items: list, scales: list = None):
+    """Align and embed (frame, face) pairs in one batched call; sets face.embedding in place."""
+    rec_model = model.models["recognition"]
+    crops = align_faces(items, scales, rec_model.input_size[0])
+    for (_, face), feat in zip(items, embed_crops(rec_model, crops)):
+        face.embedding = feat
+
+
+def analyze_frames(model, frames: list) -> list:
+    """Detect faces in every frame, then embed all of them in one batched call."""
+    results = detect_frames(model, frames)
+    embed_faces(model, [(img, face) for img, faces in zip(frames, results) for face in faces])
+    return results
+
+
+# ===================================================
+# Micro-Batcher
+# ===================================================
+class InferenceBatcher:
+    def __init__(self, analyze, max_batch: int = INFER_MAX_BATCH, deadline_ms: float = INFER_DEADLINE_MS):
+        self.analyze = analyze  # callable(list of items) -> list of per-item results (blocking)
+        self.max_batch = max_batch
+        self.deadline = deadline_ms / 1000.0
+        self.stats = {"batches": 0, "frames": 0, "avg_batch": 0.0, "avg_ms": 0.0}
+        self._queue: asyncio.Queue = None
+        self._task = None
+
+    def _ensure_started(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._collect())
+
+    async def submit(self, frame):
+        """Analyze one frame as part of the next micro-batch."""
+        self._ensure_started()
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((frame, fut, False))
+        return await fut
+
+    async def infer_many(self, frames: list) -> list:
+        """Analyze a ready-made batch (e.g. one frame per camera) without waiting on the deadline."""
+        if not frames:
+            return []
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        futs = []
+        for i, frame in enumerate(frames):
+            fut = loop.create_future()
+            futs.append(fut)
+            await self._queue.put((frame, fut, i == len(frames) - 1))
+        return await asyncio.gather(*futs)
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.deadline
+            while len(batch) < self.max_batch and not batch[-1][2]:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._run(batch)
+
+    async def _run(self, batch: list):
+        loop = asyncio.get_running_loop()
+        frames = [frame for frame, _, _ in batch]
+        started = time.perf_counter()
+        try:
+            results = await loop.run_in_executor(None, self.analyze, frames)
+        except Exception as e:
+            for _, fut, _ in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (_, fut, _), res in zip(batch, results):
+            if not fut.done():
+                fut.set_result(res)
+
+        elapsed = (time.perf_counter() - started) * 1000
+        s = self.stats
+        s["batches"] += 1
+        s["frames"] += len(frames)
+        s["avg_batch"] = s["frames"] / s["batches"]
+        s["avg_ms"] = elapsed if s["batches"] == 1 else 0.9 * s["avg_ms"] + 0.1 * elapsed
@@ -0,0 +1,328 @@
+# backend/app/inference_workers.py
+"""Optional process-pool inference (INFERENCE_WORKERS > 0)."""
+
+import os
+import time
+import queue
+import itertools
+import threading
+import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "30"))
+INFERENCE_SHM_MB = int(os.getenv("INFERENCE_SHM_MB", "32"))
+INFERENCE_START_TIMEOUT = float(os.getenv("INFERENCE_START_TIMEOUT", "300"))
+INFERENCE_RING_IDLE = float(os.getenv("INFERENCE_RING_IDLE", "10"))  # detach rings unused this long (s)
+
+
+# ===================================================
+# Shared-Memory Arena
+# ===================================================
+def unpack(shm, specs: list) -> list:
+    """ndarray views into `shm` for [(offset, shape, dtype), ...]."""
+    return [np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset) for offset, shape, dtype in specs]
+
+
+class SharedArena:
+    """A parent-owned shared-memory block reused for every task of one worker."""
+
+    def __init__(self, size: int):
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+
+    def pack(self, arrays: list):
+        """Copy arrays into the arena (growing it if needed); returns (name, specs)."""
+        specs, offset = [], 0
+        for a in arrays:
+            specs.append((offset, a.shape, a.dtype.str))
+            offset += (a.nbytes + 63) // 64 * 64
+        if offset > self.shm.size:
+            self.close()
+            self.shm = shared_memory.SharedMemory(create=True, size=max(offset, self.shm.size * 2))
+        for a, view in zip(arrays, unpack(self.shm, specs)):
+            view[...] = a
+        return self.shm.name, specs
+
+    def close(self):
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# ===================================================
+# Worker Process
+# ===================================================
+def _worker_main(worker_id: int, tasks, results, threads: int):
+    for key in ("ORT_DET_INTRA_THREADS", "ORT_REC_INTRA_THREADS"):
+        os.environ.setdefault(key, str(threads))
+
+    from app.model_pipeline import build_pipeline
+    from app.detection_policy import detect_job
+    from app.inference import embed_crops
+    from app.frame_ring import FrameRing, attach_shared_memory
+
+    model = build_pipeline()
+    rec_model = model.models["recognition"]
+    results.put(("ready", None, rec_model.input_size[0]))
+    print(f"[inference_workers] worker {worker_id} ready (pid {os.getpid()}, {threads} threads)")
+
+    shm = None
+    rings = {}  # ring name -> [FrameRing, last used]
+
+    def ring_frame(ref):
+        name, slot, seq = ref
+        if name not in rings:
+            rings[name] = [FrameRing.attach(name), 0.0]
+        entry = rings[name]
+        entry[1] = time.monotonic()
+        return entry[0], entry[0].read(slot, seq)
+
+    def detach_idle_rings():
+        # a replaced camera ring is never referenced again: unmap it
+        now = time.monotonic()
+        for name, (ring, used) in list(rings.items()):
+            if now - used > INFERENCE_RING_IDLE:
+                del rings[name]
+                ring.detach()
+
+    def detect(payload, arrays):
+        out = []
+        for job in payload:
+            if job.get("frame_ref"):
+                # read the camera's frame rings in place; the parent pins the slot for the
+                # whole iteration, the seq check only guards against a ring replaced meanwhile
+                ring, frame = ring_frame(job["frame_ref"])
+                _, display = ring_frame(job["display_ref"])
+                job = dict(job, frame=frame, display=display)
+                faces = detect_job(model, job) if frame is not None else []
+                if not ring.is_current(job["frame_ref"][1], job["frame_ref"][2]):
+                    faces = []
+            else:
+                job = dict(job, frame=arrays[job["frame"]], display=arrays[job["display"]])
+                faces = detect_job(model, job)
+            out.append((
+                np.array([f.bbox for f in faces], dtype=np.float32).reshape(-1, 4),
+                np.array([f.kps for f in faces], dtype=np.float32).reshape(-1, 5, 2),
+                np.array([f.det_score for f in faces], dtype=np.float32),
+            ))
+        return out
+
+    while True:
+        msg = tasks.get()
+        if msg is None:
+            break
+        kind, task_id, shm_name, specs, payload = msg
+        try:
+            if shm is None or shm.name != shm_name:
+                if shm is not None:
+                    shm.close()
+                # the parent owns the arena; attach without registering it with the resource tracker
+                shm = attach_shared_memory(shm_name)
+            arrays = unpack(shm, specs)
+            out = detect(payload, arrays) if kind == "detect" else embed_crops(rec_model, list(arrays))
+            arrays = None
+            results.put(("ok", task_id, out))
+        except Exception as e:
+            arrays = None
+            results.put(("error", task_id, repr(e)))
+        detach_idle_rings()
+    for ring, _ in rings.values():
+        ring.detach()
+    if shm is not None:
+        shm.close()
+
+
+class Worker:
+    def __init__(self, worker_id: int, ctx, threads: int):
+        self.worker_id = worker_id
+        self.ctx = ctx
+        self.threads = threads
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.arena = SharedArena(INFERENCE_SHM_MB * 1024 * 1024)
+        self.restarts = 0
+        self.tasks = self.results = self.proc = None
+
+    def spawn(self):
+        self.ready.clear()
+        self.tasks, self.results = self.ctx.Queue(), self.ctx.Queue()
+        self.proc = self.ctx.Process(
+            target=_worker_main,
+            args=(self.worker_id, self.tasks, self.results, self.threads),
+            name=f"inference-{self.worker_id}",
+            daemon=True,
+        )
+        self.proc.start()
+
+    def wait_ready(self, timeout: float = INFERENCE_START_TIMEOUT):
+        """Block until the worker loaded its models; returns the recognition crop size."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                status, _, crop_size = self.results.get(timeout=0.5)
+            except queue.Empty:
+                if not self.proc.is_alive():
+                    break
+                continue
+            if status == "ready":
+                self.ready.set()
+                return crop_size
+        raise RuntimeError(f"inference worker {self.worker_id} failed to start")
+
+    def kill(self):
+        self.ready.clear()
+        if self.proc is not None and self.proc.is_alive():
+            self.proc.kill()
+        if self.proc is not None:
+            self.proc.join(timeout=5)
+
+
+# ===================================================
+# Pool
+# ===================================================
+class InferencePool:
+    def __init__(self, workers: int = INFERENCE_WORKERS):
+        self.ctx = mp.get_context("spawn")  # fresh interpreters: no forked ONNX/CUDA/asyncio state
+        threads = max(1, (os.cpu_count() or 1) // max(workers, 1))
+        self.workers = [Worker(i, self.ctx, threads) for i in range(workers)]
+        self.crop_size = 112
+        self._task_ids = itertools.count(1)
+        self._threads = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="inference-dispatch")
+        self.stats = {"tasks": 0, "errors": 0, "restarts": 0}
+
+    def start(self):
+        """Spawn every worker and wait until they have loaded their models. Blocking."""
+        for w in self.workers:
+            w.spawn()
+        for w in self.workers:
+            self.crop_size = w.wait_ready()
+        print(f"[inference_workers] {len(self.workers)} worker process(es) ready")
+
+    def stop(self):
+        for w in self.workers:
+            try:
+                w.tasks.put(None)
+            except Exception:
+                pass
+        for w in self.workers:
+            w.kill()
+            w.arena.close()
+        self._threads.shutdown(wait=False)
+
+    def _restart(self, worker: Worker, reason: str):
+        print(f"[inference_workers] restarting worker {worker.worker_id}: {reason}")
+        worker.kill()
+        worker.restarts += 1
+        self.stats["restarts"] += 1
+
+        def respawn():
+            with worker.lock:
+                try:
+                    worker.spawn()
+                    worker.wait_ready()
+                except Exception as e:
+                    print(f"[inference_workers] worker {worker.worker_id} restart failed:", e)
+
+        threading.Thread(target=respawn, name=f"respawn-{worker.worker_id}", daemon=True).start()
+
+    def _call(self, worker: Worker, kind: str, arrays: list, payload):
+        with worker.lock:
+            if not worker.ready.is_set():
+                raise RuntimeError(f"inference worker {worker.worker_id} is not ready")
+            task_id = next(self._task_ids)
+            name, specs = worker.arena.pack(arrays)
+            worker.tasks.put((kind, task_id, name, specs, payload))
+            deadline = time.monotonic() + INFERENCE_TIMEOUT
+            while True:
+                try:
+                    status, tid, data = worker.results.get(timeout=0.5)
+                except queue.Empty:
+                    if not worker.proc.is_alive():
+                        reason = f"exited with code {worker.proc.exitcode}"
+                    elif time.monotonic() > deadline:
+                        reason = f"no result after {INFERENCE_TIMEOUT:.0f}s"
+                    else:
+                        continue
+                    self.stats["errors"] += 1
+                    self._restart(worker, reason)
+                    raise RuntimeError(f"inference worker {worker.worker_id} {reason}")
+                if tid != task_id:
+                    continue  # late answer to a task that already timed out
+                self.stats["tasks"] += 1
+                if status == "error":
+                    self.stats["errors"] += 1
+                    raise RuntimeError(data)
+                return data
+
+    def _map(self, kind: str, items: list, build):
+        """Split `items` across ready workers, run them concurrently, return results in order."""
+        ready = [w for w in self.workers if w.ready.is_set()]
+        if not ready:
+            raise RuntimeError("no inference worker is ready")
+        chunks = [items[i :: len(ready)] for i in range(len(ready))]
+        futures = [
+            self._threads.submit(self._call, w, kind, *build(chunk))
+            for w, chunk in zip(ready, chunks)
+            if chunk
+        ]
+        parts = [f.result() for f in futures]
+        out = [None] * len(items)
+        for i, part in enumerate(parts):
+            for j, res in enumerate(part):
+                out[i + j * len(ready)] = res
+        return out
+
+    def detect_jobs(self, jobs: list) -> list:
+        """detection_policy.detect_jobs() in worker processes; returns per-job Face lists."""
+        from insightface.app.common import Face
+
+        def build(chunk):
+            arrays, payload = [], []
+            for job in chunk:
+                if job.get("frame_ref") and job.get("display_ref"):
+                    # frames already live in shared-memory rings: send only their locations
+                    payload.append(dict(job, frame=None, display=None))
+                    continue
+                arrays += [job["frame"], job["display"]]
+                payload.append(dict(job, frame=len(arrays) - 2, display=len(arrays) - 1, frame_ref=None))
+            return arrays, payload
+
+        results = self._map("detect", jobs, build) if jobs else []
+        return [
+            [Face(bbox=b, kps=k, det_score=s) for b, k, s in zip(bboxes, kpss, scores)]
+            for bboxes, kpss, scores in results
+        ]
+
+    def embed_faces(self, items: list, scales: list = None):
+        """inference.embed_faces() with alignment here and the recognition model in the workers."""
+        if not items:
+            return
+        from app.inference import align_faces
+
+        crops = align_faces(items, scales, self.crop_size)
+        feats = self._map("embed", crops, lambda chunk: (chunk, None))
+        for (_, face), feat in zip(items, feats):
+            face.embedding = feat
+
+    def describe(self) -> dict:
+        return {
+            **self.stats,
+            "workers": [
+                {
+                    "worker_id": w.worker_id,
+                    "pid": w.proc.pid if w.proc else None,
+                    "ready": w.ready.is_set(),
+                    "restarts": w.restarts,
+                    "shm_mb": round(w.arena.shm.size / 1024 / 1024, 1),
+                }
+                for w in self.workers
+            ],
+        }
@@ -0,0 +1,158 @@
+# backend/app/label_renderer.py
+"""Cached sprite renderer for server-side face labels."""
+
+import os
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FONT_DIR = os.getenv("FONT_DIR", "fonts")
+LABEL_CACHE_SIZE = int(os.getenv("LABEL_CACHE_SIZE", "256"))
+LABEL_OFFSET = 50  # label sits this far above the face box
+LABEL_RADIUS = 12
+
+# (gradient start RGBA, gradient end RGBA, title RGB, note RGB)
+LABEL_STYLES = {
+    "known": ((80, 255, 150, 130), (30, 150, 90, 100), (20, 60, 20), (50, 50, 50)),
+    "bad": ((255, 70, 70, 140), (180, 0, 0, 100), (255, 255, 255), (235, 235, 235)),
+    "unknown": ((255, 170, 60, 130), (240, 110, 0, 100), (255, 255, 255), (245, 245, 245)),
+}
+BANNER_HEIGHT = 40
+BANNER_COLOR = (255, 0, 0, 140)
+
+
+@lru_cache(maxsize=None)
+def load_font(filename: str, size: int):
+    try:
+        return ImageFont.truetype(os.path.join(FONT_DIR, filename), size)
+    except OSError:
+        print(f"[label_renderer] font {filename} not found in {FONT_DIR}, using PIL default")
+        try:
+            return ImageFont.load_default(size)
+        except TypeError:  # Pillow < 10.1
+            return ImageFont.load_default()
+
+
+# ===================================================
+# Sprites
+# ===================================================
+def _sprite(colour_rgb: np.ndarray, alpha: np.ndarray, text_layers: list):
+    """
+    Premultiplied BGR + alpha for a colour layer under text layers.
+    text_layers: [(coverage HxW float 0..1, rgb)], drawn on top at full opacity.
+    """
+    premult = colour_rgb * alpha[..., None]
+    keep = np.ones_like(alpha)
+    for coverage, rgb in text_layers:
+        premult = premult * (1 - coverage[..., None]) + np.asarray(rgb, np.float32) * coverage[..., None]
+        keep = keep * (1 - coverage)
+    alpha = 1 - (1 - alpha) * keep
+    return np.ascontiguousarray(premult[..., ::-1], dtype=np.float32), alpha[..., None].astype(np.float32)
+
+
+def _text_coverage(size: tuple, xy: tuple, text: str, font) -> np.ndarray:
+    mask = Image.new("L", size, 0)
+    ImageDraw.Draw(mask).text(xy, text, font=font, fill=255)
+    return np.asarray(mask, dtype=np.float32) / 255.0
+
+
+def render_label(person_type: str, name: str = None, note: str = None):
+    grad_start, grad_end, title_rgb, note_rgb = LABEL_STYLES.get(person_type, LABEL_STYLES["unknown"])
+    if person_type == "known":
+        lines = [name or "Known Person"] + ([note] if note else [])
+    elif person_type == "bad":
+        lines = [name or "Suspect"] + ([note] if note else [])
+    else:
+        lines = ["Unknown"]
+
+    fonts = [load_font("Roboto-Bold.ttf", 14)] + [load_font("Roboto-Italic.ttf", 10)] * (len(lines) - 1)
+    probe = ImageDraw.Draw(Image.new("L", (1, 1)))
+    boxes = [probe.textbbox((0, 0), line, font=font) for line, font in zip(lines, fonts)]
+    width = max(r - l for l, t, r, b in boxes) + 28
+    height = sum(b - t for l, t, r, b in boxes) + 24 + (len(lines) - 1) * 5
+
+    # vertical gradient, computed for all rows at once
+    ramp = (np.arange(height, dtype=np.float32) / height)[:, None]
+    start, end = np.asarray(grad_start, np.float32), np.asarray(grad_end, np.float32)
+    rows = np.floor(start + (end - start) * ramp)  # height x 4, truncated like int()
+    colour = np.broadcast_to(rows[:, None, :3], (height, width, 3))
+    mask = Image.new("L", (width, height), 0)
+    ImageDraw.Draw(mask).rounded_rectangle([(0, 0), (width, height)], radius=LABEL_RADIUS, fill=255)
+    alpha = np.broadcast_to(rows[:, None, 3] / 255.0, (height, width)) * (np.asarray(mask, np.float32) / 255.0)
+
+    text_layers, ty = [], 12
+    for i, (line, font) in enumerate(zip(lines, fonts)):
+        text_layers.append((_text_coverage((width, height), (14, ty), line, font), title_rgb if i == 0 else note_rgb))
+        ty += (boxes[i][3] - boxes[i][1]) + 6
+    return _sprite(colour, alpha, text_layers)
+
+
+def render_banner(width: int, text: str):
+    font = load_font("Roboto-Bold.ttf", 24)
+    l, t, r, b = font.getbbox(text)
+    colour = np.broadcast_to(np.asarray(BANNER_COLOR[:3], np.float32), (BANNER_HEIGHT, width, 3))
+    alpha = np.full((BANNER_HEIGHT, width), BANNER_COLOR[3] / 255.0, dtype=np.float32)
+    xy = ((width - (r - l)) / 2, (BANNER_HEIGHT - (b - t)) / 2)
+    coverage = _text_coverage((width, BANNER_HEIGHT), xy, text, font)
+    return _sprite(colour, alpha, [(coverage, (255, 255, 255))])
+
+
+class SpriteCache:
+    def __init__(self, size: int = LABEL_CACHE_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key, render):
+        sprite = self._items.get(key)
+        if sprite is not None:
+            self._items.move_to_end(key)
+            self.stats["hits"] += 1
+            return sprite
+        self.stats["misses"] += 1
+        sprite = self._items[key] = render()
+        if len(self._items) > self.size:
+            self._items.popitem(last=False)
+        return sprite
+
+
+sprites = SpriteCache()
+
+
+# ===================================================
+# Drawing
+# ===================================================
+def blend(frame, sprite, x: int, y: int):
+    """Alpha-blend a (premultiplied BGR, alpha) sprite onto frame at (x, y), in place, clipped."""
+    premult, alpha = sprite
+    h, w = alpha.shape[:2]
+    fx1, fy1 = max(x, 0), max(y, 0)
+    fx2, fy2 = min(x + w, frame.shape[1]), min(y + h, frame.shape[0])
+    if fx1 >= fx2 or fy1 >= fy2:
+        return
+    sx, sy = fx1 - x, fy1 - y
+    roi = frame[fy1:fy2, fx1:fx2]
+    p = premult[sy : sy + fy2 - fy1, sx : sx + fx2 - fx1]
+    a = alpha[sy : sy + fy2 - fy1, sx : sx + fx2 - fx1]
+    roi[...] = np.clip(roi * (1 - a) + p + 0.5, 0, 255).astype(np.uint8)
+
+
+def draw_labels(frame, labels: list):
+    """Draw every (x1, y1, x2, y2, type, name, note) label onto the BGR frame in place; returns it."""
+    for x1, y1, x2, y2, person_type, name, note in labels:
+        sprite = sprites.get((person_type, name, note), lambda: render_label(person_type, name, note))
+        height = sprite[1].shape[0]
+        blend(frame, sprite, int(x1), max(0, int(y1) - height - LABEL_OFFSET))
+    return frame
+
+
+def draw_banner(frame, text: str):
+    """Draw the translucent top banner in place; returns the frame."""
+    width = frame.shape[1]
+    blend(frame, sprites.get(("banner", text, width), lambda: render_banner(width, text)), 0, 0)
+    return frame
@@ -7,7 +7,6 @@ from pydantic import BaseModel
 from bson.objectid import ObjectId
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
 from fastapi import status
 from fastapi import Body
 from fastapi import File, UploadFile, Form
@@ -16,9 +15,10 @@ import pytz
 
 from app.db import db
 from app.ws_manager import manager
-from app import recognition, scheduler
+from app import recognition, scheduler, gallery_sync, gallery_snapshot, cameras, stream, alerts, notifier, write_behind, db_indexes
 from app.utils import serialize_doc
-from app.scheduler import generate_attendance_for_date
+from app.embedding_codec import encode_embedding
+from app.scheduler import generate_attendance_for_date, read_attendance_for_date
 
 load_dotenv()
 
@@ -57,48 +57,73 @@ class RestrictedHoursBody(BaseModel):
 @app.on_event("startup")
 async def startup_event():
     import asyncio
+    alerts.dispatcher.start()
+    write_behind.writer.start()
+    asyncio.create_task(db_indexes.ensure_indexes())
     asyncio.create_task(recognition.start_recognition_loop())
+    asyncio.create_task(gallery_sync.run_gallery_sync())
+    asyncio.create_task(gallery_snapshot.run_snapshot_writer())
     scheduler.start_scheduler()
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    cameras.stop_cameras()
+    if recognition.inference_pool is not None:
+        recognition.inference_pool.stop()
+    await alerts.dispatcher.stop()
+    await write_behind.writer.close()
+
+
 @app.websocket("/ws/stream")
 async def websocket_stream(ws: WebSocket):
     await manager.connect(ws)
     try:
         while True:
             await ws.receive_text()  # heartbeat pings
-    except WebSocketDisconnect:
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # RuntimeError: the manager already closed a stalled client
+    finally:
         await manager.disconnect(ws)
 
 
 # === Live Video Stream (MJPEG) ===
-def generate_frames():
-    import cv2
-    while True:
-        if recognition.last_frame is None:
-            continue
-        ret, buffer = cv2.imencode('.jpg', recognition.last_frame)
-        if not ret:
-            continue
-        frame_bytes = buffer.tobytes()
-        yield (
-            b'--frame\r\n'
-            b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n'
-        )
-
 @app.get("/video_feed")
-async def video_feed():
-    return StreamingResponse(
-        generate_frames(),
-        media_type="multipart/x-mixed-replace; boundary=frame"
-    )
+async def video_feed(fps: float = None):
+    return stream.MjpegResponse(stream.mjpeg_stream(fps=fps))
+
+@app.get("/video_feed/{camera_id}")
+async def camera_video_feed(camera_id: str, fps: float = None):
+    if cameras.get_camera(camera_id) is None:
+        raise HTTPException(status_code=404, detail="camera not found")
+    return stream.MjpegResponse(stream.mjpeg_stream(camera_id, fps))
+
+@app.get("/stream_config")
+async def stream_config():
+    camera = cameras.get_camera()
+    return {
+        "overlay_mode": recognition.OVERLAY_MODE,
+        "default_camera": camera.camera_id if camera else None,
+    }
+
+@app.get("/admin/stream_status")
+async def stream_status():
+    return [b.describe() for b in stream.broadcasters.values()]
+
+@app.get("/admin/ws_status")
+async def ws_status():
+    return manager.describe()
+
+@app.get("/cameras")
+async def list_cameras():
+    return [c.describe() for c in cameras.cameras.values()]
 
 
 # === API endpoints ===
 @app.get("/users")
 async def list_users():
     out = []
-    cursor = db.users.find({})
+    cursor = db.users.find({}, {"embedding": 0})
     async for u in cursor:
         out.append(serialize_doc(u))
     return out
@@ -116,7 +141,7 @@ async def create_user(
     from app import recognition
 
     image_path = None
-    embedding = None
+    emb = None
 
     if image:
         image_name = f"{datetime.datetime.now(DHAKA_TZ).replace(tzinfo=None).timestamp()}_{image.filename}"
@@ -127,7 +152,6 @@ async def create_user(
 
         emb = recognition.get_face_embedding_from_image(save_path)
         if emb is not None:
-            embedding = emb.tolist()
             print("[create_user] embedding generated successfully")
         else:
             print("[create_user] no face found, embedding skipped")
@@ -137,7 +161,8 @@ async def create_user(
         "role": role,
         "note": note,
         "image_path": image_path,
-        "embedding": embedding,
+        "embedding": encode_embedding(emb),
+        "gallery_version": await gallery_sync.next_version(),
         # "created_at": datetime.datetime.utcnow(),
         "created_at": datetime.datetime.now(DHAKA_TZ).replace(tzinfo=None),
     }
@@ -145,15 +170,15 @@ async def create_user(
     res = await db.users.insert_one(doc)
     doc["_id"] = str(res.inserted_id)  # ✅ Fix JSON serialization issue
 
-    await recognition.reload_known_embeddings()
-    return {"success": True, "data": doc}
+    recognition.known_gallery.add(doc["_id"], emb, name=name, note=note)
+    return {"success": True, "data": serialize_doc(doc)}
 
 
 
 @app.get("/unknowns")
 async def list_unknowns(limit: int = 50):
     out = []
-    cursor = db.unknowns.find({}).sort("first_seen", -1).limit(limit)
+    cursor = db.unknowns.find({}, {"embedding": 0}).sort("first_seen", -1).limit(limit)
     async for u in cursor:
         out.append(serialize_doc(u))
     return out
@@ -168,6 +193,7 @@ async def list_presence(limit: int = 100):
 
 @app.post("/admin/approve_unknown/{unknown_id}")
 async def approve_unknown(unknown_id: str, body: ApproveBody):
+    await write_behind.writer.flush()  # the unknown may still be in the write buffer
     unk = await db.unknowns.find_one({"_id": ObjectId(unknown_id)})
     if not unk:
         raise HTTPException(status_code=404, detail="unknown not found")
@@ -179,14 +205,16 @@ async def approve_unknown(unknown_id: str, body: ApproveBody):
         "first_seen": unk.get("first_seen"),
         "last_seen": unk.get("last_seen"),
         "created_at": datetime.datetime.now(DHAKA_TZ).replace(tzinfo=None),
+        "gallery_version": await gallery_sync.next_version(),
     }
     res = await db.users.insert_one(user_doc)
     await db.unknowns.delete_one({"_id": ObjectId(unknown_id)})
-    await recognition.reload_known_embeddings()
+    recognition.known_gallery.add(str(res.inserted_id), user_doc["embedding"], name=body.name, note=body.note)
     return {"user_id": str(res.inserted_id)}
 
 @app.delete("/admin/ignore_unknown/{unknown_id}")
 async def ignore_unknown(unknown_id: str):
+    await write_behind.writer.flush()  # the unknown may still be in the write buffer
     res = await db.unknowns.delete_one({"_id": ObjectId(unknown_id)})
     if res.deleted_count == 0:
         raise HTTPException(status_code=404, detail="unknown not found")
@@ -194,51 +222,80 @@ async def ignore_unknown(unknown_id: str):
 
 # GENERATE ATTANDENCE
 @app.post("/admin/generate_attendance/{date_str}")
-async def generate_attendance(date_str: str):
-    """Always (re)generate attendance for the given date, then return results."""
+async def generate_attendance(date_str: str, recompute: bool = False):
+    """
+    Return attendance for the given date. Rollups are kept up to date as
+    presence events close; ?recompute=true rebuilds the day from
+    presence_events first (backfill).
+    """
     y, m, d = map(int, date_str.split("-"))
     target = datetime.date(y, m, d)
 
-    # ✅ Always regenerate attendance before returning
-    await generate_attendance_for_date(target)
-
-    # ✅ Fetch fresh aggregated data with user info
-    pipeline = [
-        {"$match": {"date": target.isoformat()}},
-        {
-            "$lookup": {
-                "from": "users",
-                "localField": "user_id",
-                "foreignField": "_id",
-                "as": "user",
-            }
-        },
-        {"$unwind": {"path": "$user", "preserveNullAndEmptyArrays": True}},
-        {
-            "$project": {
-                "_id": 0,
-                "user_id": {"$toString": "$user_id"},
-                "user_name": {"$ifNull": ["$user.name", "Unknown"]},
-                "total_duration_seconds": 1,
-                "first_seen": 1,
-                "last_seen": 1,
-                "date": 1,
-            }
-        },
-    ]
+    if recompute:
+        await generate_attendance_for_date(target)
 
-    docs = await db.attendance_logs.aggregate(pipeline).to_list(None)
-    return docs
+    return await read_attendance_for_date(target)
 
 
 @app.post("/admin/reload_embeddings")
 async def reload_embeddings():
-    await recognition.reload_known_embeddings()
-    return {"status": "ok", "loaded": len(recognition.known_embeddings)}
+    """Full gallery rebuild from Mongo; only needed for recovery."""
+    loaded = await recognition.reload_known_embeddings()
+    loaded_bad = await recognition.reload_bad_embeddings()
+    await gallery_snapshot.save_snapshot()
+    return {"status": "ok", "loaded": loaded, "loaded_bad": loaded_bad}
+
+
+@app.get("/admin/gallery_status")
+async def gallery_status():
+    return {
+        "known": recognition.known_gallery.index.describe(),
+        "bad": recognition.bad_gallery.index.describe(),
+        "sync": gallery_sync.sync_state,
+    }
+
+
+@app.get("/admin/inference_status")
+async def inference_status():
+    seen = sum(c.motion.stats["frames_seen"] for c in cameras.cameras.values())
+    skipped = sum(c.motion.stats["frames_skipped"] for c in cameras.cameras.values())
+    pool = recognition.inference_pool
+    return {
+        **recognition.inference.stats,
+        "workers": pool.describe() if pool is not None else None,
+        "motion": {
+            "frames_seen": seen,
+            "frames_skipped": skipped,
+            "skip_ratio": round(skipped / seen, 3) if seen else 0.0,
+            "cameras": {c.camera_id: c.motion.stats for c in cameras.cameras.values()},
+        },
+    }
+
+
+@app.get("/admin/db_diagnostics")
+async def db_diagnostics():
+    return {
+        "indexes": db_indexes.index_state,
+        "explain": await db_indexes.explain_hot_queries(),
+    }
+
+
+@app.get("/admin/write_status")
+async def write_status():
+    return write_behind.writer.describe()
+
+
+@app.get("/admin/alert_status")
+async def alert_status():
+    return {
+        **alerts.dispatcher.describe(),
+        "http": {"telegram": notifier.telegram.describe(), "whatsapp": notifier.whatsapp.describe()},
+    }
 
 
 @app.post("/admin/mark_bad_person/{unknown_id}")
 async def mark_bad_person(unknown_id: str, body: BadPersonBody):
+    await write_behind.writer.flush()  # the unknown may still be in the write buffer
     unk = await db.unknowns.find_one({"_id": ObjectId(unknown_id)})
     if not unk:
         raise HTTPException(status_code=404, detail="unknown not found")
@@ -251,10 +308,11 @@ async def mark_bad_person(unknown_id: str, body: BadPersonBody):
         "first_seen": unk.get("first_seen"),
         "last_seen": unk.get("last_seen"),
         "created_at": datetime.datetime.now(DHAKA_TZ).replace(tzinfo=None),
+        "gallery_version": await gallery_sync.next_version(),
     }
     res = await db.bad_people.insert_one(bad_person_doc)
     await db.unknowns.delete_one({"_id": ObjectId(unknown_id)})
-    await recognition.reload_bad_embeddings()  # Reload bad embeddings
+    recognition.bad_gallery.add(str(res.inserted_id), bad_person_doc["embedding"], name=body.name, reason=body.reason)
     
     return {"bad_person_id": str(res.inserted_id)}
 
@@ -265,8 +323,9 @@ async def delete_user(user_id: str):
     res = await db.users.delete_one({"_id": ObjectId(user_id)})
     if res.deleted_count == 0:
         raise HTTPException(status_code=404, detail="user not found")
+    await gallery_sync.record_delete("users", user_id)
     # Optionally: cleanup from presence_events or unknowns if linked
-    await recognition.reload_known_embeddings()  # refresh memory
+    recognition.known_gallery.remove(user_id)  # refresh memory
     return {"status": "ok", "deleted_id": user_id}
 
 
@@ -282,12 +341,13 @@ async def update_user(user_id: str, body: dict = Body(...)):
 
     result = await db.users.update_one(
         {"_id": ObjectId(user_id)},
-        {"$set": update_data}
+        {"$set": {**update_data, "gallery_version": await gallery_sync.next_version()}}
     )
 
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
 
+    recognition.known_gallery.update(user_id, **update_data)
     return {"status": "ok", "updated_fields": update_data}
 
 
@@ -296,7 +356,7 @@ async def update_user(user_id: str, body: dict = Body(...)):
 @app.get("/bad_people")
 async def list_bad_people(limit: int = 50):
     out = []
-    cursor = db.bad_people.find({}).sort("created_at", -1).limit(limit)
+    cursor = db.bad_people.find({}, {"embedding": 0}).sort("created_at", -1).limit(limit)
     async for p in cursor:
         out.append(serialize_doc(p))
     return out
@@ -306,6 +366,8 @@ async def delete_bad_person(user_id: str):
     res = await db.bad_people.delete_one({"_id": ObjectId(user_id)})
     if res.deleted_count == 0:
         raise HTTPException(status_code=404, detail="person not found")
+    await gallery_sync.record_delete("bad_people", user_id)
+    recognition.bad_gallery.remove(user_id)
     return {"status": "ok", "deleted_id": user_id}
 
 @app.put("/update_bad_person/{user_id}")
@@ -313,9 +375,13 @@ async def update_bad_person(user_id: str, body: dict):
     fields = {k: v for k, v in body.items() if k in ["name", "role", "reason"]}
     if not fields:
         raise HTTPException(status_code=400, detail="No valid fields to update")
-    res = await db.bad_people.update_one({"_id": ObjectId(user_id)}, {"$set": fields})
+    version = await gallery_sync.next_version()
+    res = await db.bad_people.update_one(
+        {"_id": ObjectId(user_id)}, {"$set": {**fields, "gallery_version": version}}
+    )
     if res.matched_count == 0:
         raise HTTPException(status_code=404, detail="person not found")
+    recognition.bad_gallery.update(user_id, **fields)
     return {"status": "ok", "updated_id": user_id}
 
 
@@ -328,10 +394,10 @@ async def create_bad_person(
 ):
     """
     Create a bad person (from dashboard). Saves image, generates embedding via recognition,
-    inserts into db.bad_people, reloads bad embeddings and returns serialized doc.
+    inserts into db.bad_people, adds it to the bad gallery and returns serialized doc.
     """
     image_path = None
-    embedding = None
+    emb = None
 
     if image:
         # Save uploaded image
@@ -345,7 +411,6 @@ async def create_bad_person(
         try:
             emb = recognition.get_face_embedding_from_image(save_path)
             if emb is not None:
-                embedding = emb.tolist()
                 print("[create_bad_person] embedding generated")
             else:
                 print("[create_bad_person] no face found, embedding skipped")
@@ -357,18 +422,19 @@ async def create_bad_person(
         "role": role or "bad",
         "reason": reason,
         "image_path": image_path,
-        "embedding": embedding,
+        "embedding": encode_embedding(emb),
         "created_at": datetime.datetime.now(DHAKA_TZ).replace(tzinfo=None),
+        "gallery_version": await gallery_sync.next_version(),
     }
 
     res = await db.bad_people.insert_one(doc)
     # make returned doc JSON-friendly
     doc["_id"] = str(res.inserted_id)
 
-    # reload bad embeddings so system recognizes new bad person immediately
-    await recognition.reload_bad_embeddings()
+    # add to the bad gallery so system recognizes new bad person immediately
+    recognition.bad_gallery.add(doc["_id"], emb, name=name, reason=reason)
 
-    return {"success": True, "data": doc}
+    return {"success": True, "data": serialize_doc(doc)}
 
 
 
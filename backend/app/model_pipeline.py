@@ -0,0 +1,154 @@
+# backend/app/model_pipeline.py
+"""Configurable face model pipeline; loads only the modules in FACE_MODULES."""
+
+import os
+import glob
+from dotenv import load_dotenv
+
+load_dotenv()
+
+INSIGHTFACE_CTX_ID = int(os.getenv("INSIGHTFACE_CTX_ID", "-1"))  # -1 CPU, 0 GPU
+INSIGHTFACE_ROOT = os.getenv("INSIGHTFACE_ROOT", "~/.insightface")
+FACE_MODEL_PACK = os.getenv("FACE_MODEL_PACK", "buffalo_l")
+FACE_DET_MODEL = os.getenv("FACE_DET_MODEL", "") or FACE_MODEL_PACK
+FACE_REC_MODEL = os.getenv("FACE_REC_MODEL", "") or FACE_MODEL_PACK
+FACE_MODULES = [m.strip() for m in os.getenv("FACE_MODULES", "detection,recognition").split(",") if m.strip()]
+FACE_DET_THRESH = float(os.getenv("FACE_DET_THRESH", "0.5"))
+
+
+def _parse_size(value: str):
+    w, _, h = value.lower().partition("x")
+    return (int(w), int(h or w))
+
+
+FACE_DET_SIZE = _parse_size(os.getenv("FACE_DET_SIZE", "640"))
+
+# file-name prefixes of the modules shipped in the insightface packs
+MODULE_FILES = {
+    "detection": ("det_", "scrfd"),
+    "recognition": ("w600k", "glint", "ms1m", "arcface"),
+    "landmark_3d_68": ("1k3d68",),
+    "landmark_2d_106": ("2d106",),
+    "genderage": ("genderage",),
+}
+GRAPH_OPT_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+
+# ===================================================
+# ONNX Runtime Session Options
+# ===================================================
+def session_options(prefix: str):
+    """onnxruntime.SessionOptions from ORT_<prefix>_* env vars."""
+    import onnxruntime as ort
+
+    opts = ort.SessionOptions()
+    intra = int(os.getenv(f"ORT_{prefix}_INTRA_THREADS", "0"))
+    inter = int(os.getenv(f"ORT_{prefix}_INTER_THREADS", "0"))
+    if intra > 0:
+        opts.intra_op_num_threads = intra
+    if inter > 0:
+        opts.inter_op_num_threads = inter
+    level = os.getenv(f"ORT_{prefix}_GRAPH_OPT", "all").lower()
+    opts.graph_optimization_level = getattr(ort.GraphOptimizationLevel, GRAPH_OPT_LEVELS.get(level, "ORT_ENABLE_ALL"))
+    if os.getenv(f"ORT_{prefix}_EXECUTION", "sequential").lower() == "parallel":
+        opts.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+    return opts
+
+
+def providers(ctx_id: int = INSIGHTFACE_CTX_ID) -> list:
+    if ctx_id >= 0:
+        return ["CUDAExecutionProvider", "CPUExecutionProvider"]
+    return ["CPUExecutionProvider"]
+
+
+# ===================================================
+# Model Resolution
+# ===================================================
+def resolve_model_file(spec: str, module: str) -> str:
+    """Path of the .onnx file for `module`, from an explicit path or a pack name (downloaded if missing)."""
+    if spec.endswith(".onnx"):
+        return os.path.expanduser(spec)
+    from insightface.utils import ensure_available
+
+    pack_dir = ensure_available("models", spec, root=INSIGHTFACE_ROOT)
+    for path in sorted(glob.glob(os.path.join(pack_dir, "*.onnx"))):
+        if os.path.basename(path).lower().startswith(MODULE_FILES[module]):
+            return path
+    raise FileNotFoundError(f"no {module} model in pack '{spec}' ({pack_dir})")
+
+
+def load_module(spec: str, module: str, prefix: str, ctx_id: int = INSIGHTFACE_CTX_ID):
+    from insightface.model_zoo.model_zoo import ModelRouter
+
+    path = resolve_model_file(spec, module)
+    model = ModelRouter(path).get_model(sess_options=session_options(prefix), providers=providers(ctx_id))
+    if model is None or model.taskname != module:
+        raise ValueError(f"{path} is not a {module} model")
+    print(f"[model_pipeline] {module}: {path}")
+    return model
+
+
+# ===================================================
+# Pipeline
+# ===================================================
+class FacePipeline:
+    def __init__(
+        self,
+        modules: list = None,
+        det_model: str = FACE_DET_MODEL,
+        rec_model: str = FACE_REC_MODEL,
+        ctx_id: int = INSIGHTFACE_CTX_ID,
+    ):
+        modules = list(modules or FACE_MODULES)
+        for required in ("detection", "recognition"):
+            if required not in modules:
+                modules.append(required)
+        self.models = {}
+        for module in modules:
+            if module not in MODULE_FILES:
+                print(f"[model_pipeline] WARNING: unknown module '{module}' ignored")
+                continue
+            spec = {"detection": det_model, "recognition": rec_model}.get(module, FACE_MODEL_PACK)
+            prefix = {"detection": "DET", "recognition": "REC"}.get(module, "AUX")
+            self.models[module] = load_module(spec, module, prefix, ctx_id)
+        self.det_model = self.models["detection"]
+
+    def prepare(self, ctx_id: int = INSIGHTFACE_CTX_ID, det_size=FACE_DET_SIZE, det_thresh: float = FACE_DET_THRESH):
+        self.det_size = det_size
+        for module, model in self.models.items():
+            if module == "detection":
+                model.prepare(ctx_id, input_size=det_size, det_thresh=det_thresh)
+            else:
+                model.prepare(ctx_id)
+
+    def get(self, img, max_num: int = 0):
+        """FaceAnalysis.get() equivalent: detect, embed, then run any auxiliary modules."""
+        from app.inference import detect_frames, embed_faces
+
+        faces = detect_frames(self, [img])[0]
+        if max_num > 0:
+            faces = sorted(faces, key=lambda f: f.det_score, reverse=True)[:max_num]
+        embed_faces(self, [(img, face) for face in faces])
+        for module, model in self.models.items():
+            if module not in ("detection", "recognition"):
+                for face in faces:
+                    model.get(img, face)
+        return faces
+
+
+def build_pipeline(ctx_id: int = INSIGHTFACE_CTX_ID) -> FacePipeline:
+    pipeline = FacePipeline(ctx_id=ctx_id)
+    pipeline.prepare(ctx_id=ctx_id)
+    try:
+        import resource  # not available on Windows
+        # ru_maxrss is KiB on Linux
+        rss = f" (peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB)"
+    except ImportError:
+        rss = ""
+    print(f"[model_pipeline] loaded {', '.join(pipeline.models)}{rss}")
+    return pipeline
@@ -0,0 +1,64 @@
+# backend/app/motion.py
+"""Cheap motion gate in front of face detection."""
+
+import os
+import time
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MOTION_GATE = os.getenv("MOTION_GATE", "true").lower() == "true"
+MOTION_WIDTH = int(os.getenv("MOTION_WIDTH", "160"))
+MOTION_PIXEL_THRESHOLD = int(os.getenv("MOTION_PIXEL_THRESHOLD", "25"))
+MOTION_MIN_AREA = float(os.getenv("MOTION_MIN_AREA", "0.002"))  # fraction of the frame
+MOTION_LEARNING_RATE = float(os.getenv("MOTION_LEARNING_RATE", "0.05"))
+MOTION_KEEPALIVE = float(os.getenv("MOTION_KEEPALIVE", "3"))  # seconds between forced detections
+
+
+class MotionGate:
+    def __init__(self):
+        self.background = None
+        self.last_run = 0.0
+        self.stats = {"frames_seen": 0, "frames_skipped": 0, "skip_ratio": 0.0, "motion_area": 0.0}
+
+    def _mask(self, frame):
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (MOTION_WIDTH, max(1, int(h * MOTION_WIDTH / w))), interpolation=cv2.INTER_AREA)
+        grey = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0).astype(np.float32)
+        if self.background is None or self.background.shape != grey.shape:
+            self.background = grey
+            return None
+        diff = cv2.absdiff(grey, self.background)
+        cv2.accumulateWeighted(grey, self.background, MOTION_LEARNING_RATE)
+        return (diff > MOTION_PIXEL_THRESHOLD).astype(np.uint8)
+
+    def check(self, frame, has_tracks: bool = False):
+        """(run_detection, motion boxes in `frame` pixels) for a display frame."""
+        self.stats["frames_seen"] += 1
+        if not MOTION_GATE:
+            return True, []
+        now = time.monotonic()
+        mask = self._mask(frame)
+        boxes = []
+        if mask is None:
+            area = 1.0  # first frame: no background yet, always detect
+        else:
+            area = float(mask.mean())
+            if area >= MOTION_MIN_AREA:
+                mask = cv2.dilate(mask, None, iterations=2)
+                contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+                scale = frame.shape[1] / mask.shape[1]
+                for c in contours:
+                    x, y, w, h = cv2.boundingRect(c)
+                    boxes.append([x * scale, y * scale, (x + w) * scale, (y + h) * scale])
+        self.stats["motion_area"] = round(area, 4)
+
+        run = area >= MOTION_MIN_AREA or has_tracks or now - self.last_run >= MOTION_KEEPALIVE
+        if run:
+            self.last_run = now
+        else:
+            self.stats["frames_skipped"] += 1
+        self.stats["skip_ratio"] = round(self.stats["frames_skipped"] / self.stats["frames_seen"], 3)
+        return run, boxes
@@ -0,0 +1,81 @@
+# backend/app/notifier.py
+"""Shared keep-alive HTTP sessions for the Telegram and WhatsApp notifiers."""
+
+import os
+import time
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+NOTIFY_CONNECT_TIMEOUT = float(os.getenv("NOTIFY_CONNECT_TIMEOUT", "5"))
+NOTIFY_READ_TIMEOUT = float(os.getenv("NOTIFY_READ_TIMEOUT", "20"))
+NOTIFY_MAX_CONNECTIONS = int(os.getenv("NOTIFY_MAX_CONNECTIONS", "4"))
+NOTIFY_MAX_RETRY_AFTER = float(os.getenv("NOTIFY_MAX_RETRY_AFTER", "30"))
+
+
+def retry_after(response) -> float:
+    """Seconds to wait after a 429, from the JSON body or the Retry-After header."""
+    try:
+        return float(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        pass
+    try:
+        return float(response.headers.get("Retry-After", 1))
+    except ValueError:
+        return 1.0
+
+
+class HttpNotifier:
+    def __init__(self, name: str, max_connections: int = NOTIFY_MAX_CONNECTIONS):
+        self.name = name
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    def _wait_for_rate_limit(self):
+        with self._lock:
+            delay = self.blocked_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def post(self, url: str, **kwargs):
+        """
+        POST with timeouts and 429 handling; returns the response (raises on
+        network errors). Upload bodies must be bytes so a retry can resend them.
+        """
+        kwargs.setdefault("timeout", (NOTIFY_CONNECT_TIMEOUT, NOTIFY_READ_TIMEOUT))
+        for attempt in range(2):
+            self._wait_for_rate_limit()
+            self.stats["requests"] += 1
+            try:
+                r = self.session.post(url, **kwargs)
+            except requests.RequestException:
+                self.stats["errors"] += 1
+                raise
+            if r.status_code != 429:
+                if r.status_code >= 400:
+                    self.stats["errors"] += 1
+                return r
+            wait = retry_after(r)
+            self.stats["rate_limited"] += 1
+            with self._lock:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + wait)
+            print(f"[notifier] {self.name} rate limited, retry after {wait:.0f}s")
+            if wait > NOTIFY_MAX_RETRY_AFTER or attempt == 1:
+                return r
+        return r
+
+    def describe(self) -> dict:
+        return {**self.stats, "blocked_for": round(max(0.0, self.blocked_until - time.monotonic()), 1)}
+
+
+telegram = HttpNotifier("telegram")
+whatsapp = HttpNotifier("whatsapp")
@@ -1,6 +1,7 @@
 # backend/app/recognition.py
 
 import os
+import time
 import asyncio
 import datetime
 import numpy as np
@@ -8,43 +9,68 @@ import pytz
 import cv2
 from bson.objectid import ObjectId
 from dotenv import load_dotenv
-from PIL import Image, ImageDraw, ImageFont
-from app.email_utils import send_alert_email
-from app.telegram_utils import send_telegram_photo
 from app.db import db
 from app.ws_manager import manager
-from app.utils import save_bgr_image
+from app.utils import save_bgr_image, save_bgr_jpeg
+from app.gallery import GalleryStore, GALLERY_PROJECTION
+from app.embedding_codec import encode_embedding
+from app.model_pipeline import build_pipeline
+from app.inference import InferenceBatcher, embed_faces
+from app.detection_policy import detect_jobs
+from app.inference_workers import INFERENCE_WORKERS, InferencePool
+from app.tracker import face_quality
+from app import gallery_snapshot, gallery_sync, cameras, label_renderer, alerts, write_behind, scheduler
 
 load_dotenv()
 
-INSIGHTFACE_CTX_ID = int(os.getenv("INSIGHTFACE_CTX_ID", "-1"))
 THRESHOLD = float(os.getenv("THRESHOLD", "1.2"))
 RESIZE_WIDTH = int(os.getenv("RESIZE_WIDTH", "480"))
 ABSENCE_TIMEOUT = int(os.getenv("ABSENCE_TIMEOUT", "5"))
+TOP_K = int(os.getenv("TOP_K", "3"))
+MAX_PROCESS_FPS = float(os.getenv("MAX_PROCESS_FPS", "20"))
+# "server": labels are drawn into the streamed frames; "client": raw frames are
+# streamed and boxes/labels go out as "detections" WebSocket messages instead
+# (snapshots and alert photos are still rendered on the server)
+OVERLAY_MODE = os.getenv("OVERLAY_MODE", "server").lower()
+SERVER_OVERLAY = OVERLAY_MODE != "client"
 RESTRICTED_HOURS_START = "17:30"
 RESTRICTED_HOURS_END = "17:35" 
 model = None
-known_embeddings: dict = {}  # user_id -> np.array
-user_names: dict = {}        # user_id -> name
-user_notes: dict = {}        # user_id -> note
-bad_embeddings: dict = {}    # bad_id -> np.array
-bad_names: dict = {}         # bad_id -> {name, reason}
-active_presence: dict = {}   # key -> presence info
-last_frame = None            # global annotated frame for streaming
+known_gallery = GalleryStore("known", ("name", "note"), "User")  # user_id -> embedding, name, note
+bad_gallery = GalleryStore("bad", ("name", "reason"), "Bad")      # bad_id -> embedding, name, reason
+galleries_ready = asyncio.Event()  # set once the boot-time gallery load finished
+galleries_version = 0              # gallery version the boot-time load is complete up to
+inference_pool = None  # InferencePool when INFERENCE_WORKERS > 0
 DHAKA_TZ = pytz.timezone("Asia/Dhaka")
 
 # ===================================================
 # Model Loading
 # ===================================================
 def load_model():
+    """Detector + recognition only by default; see app/model_pipeline.py for the knobs."""
     global model
     if model is None:
-        import insightface
-        model = insightface.app.FaceAnalysis(name="buffalo_l")
-        model.prepare(ctx_id=INSIGHTFACE_CTX_ID, det_size=(640, 640))
+        model = build_pipeline()
     return model
 
 
+def run_detection(jobs: list) -> list:
+    """Blocking: per-camera detection in worker processes, or in this process."""
+    if inference_pool is not None:
+        return inference_pool.detect_jobs(jobs)
+    return detect_jobs(model, jobs)
+
+
+def run_embedding(items: list, scales: list = None):
+    """Blocking: embed (frame, face) pairs in worker processes, or in this process."""
+    if inference_pool is not None:
+        return inference_pool.embed_faces(items, scales)
+    return embed_faces(model, items, scales)
+
+
+inference = InferenceBatcher(run_detection)  # batched per-camera detection
+
+
 def get_face_embedding_from_image(img_path: str):
     """Returns the first detected face embedding from image_path."""
     try:
@@ -68,62 +94,58 @@ def get_face_embedding_from_image(img_path: str):
 # Embeddings Loading
 # ===================================================
 async def reload_known_embeddings():
-    global known_embeddings, user_names, user_notes
-    known_embeddings = {}
-    user_names = {}
-    user_notes = {}
-    cursor = db.users.find({})
-    async for u in cursor:
-        if "embedding" in u and u["embedding"]:
-            uid = str(u["_id"])
-            try:
-                known_embeddings[uid] = np.array(u["embedding"], dtype=np.float32)
-            except Exception:
-                continue
-            user_names[uid] = u.get("name", f"User {uid[:4]}")
-            user_notes[uid] = u.get("note", "")
-    print(f"[recognition] loaded {len(known_embeddings)} known embeddings")
+    """Full rebuild of the known gallery from Mongo (startup / recovery only)."""
+    return await known_gallery.reload(db.users.find({}, GALLERY_PROJECTION))
 
 
 async def reload_bad_embeddings():
-    global bad_embeddings, bad_names
-    bad_embeddings = {}
-    bad_names = {}
-    cursor = db.bad_people.find({})
-    async for b in cursor:
-        if "embedding" in b and b["embedding"]:
-            bid = str(b["_id"])
-            bad_embeddings[bid] = np.array(b["embedding"], dtype=np.float32)
-            bad_names[bid] = {
-                "name": b.get("name", f"Bad {bid[:4]}"),
-                "reason": b.get("reason", ""),
-            }
-    print(f"[recognition] loaded {len(bad_embeddings)} bad embeddings")
+    """Full rebuild of the bad-people gallery from Mongo (startup / recovery only)."""
+    return await bad_gallery.reload(db.bad_people.find({}, GALLERY_PROJECTION))
+
+
+async def load_galleries():
+    """
+    Boot-time load: memory-mapped snapshot + Mongo deltas, or a full reload if
+    there is none. Returns the version the galleries are complete up to.
+    """
+    global galleries_version
+    try:
+        version = await gallery_snapshot.load_snapshot()
+        if version is not None:
+            galleries_version = version
+            return version
+        # read the version before reloading: anything written during the reload is newer
+        version = await gallery_sync.current_version()
+        await reload_known_embeddings()
+        await reload_bad_embeddings()
+        galleries_version = version
+        try:
+            await gallery_snapshot.save_snapshot(version)
+        except Exception as e:
+            print("[recognition] could not write gallery snapshot:", e)
+        return version
+    finally:
+        galleries_ready.set()
 
 
 # ===================================================
 # Matching Helpers
 # ===================================================
-def match_known(emb: np.ndarray):
-    best_id = None
-    best_dist = float("inf")
-    for uid, kev in known_embeddings.items():
-        d = float(np.linalg.norm(emb - kev))
-        if d < best_dist:
-            best_dist = d
-            best_id = uid
-    return best_id, best_dist
+def match_known(embs: np.ndarray, k: int = TOP_K):
+    """Top-k (user_id, distance) candidates for every face embedding in `embs`."""
+    return known_gallery.search(embs, k)
 
 
-def match_bad(emb: np.ndarray):
-    best_id = None
-    best_dist = float("inf")
-    for bid, bev in bad_embeddings.items():
-        d = float(np.linalg.norm(emb - bev))
-        if d < best_dist:
-            best_dist = d
-            best_id = bid
-    return best_id, best_dist
+def match_bad(embs: np.ndarray, k: int = TOP_K):
+    """Top-k (bad_id, distance) candidates for every face embedding in `embs`."""
+    return bad_gallery.search(embs, k)
+
+
+def best_candidate(candidates: list):
+    """Return (id, distance) of the closest candidate, or (None, inf)."""
+    if not candidates:
+        return None, float("inf")
+    return candidates[0]
 
 
 # ===================================================
@@ -179,144 +201,89 @@ async def is_restricted_time():
 # ===================================================
 # Alert Helper for Restricted Hours
 # ===================================================
-async def send_restricted_alert(person_type, name, id, reason_or_note, frame):
-    """Send email & telegram alert during restricted hours for unknown/bad people."""
+def send_restricted_alert(person_type, name, id, reason_or_note, frame, identity=None):
+    """
+    Queue email & telegram alerts during restricted hours for unknown/bad people.
+    `identity` keys the throttle (defaults to `id`). Returns True if queued,
+    False if the throttle suppressed it.
+    """
+    if not alerts.throttle.allow(f"restricted:{person_type.lower()}", identity or id):
+        return False
     now = datetime.datetime.now(DHAKA_TZ).replace(tzinfo=None)
-    abs_path, web_path = save_bgr_image(frame)
-    try:
-        send_alert_email(
-            subject=f"🚨 ALERT: Restricted Hours {person_type.title()} Detected",
-            body=(
-                f"Type: {person_type}\n"
-                f"Name: {name}\n"
-                f"ID: {id}\n"
-                f"Reason/Note: {reason_or_note or 'N/A'}\n"
-                f"Time: {now.strftime('%Y-%m-%d %I:%M:%S %p %Z')}"
-                
-            ),
-            image_path=abs_path,
-        )
-    except Exception as e:
-        print(f"[Email] Restricted alert failed for {person_type}: {e}")
-    try:
-        send_telegram_photo(
-            abs_path,
-            caption=(
-                f"🚨 Restricted Hours Alert!\n"
-                f"Type: {person_type}\n"
-                f"Name: {name}\n"
-                f"ID: {id}\n"
-                f"Reason/Note: {reason_or_note or 'N/A'}\n"
-                f"Time: {now.strftime('%Y-%m-%d %I:%M:%S %p %Z')}"
-            ),
-        )
-    except Exception as e:
-        print(f"[Telegram] Restricted alert failed for {person_type}: {e}")
+    abs_path, web_path, jpeg = save_bgr_jpeg(frame)
+    alerts.dispatch(
+        "email",
+        subject=f"🚨 ALERT: Restricted Hours {person_type.title()} Detected",
+        body=(
+            f"Type: {person_type}\n"
+            f"Name: {name}\n"
+            f"ID: {id}\n"
+            f"Reason/Note: {reason_or_note or 'N/A'}\n"
+            f"Time: {now.strftime('%Y-%m-%d %I:%M:%S %p %Z')}"
+        ),
+        image_path=abs_path,
+    )
+    alerts.dispatch(
+        "telegram",
+        jpeg,
+        caption=(
+            f"🚨 Restricted Hours Alert!\n"
+            f"Type: {person_type}\n"
+            f"Name: {name}\n"
+            f"ID: {id}\n"
+            f"Reason/Note: {reason_or_note or 'N/A'}\n"
+            f"Time: {now.strftime('%Y-%m-%d %I:%M:%S %p %Z')}"
+        ),
+    )
+    return True
+
+
+# unknown people get a fresh unknown_id per visit; alerts are throttled per person instead
+_alerted_unknowns = []  # [identity, embedding, monotonic last seen]
+
+
+def unknown_identity(emb, track, unknown_id: str) -> str:
+    """
+    Stable throttle identity for an unknown face: the one its track already has,
+    else that of a recent unknown with a matching embedding, else `unknown_id`.
+    """
+    if track is not None and track.unknown_identity:
+        return track.unknown_identity
+    now = time.monotonic()
+    horizon = alerts.ALERT_COOLDOWNS["unknown"]
+    _alerted_unknowns[:] = [u for u in _alerted_unknowns if now - u[2] < horizon]
+    best, best_dist = None, float("inf")
+    for entry in _alerted_unknowns:
+        d = float(np.linalg.norm(emb - entry[1]))
+        if d < best_dist:
+            best, best_dist = entry, d
+    if best is not None and best_dist <= THRESHOLD:
+        best[2] = now
+        identity = best[0]
+    else:
+        identity = unknown_id
+        _alerted_unknowns.append([identity, np.array(emb, dtype=np.float32), now])
+    if track is not None:
+        track.unknown_identity = identity
+    return identity
 
 
 # ===================================================
 # Beautiful Label Renderer
 # ===================================================
 def draw_ai_label(frame, x1, y1, x2, y2, person_type, name=None, note=None):
+    """Blend one cached label sprite onto the BGR frame in place; returns the frame."""
     try:
-        img_pil = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)).convert("RGBA")
-        font_title = ImageFont.truetype("fonts/Roboto-Bold.ttf", 14)
-        font_note = ImageFont.truetype("fonts/Roboto-Italic.ttf", 10)
-
-        if person_type == "known":
-            grad_start, grad_end = (80, 255, 150, 130), (30, 150, 90, 100)
-            title_color, note_color = (20, 60, 20, 255), (50, 50, 50, 255)
-            lines = [name or "Known Person"]
-            if note:
-                lines.append(note)
-        elif person_type == "bad":
-            grad_start, grad_end = (255, 70, 70, 140), (180, 0, 0, 100)
-            title_color, note_color = (255, 255, 255, 255), (235, 235, 235, 255)
-            lines = [name or "Suspect"]
-            if note:
-                lines.append(note)
-        else:
-            grad_start, grad_end = (255, 170, 60, 130), (240, 110, 0, 100)
-            title_color, note_color = (255, 255, 255, 255), (245, 245, 245, 255)
-            lines = ["Unknown"]
-
-        draw = ImageDraw.Draw(img_pil, "RGBA")
-        text_boxes = [
-            draw.textbbox((0, 0), line, font=font_title if i == 0 else font_note)
-            for i, line in enumerate(lines)
-        ]
-        width = max(w - x for x, y, w, h in text_boxes) + 28
-        height = sum(h - y for x, y, w, h in text_boxes) + 24 + (len(lines) - 1) * 5
-
-        text_x = x1
-        text_y = max(0, y1 - height - 50)
-        radius = 12
-
-        gradient = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-        grad_draw = ImageDraw.Draw(gradient)
-        for y in range(height):
-            r = int(grad_start[0] + (grad_end[0] - grad_start[0]) * (y / height))
-            g = int(grad_start[1] + (grad_end[1] - grad_start[1]) * (y / height))
-            b = int(grad_start[2] + (grad_end[2] - grad_start[2]) * (y / height))
-            a = int(grad_start[3] + (grad_end[3] - grad_start[3]) * (y / height))
-            grad_draw.line([(0, y), (width, y)], fill=(r, g, b, a))
-
-        mask = Image.new("L", (width, height), 0)
-        mask_draw = ImageDraw.Draw(mask)
-        mask_draw.rounded_rectangle([(0, 0), (width, height)], radius=radius, fill=255)
-
-        label_img = Image.new("RGBA", img_pil.size, (0, 0, 0, 0))
-        label_img.paste(gradient, (text_x, text_y), mask)
-        img_pil = Image.alpha_composite(img_pil, label_img)
-
-        draw = ImageDraw.Draw(img_pil, "RGBA")
-        ty = text_y + 12
-        for i, line in enumerate(lines):
-            color = title_color if i == 0 else note_color
-            font = font_title if i == 0 else font_note
-            draw.text((text_x + 14, ty), line, font=font, fill=color)
-            ty += (text_boxes[i][3] - text_boxes[i][1]) + 6
-
-        frame = cv2.cvtColor(np.array(img_pil.convert("RGB")), cv2.COLOR_RGB2BGR)
-        return frame
-
+        return label_renderer.draw_labels(frame, [(x1, y1, x2, y2, person_type, name, note)])
     except Exception as e:
         print("[draw_ai_label] error:", e)
         return frame
 
 
-
 def draw_restricted_hour_banner(frame):
-    """Draws a red transparent banner 'RESTRICTED HOUR' on top of frame."""
+    """Draws a red transparent banner 'RESTRICTED HOUR' on top of frame (in place)."""
     try:
-        img_pil = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)).convert("RGBA")
-        draw = ImageDraw.Draw(img_pil, "RGBA")
-        w, h = img_pil.size
-
-        # Banner height and background (semi-transparent red)
-        banner_height = 40
-        banner_color = (255, 0, 0, 140)
-        draw.rectangle([(0, 0), (w, banner_height)], fill=banner_color)
-
-        # Text
-        font = ImageFont.truetype("fonts/Roboto-Bold.ttf", 24)
-        text = "RESTRICTED HOUR ACTIVE"
-
-        # --- Pillow 10+ compatible text measurement ---
-        bbox = font.getbbox(text)
-        text_w = bbox[2] - bbox[0]
-        text_h = bbox[3] - bbox[1]
-
-        draw.text(
-            ((w - text_w) / 2, (banner_height - text_h) / 2),
-            text,
-            font=font,
-            fill=(255, 255, 255, 255),
-        )
-
-        # Convert back to OpenCV format
-        return cv2.cvtColor(np.array(img_pil.convert("RGB")), cv2.COLOR_RGB2BGR)
-
+        return label_renderer.draw_banner(frame, "RESTRICTED HOUR ACTIVE")
     except Exception as e:
         print("[draw_restricted_hour_banner] error:", e)
         return frame
@@ -324,267 +291,403 @@ def draw_restricted_hour_banner(frame):
 
 
 # ===================================================
-# Recognition Loop
+# Per-Frame Processing
 # ===================================================
-async def start_recognition_loop():
-    global last_frame
-    load_model()
-    await reload_known_embeddings()
-    await reload_bad_embeddings()
-    loop = asyncio.get_running_loop()
-    cap = cv2.VideoCapture(0)
+async def process_faces(camera, frame_small, faces, frame_embs, bad_candidates, known_candidates, now, tracks=None):
+    """
+    Match, label and record presence for every face found in one camera frame.
+    `tracks` (optional, aligned with `faces`) keeps unknown alert identities
+    stable across a visit. Returns (frame, overlays): the frame (labelled when
+    SERVER_OVERLAY) and the per-face label data for client-side rendering.
+    """
+    active_presence = camera.active_presence
+    processed_keys = set()
+    overlays = []
+    labels = []
+
+    def label(x1, y1, x2, y2, person_type, name=None, note=None, person_id=None):
+        """Record the face's label; all labels are drawn in one pass at the end."""
+        labels.append((x1, y1, x2, y2, person_type, name, note))
+        overlays.append({
+            "bbox": [int(x1), int(y1), int(x2), int(y2)],
+            "type": person_type,
+            "id": person_id,
+            "name": name,
+            "note": note,
+        })
+
+    def labelled():
+        """Copy of the frame with the labels recorded so far, for snapshots and alert photos."""
+        return label_renderer.draw_labels(frame_small.copy(), labels)
+
+    for i, face in enumerate(faces):
+        emb = frame_embs[i]
+        bid, bad_dist = best_candidate(bad_candidates[i])
+        uid, dist = best_candidate(known_candidates[i])
+        x1, y1, x2, y2 = face.bbox.astype(int)
+
+        # ==========================================================
+        # BAD PERSON
+        # ==========================================================
+        if bid is not None and bad_dist <= THRESHOLD:
+            bad_info = bad_gallery.get(bid)
+            name = bad_info["name"]
+            reason = bad_info["reason"]
+            key = f"bad:{bid}"
+            label(x1, y1, x2, y2, "bad", name, reason, bid)
+
+            if key not in active_presence:
+                snapshot = labelled()
+                abs_path, web_path, jpeg = save_bgr_jpeg(snapshot)
+                await manager.broadcast_json({
+                    "type": "alert_bad",
+                    "bad_id": bid,
+                    "name": name,
+                    "reason": reason,
+                    "snapshot": web_path,
+                    "first_seen": now.isoformat(),
+                    "camera_id": camera.camera_id,
+                })
+                print(f"[ALERT] Bad person detected: {name} - {reason}")
+
+                # ✅ Restricted hours alert (only once per detection)
+                restricted_sent = False
+                if await is_restricted_time():
+                    restricted_sent = send_restricted_alert("Bad", name, bid, reason, snapshot)
+
+                # ✅ Regular alert (throttled per identity; queued, sent off the event loop)
+                if alerts.throttle.allow("bad", bid):
+                    alerts.dispatch(
+                        "email",
+                        subject=f"🚨 ALERT: Bad Person Detected - {name}",
+                        body=f"Name: {name}\nReason: {reason}\nID: {bid}\nTime: {now.strftime('%Y-%m-%d %I:%M:%S %p')}",
+                        image_path=abs_path,
+                    )
+                    alerts.dispatch(
+                        "telegram",
+                        jpeg,
+                        caption=(
+                            f"🚨 Bad Person Detected!\n"
+                            f"👤 Name: {name}\n"
+                            f"⚠️ Reason: {reason or 'N/A'}\n"
+                            f"🆔 ID: {bid or 'N/A'}\n"
+                            f"🕒 Time: {now.strftime('%Y-%m-%d %I:%M:%S %p')}"
+                        ),
+                    )
+
+                active_presence[key] = {
+                    "id": bid,
+                    "event_id": None,
+                    "entry_time": now,
+                    "last_seen": now,
+                    "embedding": emb,
+                    "type": "bad",
+                    "restricted_alert_sent": restricted_sent,
+                }
+            else:
+                active_presence[key]["last_seen"] = now
+                processed_keys.add(key)
+
+        # ==========================================================
+        # KNOWN PERSON
+        # ==========================================================
+        elif uid is not None and dist <= THRESHOLD:
+            user_info = known_gallery.get(uid)
+            name = user_info["name"]
+            note = user_info["note"]
+            key = f"known:{uid}"
+            label(x1, y1, x2, y2, "known", name, note, uid)
+
+            if key not in active_presence:
+                snapshot = labelled()
+                abs_path, web_path = save_bgr_image(snapshot)
+                ev = {
+                    "user_id": ObjectId(uid),
+                    "entry_time": now,
+                    "exit_time": None,
+                    "snapshot_path": web_path,
+                    "camera_id": camera.camera_id,
+                }
+                event_id = write_behind.writer.insert("presence_events", ev)
+
+                # ✅ Restricted hours alert only once
+                restricted_sent = False
+                if await is_restricted_time():
+                    restricted_sent = send_restricted_alert("Known", name, uid, note, snapshot)
+
+                active_presence[key] = {
+                    "id": uid,
+                    "event_id": event_id,
+                    "entry_time": now,
+                    "last_seen": now,
+                    "type": "known",
+                    "restricted_alert_sent": restricted_sent,
+                }
+
+                await manager.broadcast_json({
+                    "type": "known",
+                    "user_id": uid,
+                    "name": name,
+                    "note": note,
+                    "first_seen": now.isoformat(),
+                    "snapshot": web_path,
+                    "camera_id": camera.camera_id,
+                })
+            else:
+                active_presence[key]["last_seen"] = now
+                processed_keys.add(key)
+
+        # ==========================================================
+        # UNKNOWN PERSON
+        # ==========================================================
+        else:
+            matched_unknown_key = None
+            matched_unknown_dist = float("inf")
+            for key, info in active_presence.items():
+                if not key.startswith("unknown:"):
+                    continue
+                stored_emb = info.get("embedding")
+                if stored_emb is None:
+                    continue
+                d = float(np.linalg.norm(emb - stored_emb))
+                if d < matched_unknown_dist:
+                    matched_unknown_dist = d
+                    matched_unknown_key = key
+
+            # If we matched an existing unknown, update last_seen AND draw label
+            if matched_unknown_key and matched_unknown_dist <= THRESHOLD:
+                # draw label so it remains visible each frame
+                label(x1, y1, x2, y2, "unknown", person_id=active_presence[matched_unknown_key]["id"])
+
+                # update last_seen and optionally refine stored embedding (running average)
+                info = active_presence[matched_unknown_key]
+                info["last_seen"] = now
+                processed_keys.add(matched_unknown_key)
+
+                # optional: update embedding with a small moving average to stabilize matching
+                try:
+                    stored_emb = info.get("embedding")
+                    if stored_emb is not None:
+                        # blend: new_emb = 0.6 * stored + 0.4 * current
+                        blended = 0.6 * np.array(stored_emb, dtype=np.float32) + 0.4 * emb
+                        info["embedding"] = blended
+                except Exception:
+                    pass
+
+            else:
+                # new unknown: draw label, save snapshot, create DB doc and active_presence entry
+                label(x1, y1, x2, y2, "unknown")
+                snapshot = labelled()
+                abs_path, web_path = save_bgr_image(snapshot)
+                unknown_doc = {
+                    "image_path": web_path,
+                    "embedding": encode_embedding(emb),
+                    "first_seen": now,
+                    "last_seen": now,
+                    "alert_sent": True,
+                    "camera_id": camera.camera_id,
+                }
+                unknown_id = str(write_behind.writer.insert("unknowns", unknown_doc))
+                key = f"unknown:{unknown_id}"
+
+                # ✅ Restricted hours alert only once
+                restricted_sent = False
+                if await is_restricted_time():
+                    identity = unknown_identity(emb, tracks[i] if tracks else None, unknown_id)
+                    restricted_sent = send_restricted_alert("Unknown", "N/A", unknown_id, None, snapshot, identity)
+
+                active_presence[key] = {
+                    "id": unknown_id,
+                    "event_id": None,
+                    "entry_time": now,
+                    "last_seen": now,
+                    "embedding": emb,
+                    "type": "unknown",
+                    "restricted_alert_sent": restricted_sent,
+                }
+
+                await manager.broadcast_json({
+                    "type": "unknown",
+                    "unknown_id": unknown_id,
+                    "image_path": web_path,
+                    "first_seen": now.isoformat(),
+                    "camera_id": camera.camera_id,
+                })
+
+    if SERVER_OVERLAY and labels:
+        label_renderer.draw_labels(frame_small, labels)
+    return frame_small, overlays
+
+
+async def cleanup_presence(camera, now):
+    """Close presence for people this camera has not seen for ABSENCE_TIMEOUT seconds."""
+    active_presence = camera.active_presence
+    to_remove = []
+    for key, info in list(active_presence.items()):
+        if (now - info["last_seen"]).total_seconds() > ABSENCE_TIMEOUT:
+            exit_time = info["last_seen"]
+            duration = (exit_time - info["entry_time"]).total_seconds()
+
+            if info.get("event_id"):
+                write_behind.writer.update(
+                    "presence_events",
+                    {"_id": info["event_id"]},
+                    {"$set": {"exit_time": exit_time, "duration_seconds": duration}},
+                )
+                scheduler.record_presence(info["event_id"], info["id"], info["entry_time"], exit_time, duration)
+
+            await manager.broadcast_json({
+                "type": "presence_end",
+                "id": info["id"],
+                "duration_seconds": duration,
+                "exit_time": exit_time.isoformat(),
+                "presence_type": info.get("type"),
+                "camera_id": camera.camera_id,
+            })
+            to_remove.append(key)
+
+    for k in to_remove:
+        active_presence.pop(k, None)
 
-    if not cap.isOpened():
-        print("[recognition] WARNING: camera 0 could not be opened")
 
-    try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                await asyncio.sleep(0.5)
-                continue
+# ===================================================
+# Client-Side Overlays
+# ===================================================
+_overlay_state = {}  # camera_id -> (faces, restricted) of the last "detections" message
+
+
+def publish_overlays(camera, frame_small, overlays: list, restricted: bool):
+    """
+    Queue boxes/labels for one display frame; empty frames only when something
+    must be cleared. Never waits on clients (see app/ws_manager.py).
+    """
+    state = (len(overlays), restricted)
+    if not overlays and _overlay_state.get(camera.camera_id) == state:
+        return
+    _overlay_state[camera.camera_id] = state
+    h, w = frame_small.shape[:2]
+    manager.publish({
+        "type": "detections",
+        "camera_id": camera.camera_id,
+        "seq": camera.display_ring.head,
+        "width": w,
+        "height": h,
+        "restricted": restricted,
+        "faces": overlays,
+    })
 
-            h, w = frame.shape[:2]
-            new_h = int(h * RESIZE_WIDTH / w)
-            frame_small = cv2.resize(frame, (RESIZE_WIDTH, new_h))
 
-            try:
-                faces = await loop.run_in_executor(None, model.get, frame_small)
-            except Exception as ex:
-                print("[recognition] inference error:", ex)
-                faces = []
-
-            now = datetime.datetime.now(DHAKA_TZ).replace(tzinfo=None)
-            processed_keys = set()
-
-            for face in faces:
-                emb = face.normed_embedding.astype(np.float32)
-                bid, bad_dist = match_bad(emb)
-                uid, dist = match_known(emb)
-                x1, y1, x2, y2 = face.bbox.astype(int)
-
-                # ==========================================================
-                # BAD PERSON
-                # ==========================================================
-                if bid is not None and bad_dist <= THRESHOLD:
-                    bad_info = bad_names.get(bid, {})
-                    name = bad_info.get("name", f"Suspect {bid[:4]}")
-                    reason = bad_info.get("reason", "")
-                    key = f"bad:{bid}"
-                    frame_small = draw_ai_label(frame_small, x1, y1, x2, y2, "bad", name, reason)
-
-                    if key not in active_presence:
-                        abs_path, web_path = save_bgr_image(frame_small)
-                        await manager.broadcast_json({
-                            "type": "alert_bad",
-                            "bad_id": bid,
-                            "name": name,
-                            "reason": reason,
-                            "snapshot": web_path,
-                            "first_seen": now.isoformat(),
-                        })
-                        print(f"[ALERT] Bad person detected: {name} - {reason}")
-
-                        # ✅ Restricted hours alert (only once per detection)
-                        restricted_sent = False
-                        if await is_restricted_time():
-                            await send_restricted_alert("Bad", name, bid, reason, frame_small)
-                            restricted_sent = True
-                        
-                        # ✅ Regular alert
-                        try:
-                            send_alert_email(
-                                subject=f"🚨 ALERT: Bad Person Detected - {name}",
-                                body=f"Name: {name}\nReason: {reason}\nID: {bid}\nTime: {now.strftime('%Y-%m-%d %I:%M:%S %p')}",
-                                image_path=abs_path,
-                            )
-                        except Exception as e:
-                            print("[Email] Alert send failed", e)
-                            
-                        try:
-                            send_telegram_photo(
-                                abs_path,
-                                caption=(
-                                    f"🚨 Bad Person Detected!\n"
-                                    f"👤 Name: {name}\n"
-                                    f"⚠️ Reason: {reason or 'N/A'}\n"
-                                    f"🆔 ID: {bid or 'N/A'}\n"
-                                    f"🕒 Time: {now.strftime('%Y-%m-%d %I:%M:%S %p')}"
-                                ),
-                            )
-                            print("[Telegram] Alert sent")
-                        except Exception as e:
-                            print("[Telegram] Alert send failed", e)
-
-                        active_presence[key] = {
-                            "id": bid,
-                            "event_id": None,
-                            "entry_time": now,
-                            "last_seen": now,
-                            "embedding": emb,
-                            "type": "bad",
-                            "restricted_alert_sent": restricted_sent,
-                        }
-                    else:
-                        active_presence[key]["last_seen"] = now
-                        processed_keys.add(key)
-
-                # ==========================================================
-                # KNOWN PERSON
-                # ==========================================================
-                elif uid is not None and dist <= THRESHOLD:
-                    name = user_names.get(uid, f"User {uid[:4]}")
-                    note = user_notes.get(uid, "")
-                    key = f"known:{uid}"
-                    frame_small = draw_ai_label(frame_small, x1, y1, x2, y2, "known", name, note)
-
-                    if key not in active_presence:
-                        abs_path, web_path = save_bgr_image(frame_small)
-                        ev = {
-                            "user_id": ObjectId(uid),
-                            "entry_time": now,
-                            "exit_time": None,
-                            "snapshot_path": web_path,
-                        }
-                        res = await db.presence_events.insert_one(ev)
-
-                        # ✅ Restricted hours alert only once
-                        restricted_sent = False
-                        if await is_restricted_time():
-                            await send_restricted_alert("Known", name, uid, note, frame_small)
-                            restricted_sent = True
-
-                        active_presence[key] = {
-                            "id": uid,
-                            "event_id": res.inserted_id,
-                            "entry_time": now,
-                            "last_seen": now,
-                            "type": "known",
-                            "restricted_alert_sent": restricted_sent,
-                        }
-
-                        await manager.broadcast_json({
-                            "type": "known",
-                            "user_id": uid,
-                            "name": name,
-                            "note": note,
-                            "first_seen": now.isoformat(),
-                            "snapshot": web_path,
-                        })
+# ===================================================
+# Recognition Loop
+# ===================================================
+async def start_recognition_loop():
+    global inference_pool
+    loop = asyncio.get_running_loop()
+    # model load blocks; run it in a thread so the gallery load overlaps with it
+    if INFERENCE_WORKERS > 0:
+        inference_pool = InferencePool(INFERENCE_WORKERS)
+        startup = loop.run_in_executor(None, inference_pool.start)
+    else:
+        startup = loop.run_in_executor(None, load_model)
+    await asyncio.gather(startup, load_galleries())
+    await cameras.start_cameras()
+
+    min_interval = 1.0 / MAX_PROCESS_FPS if MAX_PROCESS_FPS > 0 else 0.0
+
+    while True:
+        started = loop.time()
+        # newest frame from every camera that has one; never blocks on capture
+        batch, jobs, skipped, captured_at = [], [], [], {}
+        for camera in list(cameras.cameras.values()):
+            frame, ts = camera.take_frame()
+            if frame is None:
+                continue
+            # display frame is resized straight into the camera's display ring slot
+            frame_small = camera.render_display(frame, RESIZE_WIDTH)
+            # motion gate: idle frames skip inference entirely (keep-alive detections still run)
+            run, motion_boxes = camera.motion.check(frame_small, has_tracks=bool(camera.tracker.tracks))
+            if not run:
+                camera.release_frame()
+                skipped.append((camera, frame_small))
+                continue
+            batch.append((camera, frame, frame_small))
+            captured_at[camera.camera_id] = ts
+            boxes = [t.bbox for t in camera.tracker.tracks]
+            jobs.append({
+                "frame": frame,
+                "display": frame_small,
+                "policy": camera.policy,
+                "full": camera.policy.wants_full(camera.tracker.frame_no + 1, boxes),
+                "boxes": boxes + motion_boxes,
+                # shared-memory locations so worker processes can read the frames in place
+                "frame_ref": camera.frame_ref,
+                "display_ref": camera.display_ref(),
+            })
+
+        # shared detection stage: one micro-batch for all cameras, each following its own policy
+        try:
+            frame_faces = await inference.infer_many(jobs)
+        except Exception as e:
+            print("[recognition] inference error:", e)
+            frame_faces = [[] for _ in batch]
+
+        # track faces; only new tracks, stale tracks and better views get a fresh embedding
+        frame_tracks, pending = [], []
+        for (camera, frame, frame_small), faces in zip(batch, frame_faces):
+            tracks = camera.tracker.update(faces)
+            frame_tracks.append(tracks)
+            for face, track in zip(faces, tracks):
+                if camera.tracker.needs_embedding(track, face):
+                    if camera.policy.full_res_recognition:
+                        pending.append((camera, frame, face, track, frame.shape[1] / frame_small.shape[1]))
                     else:
-                        active_presence[key]["last_seen"] = now
-                        processed_keys.add(key)
-
-                # ==========================================================
-                # UNKNOWN PERSON
-                # ==========================================================
-                else:
-                    matched_unknown_key = None
-                    matched_unknown_dist = float("inf")
-                    for key, info in active_presence.items():
-                        if not key.startswith("unknown:"):
-                            continue
-                        stored_emb = info.get("embedding")
-                        if stored_emb is None:
-                            continue
-                        d = float(np.linalg.norm(emb - stored_emb))
-                        if d < matched_unknown_dist:
-                            matched_unknown_dist = d
-                            matched_unknown_key = key
-
-                    # If we matched an existing unknown, update last_seen AND draw label
-                    if matched_unknown_key and matched_unknown_dist <= THRESHOLD:
-                        # draw label so it remains visible each frame
-                        frame_small = draw_ai_label(frame_small, x1, y1, x2, y2, "unknown")
-
-                        # update last_seen and optionally refine stored embedding (running average)
-                        info = active_presence[matched_unknown_key]
-                        info["last_seen"] = now
-                        processed_keys.add(matched_unknown_key)
-
-                        # optional: update embedding with a small moving average to stabilize matching
-                        try:
-                            stored_emb = info.get("embedding")
-                            if stored_emb is not None:
-                                # blend: new_emb = 0.6 * stored + 0.4 * current
-                                blended = 0.6 * np.array(stored_emb, dtype=np.float32) + 0.4 * emb
-                                info["embedding"] = blended
-                        except Exception:
-                            pass
+                        pending.append((camera, frame_small, face, track, 1.0))
 
-                    else:
-                        # new unknown: draw label, save snapshot, create DB doc and active_presence entry
-                        frame_small = draw_ai_label(frame_small, x1, y1, x2, y2, "unknown")
-                        abs_path, web_path = save_bgr_image(frame_small)
-                        unknown_doc = {
-                            "image_path": web_path,
-                            "embedding": emb.tolist(),
-                            "first_seen": now,
-                            "last_seen": now,
-                            "alert_sent": True,
-                        }
-                        res = await db.unknowns.insert_one(unknown_doc)
-                        unknown_id = str(res.inserted_id)
-                        key = f"unknown:{unknown_id}"
-
-                        # ✅ Restricted hours alert only once
-                        restricted_sent = False
-                        if await is_restricted_time():
-                            await send_restricted_alert("Unknown", "N/A", unknown_id, None, frame_small)
-                            restricted_sent = True
-
-                        active_presence[key] = {
-                            "id": unknown_id,
-                            "event_id": None,
-                            "entry_time": now,
-                            "last_seen": now,
-                            "embedding": emb,
-                            "type": "unknown",
-                            "restricted_alert_sent": restricted_sent,
-                        }
-
-                        await manager.broadcast_json({
-                            "type": "unknown",
-                            "unknown_id": unknown_id,
-                            "image_path": web_path,
-                            "first_seen": now.isoformat(),
-                        })
-
-            # ==========================================================
-            # CLEANUP INACTIVE PEOPLE
-            # ==========================================================
-            to_remove = []
-            for key, info in list(active_presence.items()):
-                if (now - info["last_seen"]).total_seconds() > ABSENCE_TIMEOUT:
-                    exit_time = info["last_seen"]
-                    duration = (exit_time - info["entry_time"]).total_seconds()
-
-                    if info.get("event_id"):
-                        await db.presence_events.update_one(
-                            {"_id": info["event_id"]},
-                            {"$set": {"exit_time": exit_time, "duration_seconds": duration}},
-                        )
-
-                    await manager.broadcast_json({
-                        "type": "presence_end",
-                        "id": info["id"],
-                        "duration_seconds": duration,
-                        "exit_time": exit_time.isoformat(),
-                        "presence_type": info.get("type"),
-                    })
-                    to_remove.append(key)
-
-            for k in to_remove:
-                active_presence.pop(k, None)
-
-            # ==========================================================
-            # DRAW RESTRICTED BANNER IF ACTIVE
-            # ==========================================================
-            if await is_restricted_time():
+        if pending:
+            try:
+                await loop.run_in_executor(
+                    None, run_embedding, [(img, face) for _, img, face, _, _ in pending], [p[4] for p in pending]
+                )
+                embs = np.stack([face.normed_embedding for _, _, face, _, _ in pending]).astype(np.float32)
+                # match every fresh embedding from every camera against both galleries at once
+                for (camera, _, face, track, _), emb, bad, known in zip(pending, embs, match_bad(embs), match_known(embs)):
+                    track.remember(emb, bad, known, face_quality(face), camera.tracker.frame_no)
+            except Exception as e:
+                print("[recognition] embedding error:", e)
+
+        now = datetime.datetime.now(DHAKA_TZ).replace(tzinfo=None)
+        restricted = await is_restricted_time() if batch or skipped else False
+        banner = restricted and SERVER_OVERLAY
+        for camera, frame_small in skipped:
+            camera.publish(draw_restricted_hour_banner(frame_small) if banner else frame_small)
+        for (camera, _, frame_small), faces, tracks in zip(batch, frame_faces, frame_tracks):
+            # faces whose track has no identity yet (embedding failed) are skipped this frame
+            tracked = [(f, t) for f, t in zip(faces, tracks) if t.embedding is not None]
+            overlays = []
+            if tracked:
+                faces = [f for f, _ in tracked]
+                embs = np.stack([t.embedding for _, t in tracked])
+                frame_small, overlays = await process_faces(
+                    camera, frame_small, faces, embs,
+                    [t.bad_candidates for _, t in tracked], [t.known_candidates for _, t in tracked], now,
+                    tracks=[t for _, t in tracked],
+                )
+                for overlay, (_, track) in zip(overlays, tracked):
+                    overlay["track_id"] = track.track_id
+            if banner:
                 frame_small = draw_restricted_hour_banner(frame_small)
-
-            last_frame = frame_small
-            await asyncio.sleep(0.05)
-
-    finally:
-        cap.release()
+            camera.publish(frame_small)
+            camera.mark_processed(captured_at[camera.camera_id])
+            if not SERVER_OVERLAY:
+                publish_overlays(camera, frame_small, overlays, restricted)
+            # detection, embedding crops and drawing are done with the captured frame
+            camera.release_frame()
+
+        for camera in list(cameras.cameras.values()):
+            await cleanup_presence(camera, now)
+
+        # pace to MAX_PROCESS_FPS, then wait for the next captured frame
+        remaining = min_interval - (loop.time() - started)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        await cameras.wait_for_frames(timeout=0.5)
@@ -2,8 +2,7 @@ import cv2
 import numpy as np
 import datetime
 import pytz
-from app.email_utils import send_alert_email
-from app.telegram_utils import send_telegram_photo
+from app import alerts
 
 DHAKA_TZ = pytz.timezone("Asia/Dhaka")
 
@@ -37,7 +36,9 @@ def is_inside_restricted_area(x1, y1, x2, y2):
 
 
 async def send_restricted_area_alert(person_type, name, pid, reason, frame):
-    """Send restricted area alert for Unknown/Bad person."""
+    """Send restricted area alert for Unknown/Bad person. Returns True if queued."""
+    if not alerts.throttle.allow(f"area:{person_type.lower()}", pid):
+        return False
     now = datetime.datetime.now(DHAKA_TZ).replace(tzinfo=None)
     filename = f"restricted_{pid}_{int(now.timestamp())}.jpg"
     cv2.imwrite(filename, frame)
@@ -51,14 +52,7 @@ async def send_restricted_area_alert(person_type, name, pid, reason, frame):
         f"Time: {now.strftime('%Y-%m-%d %I:%M:%S %p %Z')}"
     )
 
-    try:
-        send_alert_email(subject=subject, body=body, image_path=filename)
-        print(f"[Email] Restricted area alert sent for {person_type}: {name}")
-    except Exception as e:
-        print("[Email] Restricted area alert failed:", e)
-
-    try:
-        send_telegram_photo(filename, caption=body)
-        print(f"[Telegram] Restricted area alert sent for {person_type}: {name}")
-    except Exception as e:
-        print("[Telegram] Restricted area telegram failed:", e)
+    alerts.dispatch("email", subject=subject, body=body, image_path=filename)
+    alerts.dispatch("telegram", filename, caption=body)
+    print(f"[Alerts] Restricted area alert queued for {person_type}: {name}")
+    return True
@@ -3,13 +3,79 @@
 import asyncio
 import datetime
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from pymongo import UpdateOne
 from app.db import db
+from app import write_behind
 from bson import ObjectId
 
 scheduler = AsyncIOScheduler()
 
+def _total_of(events: str) -> dict:
+    """Aggregation expression summing the values of an event_id -> seconds map."""
+    return {"$sum": {"$map": {"input": {"$objectToArray": {"$ifNull": [events, {}]}}, "in": "$$this.v"}}}
+
+
+def record_presence(event_id, user_id: str, entry_time: datetime.datetime, exit_time: datetime.datetime, duration: float):
+    """
+    Fold one closed presence event into its user's attendance_logs rollup for
+    the entry day (queued through the write-behind buffer, upserted).
+
+    Each event's duration is stored under events.<event_id> and the total is
+    recomputed from that map in the same update, so replaying the write
+    after an ambiguous bulk_write failure cannot count an event twice.
+    """
+    try:
+        user_id_obj = ObjectId(user_id)
+    except Exception:
+        return
+    events = {"$mergeObjects": [{"$ifNull": ["$events", {}]}, {str(event_id): duration}]}
+    write_behind.writer.update(
+        "attendance_logs",
+        {"date": entry_time.date().isoformat(), "user_id": user_id_obj},
+        [
+            {"$set": {
+                "events": events,
+                "first_seen": {"$min": ["$first_seen", entry_time]},
+                "last_seen": {"$max": ["$last_seen", exit_time]},
+                "created_at": {"$ifNull": ["$created_at", datetime.datetime.utcnow()]},
+            }},
+            {"$set": {"total_duration_seconds": _total_of("$events")}},
+        ],
+        upsert=True,
+    )
+
+
+async def read_attendance_for_date(target_date: datetime.date):
+    """Attendance rollups for a date, with user names from the users collection."""
+    logs = await db.attendance_logs.find(
+        {"date": target_date.isoformat()}, {"_id": 0, "created_at": 0, "events": 0}
+    ).to_list(length=None)
+    names = {}
+    cursor = db.users.find({"_id": {"$in": [doc["user_id"] for doc in logs]}}, {"name": 1})
+    async for user in cursor:
+        names[user["_id"]] = user.get("name")
+
+    rows = []
+    for doc in logs:
+        rows.append({
+            "user_id": str(doc["user_id"]),
+            "user_name": names.get(doc["user_id"]) or "Unknown",
+            "total_duration_seconds": doc.get("total_duration_seconds", 0),
+            "first_seen": doc.get("first_seen"),
+            "last_seen": doc.get("last_seen"),
+            "date": doc["date"],
+        })
+    return rows
+
+
 async def generate_attendance_for_date(target_date: datetime.date):
-    """Aggregate presence_events for the given date into attendance_logs."""
+    """
+    Recompute attendance_logs for the given date from presence_events (backfill
+    and nightly reconciliation; day-to-day rollups come from record_presence).
+    """
+    # exits still in the write buffer belong in the totals
+    await write_behind.writer.flush()
+
     start = datetime.datetime.combine(target_date, datetime.time.min)
     end = start + datetime.timedelta(days=1)
 
@@ -38,11 +104,14 @@ async def generate_attendance_for_date(target_date: datetime.date):
                 "total_duration": {"$sum": "$duration_seconds"},
                 "first_seen": {"$min": "$entry_time"},
                 "last_seen": {"$max": "$exit_time"},
+                "events": {"$push": {"k": {"$toString": "$_id"}, "v": "$duration_seconds"}},
             }
         },
+        {"$set": {"events": {"$arrayToObject": "$events"}}},
     ]
 
-    # 🧩 Step 2: Aggregate and upsert to attendance_logs
+    # 🧩 Step 2: Aggregate and upsert to attendance_logs (one bulk write)
+    ops = []
     cursor = db.presence_events.aggregate(pipeline)
     async for row in cursor:
         user_id_obj = row["_id"]
@@ -56,17 +125,22 @@ async def generate_attendance_for_date(target_date: datetime.date):
             "date": target_date.isoformat(),
             "user_id": user_id_obj,
             "total_duration_seconds": row.get("total_duration", 0),
+            "events": row.get("events", {}),  # per-event contributions record_presence adds to
             "first_seen": row.get("first_seen"),
             "last_seen": row.get("last_seen"),
             "created_at": datetime.datetime.utcnow(),
         }
 
         # ✅ Use upsert to keep only one record per user/day
-        await db.attendance_logs.update_one(
+        ops.append(UpdateOne(
             {"date": target_date.isoformat(), "user_id": user_id_obj},
             {"$set": doc},
             upsert=True
-        )
+        ))
+
+    if ops:
+        await db.attendance_logs.bulk_write(ops, ordered=False)
+    return len(ops)
 
 def start_scheduler():
     """Start nightly attendance aggregation job."""
@@ -0,0 +1,145 @@
+# backend/app/stream.py
+"""Encode-once MJPEG broadcasting for /video_feed."""
+
+import os
+import asyncio
+
+import cv2
+from dotenv import load_dotenv
+from fastapi.responses import StreamingResponse
+
+from app import cameras
+
+load_dotenv()
+
+STREAM_MAX_FPS = float(os.getenv("STREAM_MAX_FPS", "15"))
+STREAM_JPEG_QUALITY = int(os.getenv("STREAM_JPEG_QUALITY", "80"))
+STREAM_SLOW_CLIENT_TIMEOUT = float(os.getenv("STREAM_SLOW_CLIENT_TIMEOUT", "10"))
+
+BOUNDARY = b"--frame\r\nContent-Type: image/jpeg\r\n\r\n"
+
+
+class MjpegBroadcaster:
+    def __init__(self, camera):
+        self.camera = camera
+        self.seq = 0
+        self.jpeg = None
+        self.clients = 0
+        self.stats = {"encoded": 0, "frames_sent": 0, "dropped_clients": 0, "encode_ms": 0.0}
+        self._changed = asyncio.Condition()
+        self._task = None
+
+    def subscribe(self):
+        self.clients += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._encode_loop())
+
+    def unsubscribe(self):
+        self.clients -= 1
+
+    async def _encode_loop(self):
+        loop = asyncio.get_running_loop()
+        min_interval = 1.0 / STREAM_MAX_FPS if STREAM_MAX_FPS > 0 else 0.0
+        params = [cv2.IMWRITE_JPEG_QUALITY, STREAM_JPEG_QUALITY]
+        while self.clients > 0:
+            try:
+                await asyncio.wait_for(self.camera.published.wait(), 1.0)
+            except asyncio.TimeoutError:
+                continue
+            self.camera.published.clear()
+            held = self.camera.take_display()
+            if held is None:
+                continue
+
+            ring, slot, frame = held
+            started = loop.time()
+            try:
+                ok, buf = await loop.run_in_executor(None, cv2.imencode, ".jpg", frame, params)
+            finally:
+                ring.unpin(slot)
+            elapsed = loop.time() - started
+            if ok:
+                async with self._changed:
+                    self.seq += 1
+                    self.jpeg = buf.tobytes()
+                    self._changed.notify_all()
+                self.stats["encoded"] += 1
+                ms = elapsed * 1000
+                self.stats["encode_ms"] = ms if self.stats["encoded"] == 1 else 0.9 * self.stats["encode_ms"] + 0.1 * ms
+
+            if min_interval - elapsed > 0:
+                await asyncio.sleep(min_interval - elapsed)
+
+    async def next_frame(self, after: int):
+        """(seq, jpeg bytes) of the newest encoded frame with seq > after."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.seq > after)
+            return self.seq, self.jpeg
+
+    def describe(self) -> dict:
+        return {"camera_id": self.camera.camera_id, "clients": self.clients, "seq": self.seq, **self.stats}
+
+
+broadcasters: dict = {}  # camera_id -> MjpegBroadcaster
+
+
+def get_broadcaster(camera) -> MjpegBroadcaster:
+    b = broadcasters.get(camera.camera_id)
+    if b is None or b.camera is not camera:
+        b = broadcasters[camera.camera_id] = MjpegBroadcaster(camera)
+    return b
+
+
+async def mjpeg_stream(camera_id: str = None, fps: float = None):
+    """Async multipart generator for one client of `camera_id` (default camera if None)."""
+    camera = cameras.get_camera(camera_id)
+    while camera is None:
+        # cameras register shortly after startup
+        await asyncio.sleep(0.5)
+        camera = cameras.get_camera(camera_id)
+
+    loop = asyncio.get_running_loop()
+    rate = min(fps, STREAM_MAX_FPS) if fps and fps > 0 else STREAM_MAX_FPS
+    interval = 1.0 / rate if rate > 0 else 0.0
+    broadcaster = get_broadcaster(camera)
+    broadcaster.subscribe()
+    seq = 0
+    try:
+        while True:
+            seq, jpeg = await broadcaster.next_frame(seq)
+            sent_at = loop.time()
+            try:
+                yield BOUNDARY + jpeg + b"\r\n"
+            except asyncio.TimeoutError:
+                # thrown in by MjpegResponse when the send did not complete in time
+                broadcaster.stats["dropped_clients"] += 1
+                print(f"[stream] dropping slow client on {camera.camera_id} (send blocked > {STREAM_SLOW_CLIENT_TIMEOUT:g}s)")
+                return
+            broadcaster.stats["frames_sent"] += 1
+            elapsed = loop.time() - sent_at
+            if interval - elapsed > 0:
+                await asyncio.sleep(interval - elapsed)
+    finally:
+        broadcaster.unsubscribe()
+
+
+class MjpegResponse(StreamingResponse):
+    """StreamingResponse whose every send must complete within STREAM_SLOW_CLIENT_TIMEOUT."""
+
+    media_type = "multipart/x-mixed-replace; boundary=frame"
+
+    async def stream_response(self, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        async for chunk in self.body_iterator:
+            try:
+                await asyncio.wait_for(
+                    send({"type": "http.response.body", "body": chunk, "more_body": True}),
+                    STREAM_SLOW_CLIENT_TIMEOUT,
+                )
+            except asyncio.TimeoutError as e:
+                try:
+                    await self.body_iterator.athrow(e)
+                except StopAsyncIteration:
+                    pass
+                return  # leave the response unfinished so the server closes the connection
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -1,12 +1,14 @@
 # backend/app/telegram_utils.py
 import os
-import requests
 from dotenv import load_dotenv
 
+from app.notifier import telegram
+
 load_dotenv()
 
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")
 
 
 def send_telegram_message(text: str):
@@ -15,10 +17,10 @@ def send_telegram_message(text: str):
         print("[Telegram] Missing BOT_TOKEN or CHAT_ID")
         return False
 
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+    url = f"{TELEGRAM_API_URL}/bot{BOT_TOKEN}/sendMessage"
     payload = {"chat_id": CHAT_ID, "text": text, "parse_mode": "Markdown"}
     try:
-        r = requests.post(url, data=payload, timeout=10)
+        r = telegram.post(url, data=payload)
         if r.status_code == 200:
             return True
         print("[Telegram] Error:", r.text)
@@ -28,22 +30,25 @@ def send_telegram_message(text: str):
         return False
 
 
-def send_telegram_photo(image_path: str, caption: str = ""):
-    """Send an image with caption."""
+def send_telegram_photo(photo, caption: str = ""):
+    """Send an image with caption. `photo` is JPEG bytes or a path to a JPEG file."""
     if not BOT_TOKEN or not CHAT_ID:
         print("[Telegram] Missing BOT_TOKEN or CHAT_ID")
         return False
 
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendPhoto"
+    url = f"{TELEGRAM_API_URL}/bot{BOT_TOKEN}/sendPhoto"
     try:
-        with open(image_path, "rb") as img:
-            files = {"photo": img}
-            data = {"chat_id": CHAT_ID, "caption": caption}
-            r = requests.post(url, files=files, data=data, timeout=20)
-            if r.status_code == 200:
-                return True
-            print("[Telegram] Error sending photo:", r.text)
-            return False
+        if isinstance(photo, (bytes, bytearray, memoryview)):
+            data, filename = bytes(photo), "snapshot.jpg"
+        else:
+            with open(photo, "rb") as img:
+                data, filename = img.read(), os.path.basename(photo)
+        files = {"photo": (filename, data, "image/jpeg")}
+        r = telegram.post(url, files=files, data={"chat_id": CHAT_ID, "caption": caption})
+        if r.status_code == 200:
+            return True
+        print("[Telegram] Error sending photo:", r.text)
+        return False
     except Exception as e:
         print("[Telegram] Exception:", e)
         return False
@@ -0,0 +1,163 @@
+# backend/app/tracker.py
+"""Per-camera face tracker (IoU association + Kalman boxes)."""
+
+import os
+import itertools
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TRACK_IOU_THRESHOLD = float(os.getenv("TRACK_IOU_THRESHOLD", "0.3"))
+TRACK_MAX_MISSES = int(os.getenv("TRACK_MAX_MISSES", "10"))
+TRACK_REEMBED_INTERVAL = int(os.getenv("TRACK_REEMBED_INTERVAL", "15"))
+TRACK_QUALITY_GAIN = float(os.getenv("TRACK_QUALITY_GAIN", "1.25"))
+
+_track_ids = itertools.count(1)
+
+
+# ===================================================
+# Kalman Filter
+# ===================================================
+class KalmanBox:
+    """Constant-velocity filter over (cx, cy, w, h)."""
+
+    F = np.eye(8, dtype=np.float32)
+    F[:4, 4:] = np.eye(4)
+    H = np.eye(4, 8, dtype=np.float32)
+    Q = np.diag([1, 1, 1, 1, 0.5, 0.5, 0.25, 0.25]).astype(np.float32)
+    R = np.diag([4, 4, 8, 8]).astype(np.float32)
+
+    def __init__(self, bbox):
+        self.x = np.zeros(8, dtype=np.float32)
+        self.x[:4] = self._to_z(bbox)
+        self.P = np.diag([10, 10, 10, 10, 100, 100, 100, 100]).astype(np.float32)
+
+    @staticmethod
+    def _to_z(bbox):
+        x1, y1, x2, y2 = bbox[:4]
+        return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1], dtype=np.float32)
+
+    def predict(self):
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        self.x[2:4] = np.maximum(self.x[2:4], 1.0)
+
+    def update(self, bbox):
+        y = self._to_z(bbox) - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(8, dtype=np.float32) - K @ self.H) @ self.P
+
+    @property
+    def bbox(self):
+        cx, cy, w, h = self.x[:4]
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], dtype=np.float32)
+
+
+def face_quality(face) -> float:
+    """Detector confidence weighted by face size (sqrt of area in pixels)."""
+    x1, y1, x2, y2 = face.bbox[:4]
+    return float(face.det_score) * float(np.sqrt(max(x2 - x1, 0) * max(y2 - y1, 0)))
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of N x 4 and M x 4 boxes."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+# ===================================================
+# Tracks
+# ===================================================
+class Track:
+    def __init__(self, face, frame_no: int):
+        self.track_id = next(_track_ids)
+        self.kf = KalmanBox(face.bbox)
+        self.misses = 0
+        self.hits = 1
+        self.last_frame = frame_no
+        # identity carried between embeddings
+        self.embedding = None
+        self.embedded_at = None
+        self.embed_quality = 0.0
+        self.bad_candidates = []
+        self.known_candidates = []
+        self.unknown_identity = None  # alert throttle identity if this face was an unknown
+
+    @property
+    def bbox(self):
+        return self.kf.bbox
+
+    def remember(self, embedding, bad_candidates, known_candidates, quality: float, frame_no: int):
+        self.embedding = embedding
+        self.bad_candidates = bad_candidates
+        self.known_candidates = known_candidates
+        self.embed_quality = quality
+        self.embedded_at = frame_no
+
+
+class FaceTracker:
+    def __init__(self):
+        self.tracks: list = []
+        self.frame_no = 0
+        self.stats = {"embedded": 0, "reused": 0}
+
+    def update(self, faces: list) -> list:
+        """Associate this frame's faces with tracks; returns the Track for every face (same order)."""
+        self.frame_no += 1
+        for t in self.tracks:
+            t.kf.predict()
+
+        boxes = np.array([f.bbox[:4] for f in faces], dtype=np.float32).reshape(-1, 4)
+        preds = np.array([t.bbox for t in self.tracks], dtype=np.float32).reshape(-1, 4)
+        ious = iou_matrix(boxes, preds)
+
+        # greedy assignment by descending IoU (faces per camera are few)
+        assigned = [None] * len(faces)
+        used = set()
+        for flat in np.argsort(-ious, axis=None):
+            fi, ti = divmod(int(flat), ious.shape[1])
+            if ious[fi, ti] < TRACK_IOU_THRESHOLD:
+                break
+            if assigned[fi] is not None or ti in used:
+                continue
+            assigned[fi] = self.tracks[ti]
+            used.add(ti)
+
+        for fi, face in enumerate(faces):
+            track = assigned[fi]
+            if track is None:
+                track = Track(face, self.frame_no)
+                self.tracks.append(track)
+                assigned[fi] = track
+            else:
+                track.kf.update(face.bbox)
+                track.hits += 1
+                track.misses = 0
+                track.last_frame = self.frame_no
+
+        matched = {id(t) for t in assigned}
+        for t in self.tracks:
+            if id(t) not in matched:
+                t.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= TRACK_MAX_MISSES]
+        return assigned
+
+    def needs_embedding(self, track: Track, face) -> bool:
+        due = (
+            track.embedding is None
+            or self.frame_no - track.embedded_at >= TRACK_REEMBED_INTERVAL
+            or face_quality(face) > track.embed_quality * TRACK_QUALITY_GAIN
+        )
+        self.stats["embedded" if due else "reused"] += 1
+        return due
@@ -1,4 +1,5 @@
 # backend/app/utils.py
+import io
 import os
 import uuid
 import cv2
@@ -23,13 +24,23 @@ os.makedirs(SNAPSHOT_DIR, exist_ok=True)
 #     return f"/static/snapshots/{filename}"
 
 
-def save_bgr_image(bgr_img):
-    """Save BGR (OpenCV) image and return both local and web paths."""
+def save_bgr_jpeg(bgr_img):
+    """Save BGR (OpenCV) image; returns local path, web path and the JPEG bytes."""
     filename = f"{uuid.uuid4().hex}.jpg"
     abs_path = os.path.join(SNAPSHOT_DIR, filename)
     rgb = cv2.cvtColor(bgr_img, cv2.COLOR_BGR2RGB)
-    Image.fromarray(rgb).save(abs_path, format="JPEG", quality=85)
+    buf = io.BytesIO()
+    Image.fromarray(rgb).save(buf, format="JPEG", quality=85)
+    jpeg = buf.getvalue()
+    with open(abs_path, "wb") as f:
+        f.write(jpeg)
     web_path = f"/static/snapshots/{filename}"
+    return abs_path, web_path, jpeg
+
+
+def save_bgr_image(bgr_img):
+    """Save BGR (OpenCV) image and return both local and web paths."""
+    abs_path, web_path, _ = save_bgr_jpeg(bgr_img)
     return abs_path, web_path
 
 def serialize_doc(value):
@@ -38,6 +49,8 @@ def serialize_doc(value):
         return str(value)
     if isinstance(value, datetime.datetime):
         return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return None  # binary payloads (e.g. embeddings) are not JSON-safe
     if isinstance(value, dict):
         return {k: serialize_doc(v) for k, v in value.items()}
     if isinstance(value, list):
@@ -3,16 +3,20 @@ import os
 import requests
 from dotenv import load_dotenv
 
+from app.notifier import whatsapp
+
 load_dotenv()
 
 WHATSAPP_TOKEN = os.getenv("WHATSAPP_ACCESS_TOKEN")
 PHONE_NUMBER_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID")
+WHATSAPP_API_URL = os.getenv("WHATSAPP_API_URL", "https://graph.facebook.com/v20.0").rstrip("/")
 
 def send_whatsapp_message(to_number: str, message: str):
     """
     Send a WhatsApp text message using Meta Cloud API.
+    Returns True on success, False on failure.
     """
-    url = f"https://graph.facebook.com/v20.0/{PHONE_NUMBER_ID}/messages"
+    url = f"{WHATSAPP_API_URL}/{PHONE_NUMBER_ID}/messages"
     headers = {
         "Authorization": f"Bearer {WHATSAPP_TOKEN}",
         "Content-Type": "application/json"
@@ -26,9 +30,12 @@ def send_whatsapp_message(to_number: str, message: str):
         }
     }
 
+    response = None
     try:
-        response = requests.post(url, headers=headers, json=payload)
+        response = whatsapp.post(url, headers=headers, json=payload)
         response.raise_for_status()
         print("[WhatsApp] ✅ Message sent successfully")
+        return True
     except requests.exceptions.RequestException as e:
-        print("[WhatsApp] ❌ Error:", e, response.text if 'response' in locals() else "")
+        print("[WhatsApp] ❌ Error:", e, response.text if response is not None else "")
+        return False
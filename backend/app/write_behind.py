@@ -0,0 +1,125 @@
+# backend/app/write_behind.py
+"""Write-behind buffer for the recognition loop's Mongo writes."""
+
+import os
+import time
+import asyncio
+from bson.objectid import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from dotenv import load_dotenv
+
+from app.db import db
+
+load_dotenv()
+
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "100"))
+WRITE_FLUSH_INTERVAL = float(os.getenv("WRITE_FLUSH_INTERVAL", "0.5"))
+WRITE_MAX_PENDING = int(os.getenv("WRITE_MAX_PENDING", "50000"))
+
+
+class WriteBehind:
+    def __init__(self, database=db):
+        self.db = database
+        self.pending = {}  # collection name -> [pymongo write ops]
+        self._full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._refusing = set()  # collections whose buffer is full (logged once per episode)
+        self.stats = {"ops": 0, "batches": 0, "written": 0, "errors": 0, "dropped": 0, "refused": 0, "flush_ms": 0.0}
+
+    @property
+    def depth(self) -> int:
+        return sum(len(ops) for ops in self.pending.values())
+
+    def _add(self, collection: str, op) -> bool:
+        ops = self.pending.setdefault(collection, [])
+        if len(ops) >= WRITE_MAX_PENDING:
+            # refuse rather than drop queued ops: an insert must never lose its later updates
+            if collection not in self._refusing:
+                self._refusing.add(collection)
+                print(f"[write_behind] {collection}: buffer full ({len(ops)} ops), refusing writes until Mongo catches up")
+            self.stats["refused"] += 1
+            self._full.set()
+            return False
+        ops.append(op)
+        self.stats["ops"] += 1
+        if len(ops) >= WRITE_BATCH_SIZE:
+            self._full.set()
+        return True
+
+    def insert(self, collection: str, doc: dict) -> ObjectId:
+        """Queue an insert; returns the document's (pre-generated) _id (even if the buffer refused it)."""
+        doc.setdefault("_id", ObjectId())
+        self._add(collection, InsertOne(doc))
+        return doc["_id"]
+
+    def update(self, collection: str, filter: dict, update: dict, upsert: bool = False):
+        self._add(collection, UpdateOne(filter, update, upsert=upsert))
+
+    async def flush(self):
+        async with self._flush_lock:
+            for collection in list(self.pending):
+                ops = self.pending.pop(collection, [])
+                while ops:
+                    batch, ops = ops[:WRITE_BATCH_SIZE], ops[WRITE_BATCH_SIZE:]
+                    started = time.monotonic()
+                    try:
+                        await self.db[collection].bulk_write(batch, ordered=True)
+                        applied = len(batch)
+                    except BulkWriteError as e:
+                        # ordered: everything before the failing op applied; drop the bad op itself
+                        failed = e.details["writeErrors"][0]["index"]
+                        print(f"[write_behind] {collection}: dropping failed write: {e.details['writeErrors'][0].get('errmsg')}")
+                        self.stats["errors"] += 1
+                        self.stats["dropped"] += 1
+                        ops = batch[failed + 1 :] + ops
+                        applied = failed
+                    except Exception as e:
+                        # Mongo unreachable: put the rest back in front of anything queued meanwhile
+                        print(f"[write_behind] {collection}: bulk write failed, will retry: {e}")
+                        self.stats["errors"] += 1
+                        self.pending[collection] = batch + ops + self.pending.get(collection, [])
+                        break
+                    self._refusing.discard(collection)
+                    self.stats["batches"] += 1
+                    self.stats["written"] += applied
+                    ms = (time.monotonic() - started) * 1000
+                    self.stats["flush_ms"] = round(ms if self.stats["batches"] == 1 else 0.9 * self.stats["flush_ms"] + 0.1 * ms, 1)
+
+    async def run(self):
+        """Flush on size or time until cancelled."""
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), WRITE_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            if self.pending:
+                await self.flush()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def close(self):
+        """Stop the background task and flush what is left."""
+        if self._task is not None:
+            async with self._flush_lock:  # never cancel a bulk write half way
+                self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self.flush()
+        if self.depth:
+            print(f"[write_behind] {self.depth} write(s) could not be flushed at shutdown")
+
+    def describe(self) -> dict:
+        return {
+            "depth": self.depth,
+            "pending": {c: len(ops) for c, ops in self.pending.items() if ops},
+            "batch_size": WRITE_BATCH_SIZE,
+            "flush_interval": WRITE_FLUSH_INTERVAL,
+            **self.stats,
+        }
+
+
+writer = WriteBehind()
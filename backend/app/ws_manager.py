@@ -1,32 +1,110 @@
 # backend/app/ws_manager.py
+"""WebSocket fan-out to dashboard clients through per-client outboxes."""
+
+import os
 import asyncio
+from collections import deque
 from fastapi import WebSocket
-from typing import Set
+from typing import Dict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "32"))
+WS_QUEUE_LIMIT = int(os.getenv("WS_QUEUE_LIMIT", "1000"))  # hard cap; only events left to drop
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5"))
+
+
+class ClientOutbox:
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.messages = deque()
+        self.ready = asyncio.Event()
+        self.dropped = 0
+        self.task = None
+
+    def put(self, message: dict) -> bool:
+        """Queue `message`; False if the client is too far behind to keep."""
+        if len(self.messages) >= WS_QUEUE_SIZE:
+            stale = next((m for m in self.messages if m.get("type") == "detections"), None)
+            if stale is not None:
+                self.messages.remove(stale)
+                self.dropped += 1
+            elif message.get("type") == "detections":
+                self.dropped += 1
+                return True
+            elif len(self.messages) >= WS_QUEUE_LIMIT:
+                return False
+        self.messages.append(message)
+        self.ready.set()
+        return True
+
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: Set[WebSocket] = set()
-        self.lock = asyncio.Lock()
+        self.active_connections: Dict[WebSocket, ClientOutbox] = {}
+        self.stats = {"dropped_messages": 0, "dropped_clients": 0}
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        async with self.lock:
-            self.active_connections.add(websocket)
+        outbox = ClientOutbox(websocket)
+        outbox.task = asyncio.create_task(self._sender(outbox))
+        self.active_connections[websocket] = outbox
 
     async def disconnect(self, websocket: WebSocket):
-        async with self.lock:
-            self.active_connections.discard(websocket)
+        outbox = self.active_connections.pop(websocket, None)
+        if outbox is not None and outbox.task is not asyncio.current_task():
+            outbox.task.cancel()
+
+    async def _sender(self, outbox: ClientOutbox):
+        ws = outbox.websocket
+        try:
+            while True:
+                await outbox.ready.wait()
+                outbox.ready.clear()
+                while outbox.messages:
+                    await asyncio.wait_for(ws.send_json(outbox.messages.popleft()), WS_SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # timed out or broken: drop the client rather than let it back up
+            self._drop(ws, f"{type(e).__name__} {e}")
+
+    def _drop(self, ws: WebSocket, reason: str):
+        """Forget a client that fell behind and close its socket in the background."""
+        outbox = self.active_connections.pop(ws, None)
+        if outbox is None:
+            return
+        print(f"[ws] dropping client: {reason}")
+        self.stats["dropped_clients"] += 1
+        if outbox.task is not asyncio.current_task():
+            outbox.task.cancel()
+        asyncio.create_task(self._close(ws))
+
+    @staticmethod
+    async def _close(ws: WebSocket):
+        try:
+            await ws.close()
+        except Exception:
+            pass
+
+    def publish(self, message: dict):
+        """Queue `message` for every client; never blocks."""
+        for ws, outbox in list(self.active_connections.items()):
+            before = outbox.dropped
+            if not outbox.put(message):
+                self._drop(ws, f"{len(outbox.messages)} events queued")
+            self.stats["dropped_messages"] += outbox.dropped - before
 
     async def broadcast_json(self, message: dict):
-        async with self.lock:
-            to_remove = []
-            for ws in list(self.active_connections):
-                try:
-                    await ws.send_json(message)
-                except Exception:
-                    to_remove.append(ws)
-            for r in to_remove:
-                self.active_connections.discard(r)
+        self.publish(message)
+
+    def describe(self) -> dict:
+        return {
+            "clients": len(self.active_connections),
+            "queued": sum(len(o.messages) for o in self.active_connections.values()),
+            **self.stats,
+        }
 
 
 manager = ConnectionManager()
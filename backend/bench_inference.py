@@ -0,0 +1,115 @@
+# backend/bench_inference.py
+"""
+Inference throughput benchmark. Modes:
+  sequential   per-frame insightface FaceAnalysis(name="buffalo_l").get(), all
+               modules loaded (the old recognition loop; the baseline)
+  pipeline     per-frame FacePipeline.get() (app/model_pipeline.py, only the
+               modules in FACE_MODULES)
+  batched xN   FacePipeline through the batched path in app/inference.py
+
+Usage:
+  python bench_inference.py                          # images/ as input, batches 1,2,4,8
+  python bench_inference.py --images bad_people --frames 200
+  python bench_inference.py --batch-sizes 1,4,16 --width 640
+
+Frames are resized like the recognition loop (RESIZE_WIDTH) and cycled until
+--frames have been processed. Reports frames/s and faces/s per mode; run it
+pinned to one socket (e.g. `numactl -N 0 python bench_inference.py`) to get a
+per-socket figure.
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import cv2
+import insightface
+
+from app.inference import analyze_frames
+from app.model_pipeline import INSIGHTFACE_CTX_ID
+from app.recognition import RESIZE_WIDTH, load_model
+
+BASE_DIR = Path(__file__).resolve().parent
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def load_frames(folder: Path, width: int) -> list:
+    frames = []
+    for path in sorted(folder.iterdir()):
+        if path.suffix.lower() not in IMAGE_EXTS:
+            continue
+        img = cv2.imread(str(path))
+        if img is None:
+            continue
+        h, w = img.shape[:2]
+        frames.append(cv2.resize(img, (width, int(h * width / w))))
+    return frames
+
+
+def load_face_analysis():
+    """The model the recognition loop used before FacePipeline: every buffalo_l module."""
+    model = insightface.app.FaceAnalysis(name="buffalo_l")
+    model.prepare(ctx_id=INSIGHTFACE_CTX_ID, det_size=(640, 640))
+    return model
+
+
+def run_sequential(model, frames: list, total: int):
+    faces = 0
+    started = time.perf_counter()
+    for i in range(total):
+        faces += len(model.get(frames[i % len(frames)]))
+    return time.perf_counter() - started, faces
+
+
+def run_batched(model, frames: list, total: int, batch_size: int):
+    faces = 0
+    started = time.perf_counter()
+    for i in range(0, total, batch_size):
+        batch = [frames[j % len(frames)] for j in range(i, min(i + batch_size, total))]
+        faces += sum(len(f) for f in analyze_frames(model, batch))
+    return time.perf_counter() - started, faces
+
+
+def report(label: str, elapsed: float, total: int, faces: int, baseline: float = None):
+    fps = total / elapsed
+    speedup = f"  x{fps / baseline:.2f}" if baseline else ""
+    print(f"{label:<14} {fps:8.1f} frames/s  {faces / elapsed:8.1f} faces/s{speedup}")
+    return fps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched face inference")
+    parser.add_argument("--images", default=str(BASE_DIR / "images"))
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--batch-sizes", default="1,2,4,8")
+    parser.add_argument("--width", type=int, default=RESIZE_WIDTH)
+    parser.add_argument("--warmup", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = load_frames(Path(args.images), args.width)
+    if not frames:
+        print(f"[bench] no images found in {args.images}")
+        return 1
+
+    legacy = load_face_analysis()
+    model = load_model()
+    print(f"[bench] {len(frames)} source images at width {args.width}, {args.frames} frames per run, {os.cpu_count()} CPUs")
+
+    # warm up ONNX Runtime (first runs allocate arenas / pick kernels)
+    run_sequential(legacy, frames, args.warmup)
+    run_sequential(model, frames, args.warmup)
+    run_batched(model, frames, args.warmup, args.warmup)
+
+    elapsed, faces = run_sequential(legacy, frames, args.frames)
+    baseline = report("sequential", elapsed, args.frames, faces)
+    elapsed, faces = run_sequential(model, frames, args.frames)
+    report("pipeline", elapsed, args.frames, faces, baseline)
+    for size in (int(s) for s in args.batch_sizes.split(",") if s.strip()):
+        elapsed, faces = run_batched(model, frames, args.frames, size)
+        report(f"batched x{size}", elapsed, args.frames, faces, baseline)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+# backend/migrate_embeddings.py
+"""
+Rewrite legacy list embeddings (users, bad_people, unknowns) into the
+compact binary format from app/embedding_codec.py.
+
+Usage:
+  python migrate_embeddings.py                 # uses EMBEDDING_STORAGE (default float32)
+  python migrate_embeddings.py --storage int8  # quantize while migrating
+  python migrate_embeddings.py --dry-run       # only report what would change
+  python migrate_embeddings.py --all           # also re-encode binary docs (e.g. to switch storage)
+
+Safe to re-run: already-migrated documents are skipped unless --all is given.
+"""
+
+import os
+import sys
+import argparse
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+from app.embedding_codec import EMBEDDING_STORAGE, FORMAT_CODES, decode_embedding, encode_embedding
+
+BASE_DIR = Path(__file__).resolve().parent
+load_dotenv(BASE_DIR / ".env")
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = os.getenv("DB_NAME", "face_db")
+COLLECTIONS = ("users", "bad_people", "unknowns")
+BATCH_SIZE = 500
+
+client = MongoClient(MONGO_URI)
+db = client[DB_NAME]
+
+
+def migrate_collection(name: str, storage: str, dry_run: bool, reencode: bool):
+    query = {"embedding": {"$ne": None}} if reencode else {"embedding": {"$type": "array"}}
+    ops, migrated, skipped, bytes_before, bytes_after = [], 0, 0, 0, 0
+
+    for doc in db[name].find(query, {"embedding": 1}):
+        vec = decode_embedding(doc["embedding"])
+        if vec is None or vec.size == 0 or not np.all(np.isfinite(vec)):
+            skipped += 1
+            continue
+        encoded = encode_embedding(vec, storage)
+        # a BSON array costs ~13 bytes per double (type byte + index key + value)
+        bytes_before += 13 * vec.size if isinstance(doc["embedding"], list) else len(doc["embedding"])
+        bytes_after += len(encoded)
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"embedding": encoded}}))
+        migrated += 1
+
+        if len(ops) >= BATCH_SIZE:
+            if not dry_run:
+                db[name].bulk_write(ops, ordered=False)
+            ops = []
+
+    if ops and not dry_run:
+        db[name].bulk_write(ops, ordered=False)
+
+    ratio = f" (~{bytes_before / bytes_after:.1f}x smaller)" if bytes_after else ""
+    print(f"[migrate] {name}: {migrated} migrated, {skipped} skipped{ratio}")
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate embeddings to binary storage")
+    parser.add_argument("--storage", default=EMBEDDING_STORAGE, choices=sorted(FORMAT_CODES))
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--all", action="store_true", help="re-encode binary embeddings too")
+    args = parser.parse_args()
+
+    total = 0
+    for name in COLLECTIONS:
+        total += migrate_collection(name, args.storage, args.dry_run, args.all)
+
+    action = "would migrate" if args.dry_run else "migrated"
+    print(f"[migrate] finished. {action} {total} embeddings to {args.storage}")
+    if total and not args.dry_run:
+        print("[migrate] restart backend processes (or POST /admin/reload_embeddings) to pick up the new format")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
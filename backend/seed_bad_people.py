@@ -10,6 +10,8 @@ import numpy as np
 from PIL import Image
 from dotenv import load_dotenv
 from pymongo import MongoClient
+from app.embedding_codec import encode_embedding
+from app.gallery_version import next_version_sync
 
 BASE_DIR = Path(__file__).resolve().parent
 load_dotenv(BASE_DIR / ".env") 
@@ -36,11 +38,10 @@ def save_snapshot_bgr(bgr_img):
     return f"/static/snapshots/{filename}"
 
 def load_insightface_model():
-    import insightface
+    # same detector/recognition configuration as the backend, so embeddings are comparable
+    from app.model_pipeline import build_pipeline
     print("[seed_bad] Loading InsightFace model...")
-    model = insightface.app.FaceAnalysis(name="buffalo_l")
-    model.prepare(ctx_id=INSIGHTFACE_CTX_ID, det_size=(640, 640))
-    return model
+    return build_pipeline(ctx_id=INSIGHTFACE_CTX_ID)
 
 def extract_embedding_from_image(model, img_bgr):
     try:
@@ -72,9 +73,10 @@ def seed_from_image(model, img_path: Path):
     doc = {
         "name": name,
         "role": "bad",
-        "embedding": emb.tolist(), 
+        "embedding": encode_embedding(emb),
         "image_path": snapshot_path,
         "created_at": datetime.utcnow(),
+        "gallery_version": next_version_sync(db),
     }
     db.bad_people.insert_one(doc)
     print(f"[seed_bad] added bad person '{name}'")
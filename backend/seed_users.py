@@ -22,6 +22,9 @@ from PIL import Image
 from dotenv import load_dotenv
 from pymongo import MongoClient
 
+from app.embedding_codec import encode_embedding
+from app.gallery_version import next_version_sync
+
 # --- config (read .env if present) ---
 BASE_DIR = Path(__file__).resolve().parent
 load_dotenv(BASE_DIR / ".env")
@@ -56,11 +59,10 @@ def save_snapshot_bgr(bgr_img) -> str:
 
 
 def load_insightface_model():
-    import insightface
+    # same detector/recognition configuration as the backend, so embeddings are comparable
+    from app.model_pipeline import build_pipeline
     print("[seed] Loading InsightFace model (this may take a while)...")
-    model = insightface.app.FaceAnalysis(name="buffalo_l")
-    model.prepare(ctx_id=INSIGHTFACE_CTX_ID, det_size=(640, 640))
-    return model
+    return build_pipeline(ctx_id=INSIGHTFACE_CTX_ID)
 
 
 def extract_embedding_from_image(model, img_bgr):
@@ -112,9 +114,10 @@ def seed_from_person_folder(model, person_dir: Path, name: str):
     doc = {
         "name": name,
         "role": "employee",
-        "embedding": avg_emb.astype(np.float32).tolist(),
+        "embedding": encode_embedding(avg_emb),
         "image_path": snapshot_path,
         "created_at": datetime.utcnow(),
+        "gallery_version": next_version_sync(db),  # so running backends pick them up
     }
     db.users.insert_one(doc)
     print(f"[seed] added user '{name}' (from folder)")
@@ -141,9 +144,10 @@ def seed_from_single_image(model, img_path: Path):
     doc = {
         "name": name,
         "role": "employee",
-        "embedding": emb.astype(np.float32).tolist(),
+        "embedding": encode_embedding(emb),
         "image_path": snapshot_path,
         "created_at": datetime.utcnow(),
+        "gallery_version": next_version_sync(db),  # so running backends pick them up
     }
     db.users.insert_one(doc)
     print(f"[seed] added user '{name}' (from single image)")
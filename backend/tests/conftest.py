@@ -0,0 +1,6 @@
+# backend/tests/conftest.py
+import os
+import sys
+
+# tests import the backend as `app.*`, like the seed scripts do
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,77 @@
+# backend/tests/test_alerts.py
+import types
+
+import pytest
+
+from app import alerts
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(alerts, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(alerts, "ALERT_COOLDOWNS", {"bad": 60, "known": 300, "unknown": 30})
+    monkeypatch.setattr(alerts, "ALERT_BURST_WINDOW", 10)
+    monkeypatch.setattr(alerts, "ALERT_BURST_MAX", 3)
+    monkeypatch.setattr(alerts, "ALERT_GLOBAL_WINDOW", 10)
+    monkeypatch.setattr(alerts, "ALERT_GLOBAL_MAX", 5)
+    return clock
+
+
+def test_cooldown_is_per_kind_and_identity(clock):
+    throttle = alerts.AlertThrottle()
+
+    assert throttle.allow("bad", "p1")
+    assert not throttle.allow("bad", "p1")
+    assert throttle.allow("bad", "p2")
+    assert throttle.allow("restricted:bad", "p1")
+
+    # "restricted:unknown" uses the unknown cooldown (30s), "bad" its own (60s)
+    assert throttle.allow("restricted:unknown", "u1")
+    clock.now += 31
+    assert throttle.allow("restricted:unknown", "u1")
+    assert not throttle.allow("bad", "p1")
+    clock.now += 30
+    assert throttle.allow("bad", "p1")
+    assert throttle.stats["cooldown"] == 2
+
+
+def test_burst_cap_per_kind(clock):
+    throttle = alerts.AlertThrottle()
+
+    assert all(throttle.allow("bad", f"p{i}") for i in range(3))
+    assert not throttle.allow("bad", "p3")
+    assert throttle.allow("known", "p3")  # other kinds have their own window
+
+    clock.now += 10
+    assert throttle.allow("bad", "p3")
+    assert throttle.stats["burst"] == 1
+    assert throttle.stats["kinds"]["bad"] == {"allowed": 4, "suppressed": 1}
+
+
+def test_global_cap_across_kinds(clock):
+    throttle = alerts.AlertThrottle()
+
+    for kind in ("bad", "known", "unknown", "restricted:bad", "restricted:known"):
+        assert throttle.allow(kind, "p")
+    assert not throttle.allow("restricted:unknown", "p")
+    assert throttle.stats["global"] == 1
+
+    clock.now += 10
+    assert throttle.allow("restricted:unknown", "p")
+
+
+def test_no_identity_skips_the_cooldown(clock):
+    throttle = alerts.AlertThrottle()
+
+    assert throttle.allow("unknown")
+    assert throttle.allow("unknown")
+    assert throttle.last_sent == {}
@@ -0,0 +1,70 @@
+# backend/tests/test_cameras.py
+import asyncio
+import time
+
+import pytest
+
+from app import cameras
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(cameras, "CAMERA_SOURCES", "synthetic:160x120,synthetic:320x240")
+    monkeypatch.setattr(cameras, "CAMERA_FILE_FPS", 50)
+    monkeypatch.setattr(cameras, "cameras", {})
+    monkeypatch.setattr(cameras, "frame_ready", None)
+    return cameras.cameras
+
+
+async def take_frames(cams, timeout=5.0):
+    """Run the recognition loop's wait/take pattern until every camera delivered a frame."""
+    frames = {}
+    deadline = time.monotonic() + timeout
+    while len(frames) < len(cams) and time.monotonic() < deadline:
+        await cameras.wait_for_frames(0.5)
+        for cam in cams:
+            if cam.camera_id not in frames:
+                frame, stamp = cam.take_frame()
+                if frame is not None:
+                    frames[cam.camera_id] = (frame.shape, cam.frame_ref)
+    return frames
+
+
+async def stop(cams):
+    # threads must be gone before the loop they notify closes
+    for cam in cams:
+        cam.stop()
+        await asyncio.to_thread(cam._thread.join, 2)
+    cameras.stop_cameras()
+
+
+def test_synthetic_cameras_deliver_frames_per_camera(registry):
+    async def run():
+        cams = await cameras.start_cameras()
+        try:
+            first = await take_frames(cams)
+            pinned = {c.camera_id: c.ring.describe()["pinned"] for c in cams}
+            for cam in cams:
+                cam.release_frame()
+            released = {c.camera_id: c.ring.describe()["pinned"] for c in cams}
+            second = await take_frames(cams)
+            for cam in cams:
+                cam.release_frame()
+            return cams, first, pinned, released, second
+        finally:
+            await stop(cams)
+
+    cams, first, pinned, released, second = asyncio.run(run())
+
+    assert [c.camera_id for c in cams] == ["cam0", "cam1"]
+    assert cameras.get_camera() is cams[0] and cameras.get_camera("cam1") is cams[1]
+    assert first["cam0"][0] == (120, 160, 3)
+    assert first["cam1"][0] == (240, 320, 3)
+    for cam in cams:
+        ring_name, slot, seq = first[cam.camera_id][1]
+        assert ring_name == cam.ring.name
+        assert pinned[cam.camera_id] == [slot]
+        assert released[cam.camera_id] == []
+        # each frame is handed out once; the next take is a newer one
+        assert second[cam.camera_id][1][2] > seq
+        assert cam.captured >= 2
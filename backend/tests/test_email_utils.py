@@ -0,0 +1,124 @@
+# backend/tests/test_email_utils.py
+import email
+import email.policy
+import socket
+import socketserver
+import threading
+
+import pytest
+
+from app import email_utils
+
+
+class SmtpStub(socketserver.ThreadingTCPServer):
+    """Minimal local SMTP server: records connections and delivered messages."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SmtpStubHandler)
+        self.connections = 0
+        self.messages = []
+        self.sockets = []
+
+    def drop_clients(self):
+        """Close every open client connection from the server side."""
+        for sock in self.sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.sockets = []
+
+
+class SmtpStubHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.server.connections += 1
+        self.server.sockets.append(self.connection)
+        self.reply("220 stub ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.decode(errors="replace").strip().upper()
+            if cmd.startswith("EHLO"):
+                self.wfile.write(b"250-stub\r\n250 8BITMIME\r\n")
+            elif cmd.startswith("DATA"):
+                self.reply("354 end with .")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk == b".\r\n":
+                        break
+                    data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                self.server.messages.append(b"".join(data))
+                self.reply("250 queued")
+            elif cmd.startswith("QUIT"):
+                self.reply("221 bye")
+                return
+            else:  # HELO, MAIL, RCPT, RSET, NOOP
+                self.reply("250 ok")
+
+
+def parse(raw: bytes):
+    return email.message_from_bytes(raw, policy=email.policy.default)
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    server = SmtpStub()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(email_utils, "EMAIL_HOST", "127.0.0.1")
+    monkeypatch.setattr(email_utils, "EMAIL_PORT", server.server_address[1])
+    monkeypatch.setattr(email_utils, "EMAIL_STARTTLS", False)
+    monkeypatch.setattr(email_utils, "EMAIL_USER", None)
+    monkeypatch.setattr(email_utils, "EMAIL_PASS", None)
+    monkeypatch.setattr(email_utils, "EMAIL_TIMEOUT", 5)
+    monkeypatch.setattr(email_utils, "EMAIL_FROM", "alerts@example.com")
+    monkeypatch.setattr(email_utils, "ADMIN_EMAIL", "admin@example.com")
+    pool = email_utils.SmtpPool(size=1)
+    monkeypatch.setattr(email_utils, "pool", pool)
+    yield server
+    pool.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_pooled_connection_is_reused(smtp):
+    for i in range(3):
+        assert email_utils.send_alert_email(f"alert {i}", "body")
+
+    assert len(smtp.messages) == 3
+    assert smtp.connections == 1
+    assert email_utils.pool.stats["reused"] == 2
+
+
+def test_reconnects_after_server_drops_connection(smtp):
+    assert email_utils.send_alert_email("before", "body")
+    smtp.drop_clients()
+
+    assert email_utils.send_alert_email("after", "body")
+    assert smtp.connections == 2
+    assert email_utils.pool.stats["reconnects"] == 1
+    assert [parse(m)["Subject"] for m in smtp.messages] == ["before", "after"]
+
+
+def test_digest_batches_alerts_into_one_message(smtp, tmp_path):
+    alerts = []
+    for i in range(3):
+        image = tmp_path / f"snap{i}.jpg"
+        image.write_bytes(b"\xff\xd8\xff\xd9")
+        alerts.append({"subject": f"alert {i}", "body": f"body {i}", "image_path": str(image)})
+
+    assert email_utils.send_alert_digest(alerts)
+
+    assert len(smtp.messages) == 1
+    msg = parse(smtp.messages[0])
+    assert [part.get_filename() for part in msg.iter_attachments()] == ["snap0.jpg", "snap1.jpg", "snap2.jpg"]
+    text = msg.get_body(("plain",)).get_content()
+    assert "alert 0" in text and "alert 2" in text
@@ -0,0 +1,47 @@
+# backend/tests/test_embedding_codec.py
+import numpy as np
+import pytest
+from bson.binary import Binary
+
+from app.embedding_codec import decode_embedding, encode_embedding, is_legacy
+
+
+@pytest.fixture
+def vec():
+    v = np.random.default_rng(1).normal(size=512).astype(np.float32)
+    return v / np.linalg.norm(v)
+
+
+@pytest.mark.parametrize("storage, size, tolerance", [
+    ("float32", 1 + 512 * 4, 0),
+    ("float16", 1 + 512 * 2, 1e-3),
+    ("int8", 5 + 512, 5e-3),
+])
+def test_round_trip(vec, storage, size, tolerance):
+    packed = encode_embedding(vec, storage)
+
+    assert isinstance(packed, Binary)
+    assert len(packed) == size
+    out = decode_embedding(packed)
+    assert out.dtype == np.float32
+    assert np.max(np.abs(out - vec)) <= tolerance
+
+
+def test_legacy_list_still_decodes(vec):
+    legacy = vec.tolist()
+
+    assert is_legacy(legacy)
+    assert not is_legacy(encode_embedding(vec))
+    assert np.allclose(decode_embedding(legacy), vec)
+
+
+def test_none_and_bad_values():
+    assert encode_embedding(None) is None
+    assert decode_embedding(None) is None
+    assert decode_embedding(b"\x09\x00\x00") is None
+    with pytest.raises(ValueError):
+        encode_embedding([1.0], "float64")
+
+
+def test_int8_all_zero_vector():
+    assert np.array_equal(decode_embedding(encode_embedding(np.zeros(4), "int8")), np.zeros(4))
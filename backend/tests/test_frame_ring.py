@@ -0,0 +1,89 @@
+# backend/tests/test_frame_ring.py
+import numpy as np
+import pytest
+
+from app.frame_ring import FrameRing
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRing((2, 2, 3), slots=3)
+    yield ring
+    ring.close()
+
+
+def write(ring, value, stamp=0.0):
+    slot, view = ring.claim()
+    view[:] = value
+    return slot, ring.commit(slot, stamp)
+
+
+def test_latest_returns_the_newest_committed_frame(ring):
+    assert ring.latest() is None
+    write(ring, 1, 10.0)
+    slot, seq = write(ring, 2, 11.0)
+
+    latest_seq, latest_slot, view, stamp = ring.latest()
+    assert (latest_seq, latest_slot, stamp) == (seq, slot, 11.0)
+    assert np.all(view == 2)
+    assert ring.head == 2
+
+
+def test_claim_skips_pinned_slots_and_the_newest_frame(ring):
+    pinned_slot, pinned_seq = write(ring, 1)
+    assert ring.pin(pinned_slot, pinned_seq)
+    newest, _ = write(ring, 2)
+
+    for _ in range(5):
+        slot, _ = ring.claim()
+        assert slot not in (pinned_slot, newest)
+        ring.seqs[slot] = 0  # abandon the claim so `newest` stays the head
+
+    assert np.all(ring.read(pinned_slot, pinned_seq) == 1)
+    assert ring.describe()["pinned"] == [pinned_slot]
+    ring.unpin(pinned_slot)
+    assert ring.describe()["pinned"] == []
+
+
+def test_pins_are_counted(ring):
+    slot, seq = write(ring, 1)
+    assert ring.pin(slot, seq) and ring.pin(slot, seq)
+    ring.unpin(slot)
+    assert ring.describe()["pinned"] == [slot]
+    ring.unpin(slot)
+    assert ring.describe()["pinned"] == []
+
+
+def test_all_pinned_falls_back_to_reusing_a_slot(ring):
+    for value in range(3):
+        slot, seq = write(ring, value)
+        assert ring.pin(slot, seq)
+
+    slot, view = ring.claim()
+    assert 0 <= slot < 3
+    assert ring.seqs[slot] == -1  # marked as being written
+
+
+def test_stale_pin_is_refused(ring):
+    slot, seq = write(ring, 1)
+    for value in range(2, 5):
+        write(ring, value)  # the writer laps the ring and reuses `slot`
+
+    assert not ring.is_current(slot, seq)
+    assert not ring.pin(slot, seq)
+    assert ring.read(slot, seq) is None
+    assert ring.describe()["pinned"] == []
+
+
+def test_attached_ring_sees_the_writers_frames(ring):
+    slot, seq = write(ring, 7, 3.5)
+    reader = FrameRing.attach(ring.name)
+    try:
+        assert not reader.owner
+        assert reader.shape == (2, 2, 3) and reader.slots == 3
+        latest_seq, latest_slot, view, stamp = reader.latest()
+        assert (latest_seq, latest_slot, stamp) == (seq, slot, 3.5)
+        assert np.all(view == 7)
+        del view
+    finally:
+        reader.detach()
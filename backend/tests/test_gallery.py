@@ -0,0 +1,75 @@
+# backend/tests/test_gallery.py
+import asyncio
+
+import numpy as np
+
+from app.embedding_codec import encode_embedding
+from app.gallery import GalleryStore
+from app.gallery_index import EMBEDDING_DIM, normalize_rows
+
+
+def vectors(n, seed=0):
+    return normalize_rows(np.random.default_rng(seed).normal(size=(n, EMBEDDING_DIM)))
+
+
+def store():
+    return GalleryStore("known", ("name", "note"), "User")
+
+
+def test_add_update_remove_and_defaults():
+    vecs = vectors(2)
+    gallery = store()
+
+    assert gallery.add("aaaa1111", vecs[0], name="Alice")
+    assert gallery.add_document({"_id": "bbbb2222", "embedding": encode_embedding(vecs[1])})
+    assert not gallery.add("cccc3333", [0.0] * 3)
+
+    assert gallery.get("bbbb2222")["name"] == "User bbbb"
+    assert gallery.update("aaaa1111", note="vip")
+    assert gallery.get("aaaa1111") == {"name": "Alice", "note": "vip"}
+    assert not gallery.update("missing", note="x")
+
+    # a document that lost its embedding leaves the gallery
+    assert not gallery.add_document({"_id": "aaaa1111", "embedding": None})
+    assert "aaaa1111" not in gallery and len(gallery) == 1
+
+
+def test_reload_replays_changes_made_while_it_ran():
+    vecs = vectors(4)
+    gallery = store()
+    gallery.add("stale", vecs[3], name="Stale")
+
+    async def cursor():
+        yield {"_id": "a", "embedding": encode_embedding(vecs[0]), "name": "A"}
+        # change stream updates arriving while the reload is still reading
+        gallery.add("c", vecs[2], name="C")
+        gallery.remove("b")
+        gallery.update("a", note="seen")
+        await asyncio.sleep(0)
+        yield {"_id": "b", "embedding": encode_embedding(vecs[1]), "name": "B"}
+        yield {"_id": "broken", "embedding": [1.0, 2.0]}
+
+    assert asyncio.run(gallery.reload(cursor())) == 2
+
+    assert sorted(gallery.index.ids()) == ["a", "c"]
+    assert gallery.get("a") == {"name": "A", "note": "seen"}
+    assert gallery.search(vecs[2], k=1)[0][0][0] == "c"
+    assert gallery._journal is None
+
+
+def test_failed_reload_keeps_the_old_state():
+    vecs = vectors(1)
+    gallery = store()
+    gallery.add("a", vecs[0], name="A")
+
+    async def cursor():
+        yield {"_id": "x", "embedding": encode_embedding(vecs[0])}
+        raise RuntimeError("cursor died")
+
+    try:
+        asyncio.run(gallery.reload(cursor()))
+    except RuntimeError:
+        pass
+
+    assert gallery.index.ids() == ["a"]
+    assert gallery._journal is None
@@ -0,0 +1,80 @@
+# backend/tests/test_gallery_index.py
+import numpy as np
+import pytest
+
+from app.gallery_index import FlatIndex, IVFIndex, create_index, normalize_rows
+
+
+def unit_vectors(n, dim=16, seed=0):
+    return normalize_rows(np.random.default_rng(seed).normal(size=(n, dim)))
+
+
+def test_flat_search_finds_exact_match():
+    vecs = unit_vectors(20)
+    index = FlatIndex(dim=16, capacity=4)  # forces growth
+    index.add([f"id{i}" for i in range(20)], vecs)
+
+    (hits,) = index.search(vecs[7], k=3)
+
+    assert len(index) == 20
+    assert hits[0][0] == "id7" and hits[0][1] == pytest.approx(0, abs=1e-3)
+    assert [d for _, d in hits] == sorted(d for _, d in hits)
+
+
+def test_flat_remove_swaps_last_row_in():
+    vecs = unit_vectors(5)
+    index = FlatIndex(dim=16)
+    index.add(["a", "b", "c", "d", "e"], vecs)
+
+    assert index.remove(["b", "missing"]) == 1
+
+    # the last row took the removed row's place
+    assert index.ids() == ["a", "e", "c", "d"]
+    assert "b" not in index
+    assert np.allclose(index.vector("e"), vecs[4])
+    assert index.search(vecs[4], k=1)[0][0][0] == "e"
+    assert index.search(vecs[1], k=4)[0][0][0] != "b"
+
+
+def test_flat_add_overwrites_existing_id():
+    vecs = unit_vectors(3)
+    index = FlatIndex(dim=16)
+    index.add(["a", "b"], vecs[:2])
+    index.add(["a"], vecs[2:])
+
+    assert len(index) == 2
+    assert np.allclose(index.vector("a"), vecs[2])
+
+
+def test_ivf_below_train_min_is_exact_and_untrained():
+    vecs = unit_vectors(50)
+    index = IVFIndex(dim=16, nlist=4, nprobe=1, train_min=100)
+    index.add([i for i in range(50)], vecs)
+
+    assert not index.trained
+    exact = FlatIndex(dim=16)
+    exact.add([i for i in range(50)], vecs)
+    queries = unit_vectors(5, seed=1)
+    assert index.search(queries, k=5) == exact.search(queries, k=5)
+
+
+def test_ivf_trains_at_train_min_and_keeps_buckets_in_sync():
+    vecs = unit_vectors(200)
+    index = IVFIndex(dim=16, nlist=8, nprobe=8, train_min=150, retrain_factor=100)
+    index.add(list(range(100)), vecs[:100])
+    assert not index.trained
+    index.add(list(range(100, 200)), vecs[100:])
+    assert index.trained
+
+    index.remove([3, 50])
+    # probing every bucket is exact, so swapped rows must still be found
+    for i in (0, 100, 150, 199):
+        assert index.search(vecs[i], k=1)[0][0][0] == i
+    assert all(hit[0] not in (3, 50) for hit in index.search(vecs[3], k=10)[0])
+
+
+def test_create_index_kinds():
+    assert isinstance(create_index("flat"), FlatIndex)
+    assert isinstance(create_index("ivf"), IVFIndex)
+    with pytest.raises(ValueError):
+        create_index("hnsw")
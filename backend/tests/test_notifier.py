@@ -0,0 +1,108 @@
+# backend/tests/test_notifier.py
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import notifier, telegram_utils, whatsapp_utils
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server = self.server
+        server.requests.append({"path": self.path, "port": self.client_address[1], "body": body})
+        if server.rate_limits:
+            retry_after = server.rate_limits.pop(0)
+            payload = json.dumps({"ok": False, "parameters": {"retry_after": retry_after}}).encode()
+            self.send_response(429)
+        else:
+            payload = b'{"ok": true}'
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.rate_limits = []  # retry_after values for the next 429 responses
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_session_keeps_the_connection_alive(stub):
+    client = notifier.HttpNotifier("test")
+    for _ in range(3):
+        assert client.post(f"{stub.url}/send", data={"n": 1}).status_code == 200
+
+    assert len(stub.requests) == 3
+    assert len({r["port"] for r in stub.requests}) == 1
+
+
+def test_429_waits_for_retry_after_then_retries(stub):
+    client = notifier.HttpNotifier("test")
+    stub.rate_limits = [0.3]
+
+    started = time.monotonic()
+    r = client.post(f"{stub.url}/send", data={"n": 1})
+
+    assert r.status_code == 200
+    assert time.monotonic() - started >= 0.3
+    assert len(stub.requests) == 2
+    assert client.stats["rate_limited"] == 1
+
+
+def test_long_retry_after_is_not_retried_but_blocks_later_requests(stub, monkeypatch):
+    monkeypatch.setattr(notifier, "NOTIFY_MAX_RETRY_AFTER", 0.1)
+    client = notifier.HttpNotifier("test")
+    stub.rate_limits = [0.4]
+
+    assert client.post(f"{stub.url}/send").status_code == 429
+    assert len(stub.requests) == 1
+    assert client.describe()["blocked_for"] > 0
+
+    started = time.monotonic()
+    assert client.post(f"{stub.url}/send").status_code == 200
+    assert time.monotonic() - started >= 0.2
+
+
+def test_telegram_goes_through_the_notifier(stub, monkeypatch):
+    monkeypatch.setattr(telegram_utils, "TELEGRAM_API_URL", stub.url)
+    monkeypatch.setattr(telegram_utils, "BOT_TOKEN", "TOKEN")
+    monkeypatch.setattr(telegram_utils, "CHAT_ID", "42")
+    before = notifier.telegram.stats["requests"]
+
+    assert telegram_utils.send_telegram_message("hello")
+    assert telegram_utils.send_telegram_photo(b"\xff\xd8\xff\xd9", caption="snap")
+
+    assert [r["path"] for r in stub.requests] == ["/botTOKEN/sendMessage", "/botTOKEN/sendPhoto"]
+    assert b"snapshot.jpg" in stub.requests[1]["body"]
+    assert notifier.telegram.stats["requests"] == before + 2
+
+
+def test_whatsapp_goes_through_the_notifier(stub, monkeypatch):
+    monkeypatch.setattr(whatsapp_utils, "WHATSAPP_API_URL", stub.url)
+    monkeypatch.setattr(whatsapp_utils, "PHONE_NUMBER_ID", "123")
+    monkeypatch.setattr(whatsapp_utils, "WHATSAPP_TOKEN", "TOKEN")
+    before = notifier.whatsapp.stats["requests"]
+
+    assert whatsapp_utils.send_whatsapp_message("+8801000000000", "hello")
+
+    assert [r["path"] for r in stub.requests] == ["/123/messages"]
+    assert json.loads(stub.requests[0]["body"])["text"]["body"] == "hello"
+    assert notifier.whatsapp.stats["requests"] == before + 1
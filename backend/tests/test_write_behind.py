@@ -0,0 +1,98 @@
+# backend/tests/test_write_behind.py
+import asyncio
+
+import pytest
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app import write_behind
+
+
+class FakeCollection:
+    def __init__(self):
+        self.batches = []
+        self.failures = []  # exceptions raised by the next bulk_write calls
+
+    async def bulk_write(self, ops, ordered=True):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.batches.append(list(ops))
+
+
+class FakeDb(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    monkeypatch.setattr(write_behind, "WRITE_BATCH_SIZE", 3)
+    monkeypatch.setattr(write_behind, "WRITE_MAX_PENDING", 5)
+    return write_behind.WriteBehind(database=FakeDb())
+
+
+def test_flush_writes_in_ordered_batches(writer):
+    ids = [writer.insert("unknown_faces", {"n": i}) for i in range(4)]
+    writer.update("unknown_faces", {"_id": ids[0]}, {"$set": {"seen": 2}})
+    writer.update("presence_events", {"k": 1}, {"$set": {"v": 1}}, upsert=True)
+
+    asyncio.run(writer.flush())
+
+    batches = writer.db["unknown_faces"].batches
+    assert [len(b) for b in batches] == [3, 2]
+    assert [op._doc["_id"] for op in batches[0] + batches[1][:1]] == ids
+    assert isinstance(batches[1][1], UpdateOne)
+    assert len(writer.db["presence_events"].batches) == 1
+    assert writer.depth == 0
+    assert writer.stats["written"] == 6
+
+
+def test_bulk_write_error_drops_only_the_failing_op(writer):
+    for i in range(3):
+        writer.insert("unknown_faces", {"n": i})
+    writer.db["unknown_faces"].failures = [
+        BulkWriteError({"writeErrors": [{"index": 1, "errmsg": "duplicate key"}]})
+    ]
+
+    asyncio.run(writer.flush())
+
+    # ops 0 applied by the failed call, op 1 dropped, op 2 written on the retry
+    (retry,) = writer.db["unknown_faces"].batches
+    assert [op._doc["n"] for op in retry] == [2]
+    assert writer.stats["dropped"] == 1
+    assert writer.stats["written"] == 2
+    assert writer.depth == 0
+
+
+def test_failed_collection_is_requeued_and_others_still_flush(writer):
+    for i in range(4):
+        writer.insert("unknown_faces", {"n": i})
+    writer.insert("presence_events", {"n": 0})
+    writer.db["unknown_faces"].failures = [ConnectionError("mongo down")]
+
+    asyncio.run(writer.flush())
+
+    assert writer.db["unknown_faces"].batches == []
+    assert [op._doc["n"] for op in writer.pending["unknown_faces"]] == [0, 1, 2, 3]
+    assert len(writer.db["presence_events"].batches) == 1
+
+    asyncio.run(writer.flush())
+    written = [op._doc["n"] for b in writer.db["unknown_faces"].batches for op in b]
+    assert written == [0, 1, 2, 3]
+
+
+def test_overflow_refuses_new_ops_without_dropping_queued_ones(writer):
+    ids = [writer.insert("unknown_faces", {"n": i}) for i in range(5)]
+    refused_id = writer.insert("unknown_faces", {"n": 5})
+    writer.update("unknown_faces", {"_id": ids[0]}, {"$set": {"seen": 2}})
+
+    assert refused_id is not None
+    assert writer.stats["refused"] == 2
+    assert [op._doc["n"] for op in writer.pending["unknown_faces"]] == [0, 1, 2, 3, 4]
+
+    asyncio.run(writer.flush())
+    assert writer.insert("unknown_faces", {"n": 6})
+    assert [op._doc["n"] for op in writer.pending["unknown_faces"]] == [6]
+    assert writer.stats["written"] == 5
+    assert all(isinstance(op, InsertOne) for b in writer.db["unknown_faces"].batches for op in b)
@@ -63,8 +63,10 @@ export async function reloadEmbeddings() {
   return res.data;
 }
 
-export async function generateAttendance(dateStr) {
-  const res = await client.post(`/admin/generate_attendance/${dateStr}`);
+export async function generateAttendance(dateStr, recompute = false) {
+  const res = await client.post(`/admin/generate_attendance/${dateStr}`, null, {
+    params: recompute ? { recompute: true } : {},
+  });
   return res.data;
 }
 
@@ -117,4 +119,11 @@ export async function updateRestrictedSettings(data) {
 }
 
 
+// Stream / overlay configuration
+export async function fetchStreamConfig() {
+  const res = await client.get("/stream_config");
+  return res.data;
+}
+
+
 export default client;
@@ -7,7 +7,54 @@ import timezone from "dayjs/plugin/timezone";
 dayjs.extend(utc);
 dayjs.extend(timezone);
 
-export default function LiveDetections({ liveMap = {}, users = [] }) {
+// label colours matching the server-side renderer (draw_ai_label)
+const OVERLAY_STYLES = {
+  known: { border: "#1e9a5a", background: "rgba(80, 255, 150, 0.55)", color: "#143c14" },
+  bad: { border: "#b40000", background: "rgba(255, 70, 70, 0.6)", color: "#ffffff" },
+  unknown: { border: "#f06e00", background: "rgba(255, 170, 60, 0.55)", color: "#ffffff" },
+};
+
+function FaceOverlay({ overlay }) {
+  if (!overlay || !overlay.width) return null;
+  const pct = (v, total) => `${(v / total) * 100}%`;
+  return (
+    <div className="absolute inset-0 pointer-events-none">
+      {overlay.restricted && (
+        <div className="absolute top-0 left-0 right-0 bg-red-600/60 text-white text-center font-bold py-2">
+          RESTRICTED HOUR ACTIVE
+        </div>
+      )}
+      {overlay.faces.map((f) => {
+        const [x1, y1, x2, y2] = f.bbox;
+        const style = OVERLAY_STYLES[f.type] || OVERLAY_STYLES.unknown;
+        const title = f.type === "unknown" ? "Unknown" : f.name || (f.type === "bad" ? "Suspect" : "Known Person");
+        return (
+          <div
+            key={f.track_id ?? `${x1}:${y1}`}
+            className="absolute border-2 rounded"
+            style={{
+              left: pct(x1, overlay.width),
+              top: pct(y1, overlay.height),
+              width: pct(x2 - x1, overlay.width),
+              height: pct(y2 - y1, overlay.height),
+              borderColor: style.border,
+            }}
+          >
+            <div
+              className="absolute bottom-full left-0 mb-1 px-2 py-1 rounded-lg whitespace-nowrap text-xs"
+              style={{ background: style.background, color: style.color }}
+            >
+              <div className="font-bold">{title}</div>
+              {f.note && <div className="italic">{f.note}</div>}
+            </div>
+          </div>
+        );
+      })}
+    </div>
+  );
+}
+
+export default function LiveDetections({ liveMap = {}, users = [], overlay = null }) {
   // keep only known users, then sort by last_seen
   const items = Object.values(liveMap)
     .filter((it) => it.type === "known")
@@ -18,12 +65,13 @@ export default function LiveDetections({ liveMap = {}, users = [] }) {
   return (
     <section className="bg-white p-4 rounded shadow mb-4">
       <h2 className="text-lg font-semibold mb-2">Live</h2>
-      <div className="w-full mb-4">
+      <div className="w-full mb-4 relative">
         <img
           src={`${import.meta.env.VITE_API_BASE}/video_feed`}
           alt="live stream"
           className="w-full  object-cover rounded border" //SET HEIGHT IF NEED h-92
         />
+        <FaceOverlay overlay={overlay} />
       </div>
 
       {/* <h2 className="text-lg font-semibold mb-2">Detection Info</h2> */}
@@ -11,6 +11,7 @@ import {
   markAsBad,
   ignoreUnknown,
   getBadPeople,
+  fetchStreamConfig,
 } from "../api/apiClient";
 import LiveDetections from "../components/LiveDetections";
 import UnknownAlerts from "../components/UnknownAlerts";
@@ -30,6 +31,8 @@ export default function Livestream() {
   const [unknownQueue, setUnknownQueue] = useState([]);
   const [users, setUsers] = useState([]);
   const [badPeople, setBadPeople] = useState([]);
+  const [streamConfig, setStreamConfig] = useState(null);
+  const [detections, setDetections] = useState({}); // camera_id -> last "detections" message
   const wsRef = useRef(null);
 
   // 🧩 Handle messages from WebSocket
@@ -82,6 +85,9 @@ export default function Livestream() {
         delete copy[keyPrefix];
         return copy;
       });
+    } else if (msg.type === "detections") {
+      // client-side overlay mode: boxes/labels for the latest frame of a camera
+      setDetections((prev) => ({ ...prev, [msg.camera_id]: msg }));
     } else if (msg.type === "alert_bad" || msg.type === "alert_bad_update") {
       // Optionally handle bad person alerts
     }
@@ -113,6 +119,7 @@ export default function Livestream() {
     fetchUnknowns().then(setUnknownQueue).catch(console.warn);
     fetchPresence().catch(console.warn);
     getBadPeople().then(setBadPeople).catch(console.warn);
+    fetchStreamConfig().then(setStreamConfig).catch(console.warn);
   }, []);
 
   //    useEffect(() => {
@@ -188,8 +195,8 @@ export default function Livestream() {
   // 📅 Manual attendance generation
   async function handleGenerateAttendance(date) {
     const dateStr = dayjs(date).tz("Asia/Dhaka").format("YYYY-MM-DD");
-    await generateAttendance(dateStr);
-    alert("Attendance generation triggered for " + dateStr);
+    await generateAttendance(dateStr, true);
+    alert("Attendance recomputed for " + dateStr);
   }
 
   // 🕓 Optional: Auto-refresh unknowns every 10s
@@ -205,7 +212,15 @@ export default function Livestream() {
   return (
     <div className="grid grid-cols-12 gap-4">
       <div className="col-span-8">
-        <LiveDetections liveMap={liveMap} users={users} />
+        <LiveDetections
+          liveMap={liveMap}
+          users={users}
+          overlay={
+            streamConfig?.overlay_mode === "client"
+              ? detections[streamConfig.default_camera]
+              : null
+          }
+        />
         {/* <PresenceList /> */}
       </div>
 